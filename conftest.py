@@ -0,0 +1,23 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+# the scenes import the preprocessing package and each other from the scenes directory, as when rendering them
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "scenes"))
+
+
+@pytest.fixture(autouse=True)
+def caches_in_tmp_path(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    # caches built by a test are its own, and never left in the working directory
+    monkeypatch.setattr("preprocessing.cache.CACHE_DIR", os.path.join(tmp_path, ".cache"))
+
+
+@pytest.fixture
+def in_tmp_path(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Run a test from its temporary directory, for tests of assets at paths relative to the working directory, as the
+    media pipeline gives them.
+    """
+    monkeypatch.chdir(tmp_path)
@@ -0,0 +1,255 @@
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import torch as th
+
+from preprocessing.build import BuildGraph
+from preprocessing.expression import MaskExpr, colors
+from preprocessing.tiles import isolate_region, rasterize_region, raw_rgba, timed
+
+REGIONS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "regions.json")
+
+
+def load_regions(config_path: str = REGIONS_PATH) -> tuple[str, dict[str, dict]]:
+    """
+    Read a region config, which names the source map and, for every region, its palette colors, its cleanup recipe
+    and its output paths. Each region also gets its "mask" expression.
+
+    Example config:
+        {
+          "source": "media/uk_and_ireland.png",
+          "regions": {
+            "ireland": {
+              "colors": [[183, 209, 108]],
+              "delta": 10.0,
+              "alpha_threshold": 16,
+              "cleanup": [{"op": "erode", "kernel_size": 3}, {"op": "dilate", "kernel_size": 3}],
+              "mask_path": "media/ireland_mask.png",
+              "image_path": "media/ireland.png",
+              "points_path": "media/ireland_mask_points.npy",
+              "points_threshold": 200,
+              "contours_path": "media/ireland_mask_contours.npz",
+              "contour_tolerance": 1.0
+            }
+          }
+        }
+
+    delta and alpha_threshold are optional, and cleanup steps take the arguments of MaskExpr.erode and dilate.
+    points_path is optional too, and saves the solid pixels of the mask as a point cloud for the scenes, with
+    points_threshold defaulting to the 200 the scenes use. contours_path optionally saves the outlines of those same
+    pixels, simplified to within contour_tolerance pixels, for drawing the region as a vector shape.
+
+    Instead of colors and cleanup, a region can give the GeoJSON polygons of its boundaries, which are rasterized
+    straight to its mask. bounds are the coordinates of the left, bottom, right and top edges of the source map,
+    defaulting to the bounds of the polygons, and supersample is the number of samples per pixel along each axis
+    for soft edges, 4 by default:
+        "ireland": {
+          "boundaries": {"path": "media/ireland.geojson", "bounds": [-11.0, 49.8, 2.1, 61.0], "supersample": 4},
+          "mask_path": "media/ireland_mask.png",
+          "image_path": "media/ireland.png"
+        }
+    """
+    with open(config_path) as file:
+        config = json.load(file)
+
+    regions = config["regions"]
+    for region in regions.values():
+        region["mask"] = None if "boundaries" in region else region_mask(region)
+
+    return config["source"], regions
+
+
+def region_mask(region: dict) -> MaskExpr:
+    """
+    The mask expression of a region config: the pixels close to any of its colors, cleaned up step by step.
+    """
+    mask = colors(
+        *(tuple(color) for color in region["colors"]),
+        delta=region.get("delta", 10.0),
+        alpha_threshold=region.get("alpha_threshold", 16),
+    )
+
+    for step in region.get("cleanup", []):
+        params = {name: tuple(value) if isinstance(value, list) else value for name, value in step.items()}
+        match params.pop("op"):
+            case "erode":
+                mask = mask.erode(**params)
+            case "dilate":
+                mask = mask.dilate(**params)
+            case op:
+                raise ValueError(f"Unknown cleanup step: {op}")
+
+    return mask
+
+
+def limit_threads() -> None:
+    # regions already run one per process, so torch kernels stay single-threaded to not oversubscribe the cores
+    th.set_num_threads(1)
+
+
+def extract_region(
+    source_path: str,
+    region: dict,
+    strip_height: int,
+    strip_workers: int | None,
+) -> dict[str, float]:
+    """
+    Build one region of a config, in whatever process it runs in. The source is mapped from its raw cache, which
+    every process shares through the page cache instead of decoding or copying it.
+    """
+    timings = {}
+    outputs = {
+        "timings": timings,
+        "points_path": region.get("points_path"),
+        "points_threshold": region.get("points_threshold", 200),
+        "contours_path": region.get("contours_path"),
+        "contour_tolerance": region.get("contour_tolerance", 1.0),
+    }
+
+    if "boundaries" in region:
+        boundaries = region["boundaries"]
+        rasterize_region(
+            raw_rgba(source_path),
+            boundaries["path"],
+            region["mask_path"],
+            region["image_path"],
+            bounds=tuple(boundaries["bounds"]) if "bounds" in boundaries else None,
+            supersample=boundaries.get("supersample", 4),
+            strip_height=strip_height,
+            **outputs,
+        )
+    else:
+        isolate_region(
+            raw_rgba(source_path),
+            region["mask"],
+            region["mask"].halo,
+            region["mask_path"],
+            region["image_path"],
+            strip_height=strip_height,
+            max_workers=strip_workers,
+            **outputs,
+        )
+
+    return timings
+
+
+def isolate_regions(
+    names: list[str] | None = None,
+    config_path: str = REGIONS_PATH,
+    force: bool = False,
+    strip_height: int = 1024,
+    processes: int | None = None,
+) -> dict[str, float]:
+    """
+    Extract regions of the source map in one run. The source is decoded at most once, only if some region is stale,
+    and up to date regions are skipped. With several processes, regions are extracted concurrently, one per process.
+
+    Args:
+        names (list[str] | None): Names of the regions in the config to extract, all of them by default.
+        config_path (str): Path of the region config, see load_regions.
+        force (bool): Rebuild regions even if their outputs are up to date.
+        strip_height (int): Number of rows per strip.
+        processes (int | None): Number of regions extracted at once, 1 to extract them in this process.
+            Defaults to the number of cores.
+
+    Returns:
+        dict[str, float]: Seconds spent in each stage, per region.
+    """
+    source_path, regions = load_regions(config_path)
+    assert os.path.exists(source_path), f"File not found: {source_path}"
+
+    names = list(regions) if names is None else names
+    unknown_regions = set(names) - set(regions)
+    assert not unknown_regions, f"Unknown regions: {', '.join(sorted(unknown_regions))}"
+
+    processes = max(1, min(processes or os.cpu_count() or 1, len(names)))
+    timings = {}
+
+    def decode_source() -> None:
+        # fill the raw cache once before any region maps it
+        with timed(timings, "decode"):
+            raw_rgba(source_path)
+
+    graph = BuildGraph()
+    for name in names:
+        region = regions[name]
+        graph.add(
+            name,
+            partial(
+                extract_region,
+                source_path,
+                region,
+                strip_height,
+                # strips run on threads only when there is a single process
+                None if processes == 1 else 1,
+            ),
+            inputs=[source_path, *([region["boundaries"]["path"]] if "boundaries" in region else [])],
+            outputs=[
+                region["mask_path"],
+                region["image_path"],
+                *([region["points_path"]] if "points_path" in region else []),
+                *([region["contours_path"]] if "contours_path" in region else []),
+            ],
+            params={
+                "mask": region["mask"],
+                "boundaries": region.get("boundaries"),
+                "points_threshold": region.get("points_threshold", 200),
+                "contour_tolerance": region.get("contour_tolerance", 1.0),
+            },
+            code=[__file__],
+        )
+
+    with timed(timings, "total"):
+        if processes == 1:
+            results = graph.run(force=force, before_build=decode_source)
+        else:
+            with ProcessPoolExecutor(max_workers=processes, initializer=limit_threads) as executor:
+                results = graph.run(force=force, executor=executor, before_build=decode_source)
+
+    for name in names:
+        if name in results:
+            timings.update({f"{name} {stage}": seconds for stage, seconds in results[name].items()})
+        else:
+            timings[f"{name} up to date"] = 0.0
+
+    # keep the total last in the summary
+    timings["total"] = timings.pop("total")
+
+    return timings
+
+
+def print_timings(timings: dict[str, float]) -> None:
+    width = max(len(stage) for stage in timings)
+    for stage, seconds in timings.items():
+        print(f"{stage:<{width}}  {seconds * 1000:9.1f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Cut regions out of the source map and save their masks and images")
+    parser.add_argument("regions", nargs="*", help="Regions to extract, all regions of the config by default.")
+    parser.add_argument("--config", default=REGIONS_PATH, help="Path of the region config.")
+    parser.add_argument("--force", action="store_true", help="Rebuild regions even if they are up to date.")
+    parser.add_argument("--strip-height", type=int, default=1024, help="Number of rows processed at a time.")
+    parser.add_argument("--processes", type=int, default=None, help="Number of regions extracted at once.")
+    args = parser.parse_args()
+
+    _, regions = load_regions(args.config)
+    unknown_regions = set(args.regions) - set(regions)
+    if unknown_regions:
+        parser.error(f"Unknown regions: {', '.join(sorted(unknown_regions))}")
+
+    timings = isolate_regions(
+        args.regions or None,
+        config_path=args.config,
+        force=args.force,
+        strip_height=args.strip_height,
+        processes=args.processes,
+    )
+    print_timings(timings)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+import json
+import os
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from isolate_regions import isolate_regions, load_regions
+from preprocessing.cache import cache_location
+from preprocessing.erode_dilate import dilate, erode
+from preprocessing.expression import colors
+from preprocessing.mask import alpha_channel, color_mask
+
+pytestmark = pytest.mark.usefixtures("in_tmp_path")
+
+BLUE, GREEN = (28, 151, 179), (183, 209, 108)
+
+
+def write_source(path: str = "map.png", h: int = 80, w: int = 60, seed: int = 0) -> np.ndarray:
+    """
+    Two speckled blobs on a transparent sea, saved as an RGBA PNG.
+    """
+    rng = np.random.default_rng(seed)
+    rows, cols = np.mgrid[:h, :w]
+
+    pixels = np.zeros((h, w, 4), dtype=np.uint8)
+    pixels[((rows - 25) / 18) ** 2 + ((cols - 20) / 14) ** 2 < 1] = (*BLUE, 255)
+    pixels[((rows - 60) / 15) ** 2 + ((cols - 42) / 12) ** 2 < 1] = (*GREEN, 230)
+    pixels[rng.random((h, w)) < 0.03] = (250, 250, 250, 255)
+
+    Image.fromarray(pixels).save(path)
+    return pixels
+
+
+def write_config(path: str = "regions.json") -> str:
+    config = {
+        "source": "map.png",
+        "regions": {
+            "blue": {
+                "colors": [list(BLUE)],
+                "cleanup": [{"op": "erode", "kernel_size": 3}, {"op": "dilate", "kernel_size": 5}],
+                "mask_path": "blue_mask.png",
+                "image_path": "blue.png",
+            },
+            "green": {
+                "colors": [list(GREEN)],
+                "cleanup": [{"op": "dilate", "kernel_size": 3}],
+                "mask_path": "green_mask.png",
+                "image_path": "green.png",
+            },
+        },
+    }
+    with open(path, "w") as file:
+        json.dump(config, file)
+
+    return path
+
+
+def read_png(path: str) -> np.ndarray:
+    with Image.open(path) as image:
+        return np.asarray(image)
+
+
+@pytest.mark.parametrize("strip_height", [7, 1024])
+def test_regions_match_their_masks_on_the_whole_map(strip_height: int) -> None:
+    pixels = write_source()
+
+    isolate_regions(config_path=write_config(), strip_height=strip_height, processes=1)
+
+    # the recipes of the config, applied to the whole map as the original isolate scripts did
+    masks = {"blue": dilate(erode(color_mask(pixels, BLUE)), kernel_size=5), "green": dilate(color_mask(pixels, GREEN))}
+
+    for name, mask in masks.items():
+        expected_alpha = (alpha_channel(pixels) * mask).numpy()
+        assert np.array_equal(read_png(f"{name}_mask.png"), expected_alpha)
+
+        rows, cols = np.nonzero(expected_alpha)
+        region = read_png(f"{name}.png")
+        assert region.shape[:2] == (rows.max() - rows.min() + 1, cols.max() - cols.min() + 1)
+        assert np.array_equal(region[:, :, 3], expected_alpha[rows.min() : rows.max() + 1, cols.min() : cols.max() + 1])
+
+
+def test_the_source_is_decoded_once_and_only_when_needed() -> None:
+    write_source()
+    config_path = write_config()
+
+    timings = isolate_regions(config_path=config_path, processes=1)
+    assert "decode" in timings
+    assert len(os.listdir(cache_location("raw_rgba"))) == 1  # the masks are removed once their regions are saved
+
+    timings = isolate_regions(config_path=config_path, processes=1)
+    assert "decode" not in timings
+    assert {"blue up to date", "green up to date"} <= set(timings)
+    assert list(timings)[-1] == "total"
+
+
+def test_only_the_named_regions_are_extracted() -> None:
+    write_source()
+    config_path = write_config()
+
+    timings = isolate_regions(["green"], config_path=config_path, processes=1)
+
+    assert os.path.exists("green_mask.png") and not os.path.exists("blue_mask.png")
+    assert not any(stage.startswith("blue") for stage in timings)
+
+    with pytest.raises(AssertionError, match="Unknown regions: red"):
+        isolate_regions(["green", "red"], config_path=config_path, processes=1)
+
+
+def test_the_repository_config_keeps_the_original_masks() -> None:
+    source_path, regions = load_regions()
+
+    assert source_path == "media/uk_and_ireland.png"
+    assert repr(regions["uk"]["mask"]) == repr(
+        colors((28, 151, 179), (157, 157, 156), (219, 8, 18)).erode().dilate(kernel_size=7).erode(kernel_size=5)
+    )
+    assert repr(regions["ireland"]["mask"]) == repr(colors((183, 209, 108)).erode().dilate())
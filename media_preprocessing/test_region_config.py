@@ -0,0 +1,178 @@
+import json
+import os
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from isolate_regions import isolate_regions, load_regions, region_mask
+from preprocessing.contours import load_contours
+from preprocessing.expression import colors
+from preprocessing.point_cloud import load_point_cloud, point_cloud
+from preprocessing.rasterize import rasterize_boundaries
+
+pytestmark = pytest.mark.usefixtures("in_tmp_path")
+
+BLUE, GREY, GREEN = (28, 151, 179), (157, 157, 156), (183, 209, 108)
+
+
+def write_source(path: str = "map.png", h: int = 70, w: int = 50, seed: int = 0) -> None:
+    """
+    Noisy blue, grey and green bands, saved as an RGBA PNG.
+    """
+    rng = np.random.default_rng(seed)
+    palette = np.array([BLUE, GREY, GREEN])
+    bands = np.repeat(np.arange(h)[:, None] * 3 // h, w, axis=1)  # shape: (h, w)
+    rgb = np.clip(palette[bands] + rng.integers(-6, 7, (h, w, 3)), 0, 255)
+    alpha = np.where(rng.random((h, w, 1)) < 0.05, 0, 255)
+
+    Image.fromarray(np.concatenate([rgb, alpha], axis=2).astype(np.uint8)).save(path)
+
+
+def write_boundaries(path: str = "boundaries.geojson") -> None:
+    """
+    A square with a square hole and a triangle, in coordinates where the map spans [0, 50] x [0, 70].
+    """
+    geojson = {
+        "type": "Feature",
+        "geometry": {
+            "type": "MultiPolygon",
+            "coordinates": [
+                [
+                    [[5, 40], [30, 40], [30, 65], [5, 65], [5, 40]],
+                    [[12, 48], [20, 48], [20, 56], [12, 56], [12, 48]],
+                ],
+                [[[35.5, 5.25], [48, 10], [40, 30.75], [35.5, 5.25]]],
+            ],
+        },
+    }
+    with open(path, "w") as file:
+        json.dump(geojson, file)
+
+
+def write_config(regions: dict, path: str = "regions.json") -> str:
+    with open(path, "w") as file:
+        json.dump({"source": "map.png", "regions": regions}, file)
+
+    return path
+
+
+def region_outputs(name: str) -> dict:
+    return {
+        "mask_path": f"{name}_mask.png",
+        "image_path": f"{name}.png",
+        "points_path": f"{name}_mask_points.npy",
+        "contours_path": f"{name}_mask_contours.npz",
+    }
+
+
+def many_regions() -> dict:
+    return {
+        "blue": {"colors": [list(BLUE)], "cleanup": [{"op": "erode", "kernel_size": 3}], **region_outputs("blue")},
+        "land": {
+            "colors": [list(GREY), list(GREEN)],
+            "delta": 14,
+            "cleanup": [{"op": "dilate", "kernel_size": [3, 5], "kernel_shape": "cross"}],
+            **region_outputs("land"),
+        },
+        "outline": {
+            "boundaries": {"path": "boundaries.geojson", "bounds": [0, 0, 50, 70], "supersample": 2},
+            **region_outputs("outline"),
+        },
+    }
+
+
+def read_outputs(name: str) -> list[np.ndarray]:
+    outputs = []
+    for path in (f"{name}_mask.png", f"{name}.png"):
+        with Image.open(path) as image:
+            outputs.append(np.asarray(image))
+    outputs.append(np.load(f"{name}_mask_points.npy"))
+    outputs.extend(load_contours(f"{name}_mask_contours.npz")[0])
+
+    return outputs
+
+
+def test_region_mask_follows_the_cleanup_recipe() -> None:
+    region = {
+        "colors": [list(GREY), list(GREEN)],
+        "delta": 14,
+        "alpha_threshold": 100,
+        "cleanup": [
+            {"op": "dilate", "kernel_size": [3, 5], "kernel_shape": "cross"},
+            {"op": "erode", "iterations": 2},
+        ],
+    }
+
+    expected = colors(GREY, GREEN, delta=14, alpha_threshold=100).dilate((3, 5), kernel_shape="cross")
+    expected = expected.erode(iterations=2)
+    assert repr(region_mask(region)) == repr(expected)
+    assert repr(region_mask({"colors": [list(BLUE)]})) == repr(colors(BLUE))
+
+    with pytest.raises(ValueError, match="Unknown cleanup step: open"):
+        region_mask({"colors": [list(BLUE)], "cleanup": [{"op": "open"}]})
+
+
+def test_boundary_regions_are_rasterized() -> None:
+    write_source()
+    write_boundaries()
+    config_path = write_config(many_regions())
+
+    _, regions = load_regions(config_path)
+    assert regions["outline"]["mask"] is None
+
+    isolate_regions(["outline"], config_path=config_path, processes=1)
+
+    with Image.open("outline_mask.png") as mask_image:
+        alpha = np.asarray(mask_image)
+    expected_alpha = rasterize_boundaries("boundaries.geojson", 70, 50, bounds=(0, 0, 50, 70), supersample=2)
+    assert np.array_equal(alpha, expected_alpha)
+    assert alpha[20, 10] == 255 and alpha[18, 16] == 0  # inside the square and inside its hole
+
+
+def test_optional_outputs_are_saved() -> None:
+    write_source()
+    write_boundaries()
+    isolate_regions(config_path=write_config(many_regions()), processes=1)
+
+    for name in many_regions():
+        with Image.open(f"{name}_mask.png") as mask_image:
+            alpha = np.asarray(mask_image)
+
+        points, metadata = load_point_cloud(f"{name}_mask_points.npy")
+        assert np.array_equal(points, point_cloud(alpha, 200))
+        assert (metadata["height"], metadata["width"]) == alpha.shape
+
+        contours, metadata = load_contours(f"{name}_mask_contours.npz")
+        assert contours and (metadata["height"], metadata["width"]) == alpha.shape
+
+
+def test_processes_build_the_same_outputs() -> None:
+    write_source()
+    write_boundaries()
+
+    for directory, processes in (("one", 1), ("many", 3)):
+        os.makedirs(directory)
+        regions = {
+            name: {**region, **{key: os.path.join(directory, path) for key, path in region_outputs(name).items()}}
+            for name, region in many_regions().items()
+        }
+        isolate_regions(config_path=write_config(regions, f"{directory}.json"), strip_height=16, processes=processes)
+
+    for name in many_regions():
+        one, many = read_outputs(os.path.join("one", name)), read_outputs(os.path.join("many", name))
+        assert len(one) == len(many)
+        assert all(np.array_equal(one_output, many_output) for one_output, many_output in zip(one, many))
+
+
+def test_changed_recipes_rebuild_only_their_region() -> None:
+    write_source()
+    write_boundaries()
+    regions = many_regions()
+    isolate_regions(config_path=write_config(regions), processes=1)
+
+    regions["land"]["cleanup"][0]["kernel_size"] = [5, 5]
+    timings = isolate_regions(config_path=write_config(regions), processes=1)
+
+    assert {stage for stage in timings if stage.endswith("up to date")} == {"blue up to date", "outline up to date"}
+    assert any(stage.startswith("land ") and not stage.endswith("up to date") for stage in timings)
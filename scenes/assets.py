@@ -0,0 +1,104 @@
+import os
+from functools import cached_property, lru_cache
+from typing import Self
+
+import numpy as np
+from manim import ManimColor, color_to_int_rgba
+from PIL import Image
+
+from preprocessing.pyramid import build_pyramid
+
+
+class RegionImage:
+    """
+    A region of a map canvas tinted in a solid color and cropped to its opaque pixels, with the offset of the crop,
+    so it can be drawn where it was on the canvas without carrying the transparent rest of the canvas around.
+
+    Region images are shared by every scene in the process through load_region_image, so their pixels are read-only.
+
+    Args:
+        pixels (np.ndarray): The cropped RGBA pixels of the region, of shape (h, w, 4) with straight alpha.
+        offset (tuple[int, int]): The (left, top) pixel of the canvas where the crop starts.
+        canvas_size (tuple[int, int]): The (width, height) of the full canvas in pixels.
+        num_solid_pixels (int): Number of pixels of the region that are solid, see load_region_image.
+    """
+
+    def __init__(
+        self: Self,
+        pixels: np.ndarray,
+        offset: tuple[int, int],
+        canvas_size: tuple[int, int],
+        num_solid_pixels: int,
+    ) -> None:
+        self.pixels = pixels
+        self.pixels.flags.writeable = False
+        self.offset = offset
+        self.canvas_size = canvas_size
+        self.num_solid_pixels = num_solid_pixels
+
+    @property
+    def bbox(self: Self) -> tuple[int, int, int, int]:
+        """
+        The (left, top, right, bottom) of the region on the canvas, like Image.getbbox.
+        """
+        left, top = self.offset
+        h, w, _ = self.pixels.shape
+        return left, top, left + w, top + h
+
+    @cached_property
+    def levels(self: Self) -> list[np.ndarray]:
+        """
+        The mipmap levels of the region, built on first use, for MipmapImageMobject.
+        """
+        return build_pyramid(self.pixels)
+
+
+@lru_cache(maxsize=16)
+def load_region_image_file(
+    mask_path: str,
+    tint: tuple[int, int, int, int],
+    mtime_ns: int,
+    alpha_threshold: int,
+) -> RegionImage:
+    with Image.open(mask_path) as mask_image:
+        # masks are saved as single-channel alpha images
+        alpha = np.asarray(mask_image.getchannel("A") if "A" in mask_image.getbands() else mask_image.convert("L"))
+
+    opaque_rows = np.flatnonzero(alpha.any(axis=1))
+    opaque_cols = np.flatnonzero(alpha.any(axis=0))
+    assert opaque_rows.shape[0] > 0, f"Mask has no opaque pixels: {mask_path}"
+    top, bottom = opaque_rows[0], opaque_rows[-1] + 1
+    left, right = opaque_cols[0], opaque_cols[-1] + 1
+
+    region_alpha = alpha[top:bottom, left:right]  # shape: (h, w)
+    pixels = np.empty((*region_alpha.shape, 4), dtype=np.uint8)  # shape: (h, w, 4)
+    pixels[:, :, :3] = tint[:3]
+    pixels[:, :, 3] = region_alpha
+
+    return RegionImage(
+        pixels,
+        (int(left), int(top)),
+        (alpha.shape[1], alpha.shape[0]),
+        int((region_alpha > alpha_threshold).sum()),
+    )
+
+
+def load_region_image(mask_path: str, color: ManimColor, alpha_threshold: int = 200) -> RegionImage:
+    """
+    The region of an alpha mask image tinted in a color and cropped to its opaque pixels, like pasting the color
+    over the canvas and putting the mask in its alpha channel.
+
+    Region images are cached for the whole process, keyed by the path and modification time of the mask and by the
+    tint, so every scene constructed in the same render shares one decode. They must not be modified in place.
+
+    Args:
+        mask_path (str): Path of the alpha mask image, such as media/ireland_mask.png.
+        color (ManimColor): The tint of the region.
+        alpha_threshold (int): Pixels with alpha above this value count as solid in num_solid_pixels.
+
+    Returns:
+        RegionImage: The tinted region, its offset on the canvas and its number of solid pixels.
+    """
+    tint = tuple(int(channel) for channel in color_to_int_rgba(color))
+
+    return load_region_image_file(mask_path, tint, os.stat(mask_path).st_mtime_ns, alpha_threshold)
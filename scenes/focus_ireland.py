@@ -1,8 +1,10 @@
 from typing import Self
 
 import numpy as np
-from manim import BLUE, RED, ImageMobject, MovingCameraScene, color_to_int_rgba
-from PIL import Image
+from assets import RegionImage, load_region_image
+from manim import BLUE, RED, ImageMobject, MovingCameraScene, Rectangle
+
+from mobjects.mipmap_imagemobject import MipmapImageMobject
 
 
 class FocusIreland(MovingCameraScene):
@@ -11,10 +13,11 @@ class FocusIreland(MovingCameraScene):
 
         start_height = 6
 
-        uk_scene_image = ImageMobject(uk_image)
-        ireland_scene_image = ImageMobject(ireland_image)
-        uk_scene_image.set_height(start_height)
-        ireland_scene_image.set_height(start_height)
+        canvas = self.get_canvas(uk_image, start_height)
+        uk_scene_image = MipmapImageMobject(uk_image.pixels, self.camera, levels=uk_image.levels)
+        ireland_scene_image = MipmapImageMobject(ireland_image.pixels, self.camera, levels=ireland_image.levels)
+        self.place_region_image(uk_image, uk_scene_image, canvas)
+        self.place_region_image(ireland_image, ireland_scene_image, canvas)
 
         self.add(uk_scene_image)
         self.add(ireland_scene_image)
@@ -23,7 +26,7 @@ class FocusIreland(MovingCameraScene):
         uk_fade = uk_scene_image.animate.set_opacity(0)
 
         # zoom in on ireland
-        ireland_bbox = self.get_world_space_bbox(ireland_image, ireland_scene_image)
+        ireland_bbox = self.get_world_space_bbox(ireland_image, canvas)
         ireland_center = np.array(
             [
                 (ireland_bbox[0] + ireland_bbox[1]) / 2,
@@ -38,23 +41,47 @@ class FocusIreland(MovingCameraScene):
 
         self.play(ireland_scene_image.animate.set_opacity(0), run_time=0.5)
 
+    @staticmethod
+    def get_canvas(region: RegionImage, height: float) -> Rectangle:
+        """
+        A rectangle, never drawn, where the full canvas of a region sits in the scene: height world units tall and
+        centered at the origin.
+        """
+        canvas_width, canvas_height = region.canvas_size
+        return Rectangle(width=height * canvas_width / canvas_height, height=height)
+
+    @classmethod
+    def place_region_image(
+        cls: type[Self], region: RegionImage, scene_image: ImageMobject, canvas: Rectangle
+    ) -> ImageMobject:
+        """
+        Scale and move the scene image of a cropped region to where the region is on the placed canvas.
+        """
+        scene_image.set_height(canvas.height * region.pixels.shape[0] / region.canvas_size[1])
+
+        x_min, x_max, y_min, y_max = cls.get_world_space_bbox(region, canvas)
+        scene_image.move_to(np.array([(x_min + x_max) / 2, (y_min + y_max) / 2, 0]))
+
+        return scene_image
+
     @staticmethod
     def get_world_space_bbox(
-        image: Image.Image, scene_image: ImageMobject
+        region: RegionImage, canvas: Rectangle
     ) -> tuple[float, float, float, float]:
-        bbox_image_space = np.array(image.getbbox())
+        bbox_image_space = np.array(region.bbox, dtype=np.float64)
+        canvas_width, canvas_height = region.canvas_size
 
         # convert image-space bbox to world-space
         x_min, y_min, x_max, y_max = bbox_image_space
 
         # flip y-coordinates since manim has y+ going up and most image libraries have y+ going down
-        y_min, y_max = image.height - y_max, image.height - y_min
+        y_min, y_max = canvas_height - y_max, canvas_height - y_min
 
-        # normalize relative to the image size
-        x_min /= image.width
-        x_max /= image.width
-        y_min /= image.height
-        y_max /= image.height
+        # normalize relative to the canvas size
+        x_min /= canvas_width
+        x_max /= canvas_width
+        y_min /= canvas_height
+        y_max /= canvas_height
 
         # make the coordinates relative to center rather than bottom left
         x_min -= 0.5
@@ -62,33 +89,20 @@ class FocusIreland(MovingCameraScene):
         y_min -= 0.5
         y_max -= 0.5
 
-        world_space_center_x, world_space_center_y, _ = scene_image.get_center()
+        world_space_center_x, world_space_center_y, _ = canvas.get_center()
 
         # convert to world-space coordinates
-        x_min = scene_image.width * x_min + world_space_center_x
-        x_max = scene_image.width * x_max + world_space_center_x
-        y_min = scene_image.height * y_min + world_space_center_y
-        y_max = scene_image.height * y_max + world_space_center_y
+        x_min = canvas.width * x_min + world_space_center_x
+        x_max = canvas.width * x_max + world_space_center_x
+        y_min = canvas.height * y_min + world_space_center_y
+        y_max = canvas.height * y_max + world_space_center_y
 
         return x_min, x_max, y_min, y_max
 
     @staticmethod
-    def get_uk_and_ireland_images() -> tuple[Image.Image, Image.Image]:
-        uk_and_ireland_image = Image.open("media/uk_and_ireland.png")
-        uk_mask_image = Image.open("media/uk_mask.png")
-        ireland_mask_image = Image.open("media/ireland_mask.png")
-
-        uk_image = uk_and_ireland_image.copy().convert("RGBA")
-        uk_image.paste(
-            tuple(color_to_int_rgba(BLUE)), (0, 0, uk_image.width, uk_image.height)
-        )
-        uk_image.putalpha(uk_mask_image)
-
-        ireland_image = uk_and_ireland_image.copy().convert("RGBA")
-        ireland_image.paste(
-            tuple(color_to_int_rgba(RED)),
-            (0, 0, ireland_image.width, ireland_image.height),
-        )
-        ireland_image.putalpha(ireland_mask_image)
+    def get_uk_and_ireland_images() -> tuple[RegionImage, RegionImage]:
+        # decoded and tinted once per process, and shared by every scene
+        uk_image = load_region_image("media/uk_mask.png", BLUE)
+        ireland_image = load_region_image("media/ireland_mask.png", RED)
 
         return uk_image, ireland_image
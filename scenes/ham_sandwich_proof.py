@@ -3,7 +3,7 @@ from typing import Self
 import numpy as np
 import torch as th
 from focus_ireland import FocusIreland
-from mobjects.imagemobject import ImageMobject
+from mobjects.mipmap_imagemobject import MipmapImageMobject
 from manim import (
     BLUE,
     DL,
@@ -34,7 +34,8 @@ from manim import (
     rate_functions,
     ManimColor,
 )
-from preprocessing.cutting import count_positive, bisect_angles
+from preprocessing.cutting import KineticBisector, count_positive, bisect_angles
+from transforms import load_world_points
 
 
 class HamSandwichProof(MovingCameraScene):
@@ -43,15 +44,14 @@ class HamSandwichProof(MovingCameraScene):
 
         start_height = 6
 
-        uk_scene_image = ImageMobject(uk_image)
-        ireland_scene_image = ImageMobject(ireland_image)
-        uk_scene_image.set_height(start_height)
-        ireland_scene_image.set_height(start_height)
+        canvas = FocusIreland.get_canvas(uk_image, start_height)
+        uk_scene_image = MipmapImageMobject(uk_image.pixels, self.camera, levels=uk_image.levels)
+        ireland_scene_image = MipmapImageMobject(ireland_image.pixels, self.camera, levels=ireland_image.levels)
+        FocusIreland.place_region_image(uk_image, uk_scene_image, canvas)
+        FocusIreland.place_region_image(ireland_image, ireland_scene_image, canvas)
 
         # zoom in on ireland
-        ireland_bbox = FocusIreland.get_world_space_bbox(
-            ireland_image, ireland_scene_image
-        )
+        ireland_bbox = FocusIreland.get_world_space_bbox(ireland_image, canvas)
         ireland_center = np.array(
             [
                 (ireland_bbox[0] + ireland_bbox[1]) / 2,
@@ -61,27 +61,10 @@ class HamSandwichProof(MovingCameraScene):
         )
         self.camera.frame.scale(0.5).move_to(ireland_center)
 
-        ireland_pixels = th.tensor(np.asarray(ireland_image)).permute(2, 0, 1)  # C, H, W
-        solid_pixels = th.nonzero(ireland_pixels[3] > 200)  # N, 2
-        solid_pixels[:, 0] = ireland_pixels.shape[1] - solid_pixels[:, 0]
-
-        solid_pixels_normalized = (
-            solid_pixels / th.tensor(ireland_pixels.shape[1:]).float()
-        )
-        solid_pixels_normalized -= 0.5
-
-        world_space_shape = th.tensor(
-            [ireland_scene_image.get_height(), ireland_scene_image.get_width()]
-        )
-        solid_pixels_world_space = (
-            solid_pixels_normalized * world_space_shape
-            + th.tensor(ireland_scene_image.get_center()[-2:-4:-1].copy())
-        )
+        # solid pixels of the mask, shared by every scene that places it on the same canvas
+        solid_pixels_world_space_xy = load_world_points("media/ireland_mask.png", canvas)
         ireland_center_tensor = th.tensor(ireland_center[:2])
 
-        # yx -> xy
-        solid_pixels_world_space_xy = th.roll(solid_pixels_world_space, 1, 1)
-
         theta = ValueTracker(0)
         bias = ValueTracker(bisect_angles(solid_pixels_world_space_xy - ireland_center_tensor, th.tensor([theta.get_value()])))
 
@@ -91,7 +74,7 @@ class HamSandwichProof(MovingCameraScene):
 
         self.play(bias.animate.set_value(0), run_time=0.01)
 
-        bias.add_updater(lambda m: self.update_bias_to_bisect(m, solid_pixels_world_space_xy, theta, ireland_center_tensor))
+        bias.add_updater(KineticBisector(solid_pixels_world_space_xy - ireland_center_tensor, theta))
 
         self.play(FadeIn(angle_indicator), FadeIn(ireland_scene_image))
 
@@ -101,21 +84,8 @@ class HamSandwichProof(MovingCameraScene):
 
         self.wait(2)
 
-        uk_pixels = th.tensor(np.asarray(uk_image)).permute(2, 0, 1)  # C, H, W
-        solid_pixels = th.nonzero(uk_pixels[3] > 200)  # N, 2
-        solid_pixels[:, 0] = uk_pixels.shape[1] - solid_pixels[:, 0]
-        solid_pixels_normalized = (
-            solid_pixels / th.tensor(uk_pixels.shape[1:]).float()
-        )
-        solid_pixels_normalized -= 0.5
-        world_space_shape = th.tensor(
-            [uk_scene_image.get_height(), uk_scene_image.get_width()]
-        )
-        solid_pixels_world_space = (
-            solid_pixels_normalized * world_space_shape
-            + th.tensor(uk_scene_image.get_center()[-2:-4:-1].copy())
-        )
-        uk_solid_pixels_world_space_xy = th.roll(solid_pixels_world_space, 1, 1)
+        # solid pixels of the mask, shared by every scene that places it on the same canvas
+        uk_solid_pixels_world_space_xy = load_world_points("media/uk_mask.png", canvas)
 
         covered_ratio = always_redraw(
             lambda: self.draw_covered_ratio(
@@ -242,12 +212,6 @@ class HamSandwichProof(MovingCameraScene):
 
         return always_redraw(update_graph)
 
-    def update_bias_to_bisect(self: Self, bias: ValueTracker, points: th.Tensor, theta: ValueTracker, origin: th.Tensor) -> None:
-        # Update bias using bisect_angles based on the current angle (theta) and solid pixels
-        transformed_points = points - origin
-        new_bias = bisect_angles(transformed_points, th.tensor([theta.get_value()]))
-        bias.set_value(new_bias)
-
     def draw_angle_circle(self: Self, theta: ValueTracker) -> VGroup:
         relative_radius = 0.05
         radius = relative_radius * self.camera.frame.width
@@ -22,7 +22,6 @@ from manim import (
     Circle,
     FadeIn,
     FadeOut,
-    ImageMobject,
     Line,
     MovingCameraScene,
     Polygon,
@@ -32,7 +31,9 @@ from manim import (
     always_redraw,
     rate_functions,
 )
-from preprocessing.cutting import count_positive, bisect_angles
+from mobjects.mipmap_imagemobject import MipmapImageMobject
+from preprocessing.cutting import KineticBisector, count_positive, bisect_angles
+from transforms import load_world_points
 
 
 class IVTProof(MovingCameraScene):
@@ -41,15 +42,14 @@ class IVTProof(MovingCameraScene):
 
         start_height = 6
 
-        uk_scene_image = ImageMobject(uk_image)
-        ireland_scene_image = ImageMobject(ireland_image)
-        uk_scene_image.set_height(start_height)
-        ireland_scene_image.set_height(start_height)
+        canvas = FocusIreland.get_canvas(uk_image, start_height)
+        uk_scene_image = MipmapImageMobject(uk_image.pixels, self.camera, levels=uk_image.levels)
+        ireland_scene_image = MipmapImageMobject(ireland_image.pixels, self.camera, levels=ireland_image.levels)
+        FocusIreland.place_region_image(uk_image, uk_scene_image, canvas)
+        FocusIreland.place_region_image(ireland_image, ireland_scene_image, canvas)
 
         # zoom in on ireland
-        ireland_bbox = FocusIreland.get_world_space_bbox(
-            ireland_image, ireland_scene_image
-        )
+        ireland_bbox = FocusIreland.get_world_space_bbox(ireland_image, canvas)
         ireland_center = np.array(
             [
                 (ireland_bbox[0] + ireland_bbox[1]) / 2,
@@ -91,30 +91,13 @@ class IVTProof(MovingCameraScene):
 
         self.play(FadeIn(positive_side), run_time=0.5)
 
-        ireland_pixels = th.tensor(np.asarray(ireland_image)).permute(2, 0, 1)  # C, H, W
-        solid_pixels = th.nonzero(ireland_pixels[3] > 200)  # N, 2
-        solid_pixels[:, 0] = ireland_pixels.shape[1] - solid_pixels[:, 0]
-
-        solid_pixels_normalized = (
-            solid_pixels / th.tensor(ireland_pixels.shape[1:]).float()
-        )
-        solid_pixels_normalized -= 0.5
-
-        world_space_shape = th.tensor(
-            [ireland_scene_image.get_height(), ireland_scene_image.get_width()]
-        )
-        solid_pixels_world_space = (
-            solid_pixels_normalized * world_space_shape
-            + th.tensor(ireland_scene_image.get_center()[-2:-4:-1].copy())
-        )
+        # solid pixels of the mask, shared by every scene that places it on the same canvas
+        solid_pixels_world_space_xy = load_world_points("media/ireland_mask.png", canvas)
 
         bias_of_ireland_center = ireland_center[:2] @ np.array(
             [np.cos(theta.get_value()), np.sin(theta.get_value())]
         )
 
-        # yx -> xy
-        solid_pixels_world_space_xy = th.roll(solid_pixels_world_space, 1, 1)
-
         self.wait(1)
 
         covered_ratio = always_redraw(
@@ -172,18 +155,12 @@ class IVTProof(MovingCameraScene):
 
         self.play(FadeOut(halfway_line), FadeOut(halfway_line_label), FadeOut(graph))
 
-        bias.add_updater(lambda m: self.update_bias_to_bisect(m, solid_pixels_world_space_xy, theta, th.tensor(ireland_center[:2])))
+        bias.add_updater(KineticBisector(solid_pixels_world_space_xy - th.tensor(ireland_center[:2]), theta))
 
         self.play(theta.animate.set_value(2 * PI), run_time=10)
 
         self.wait(2)
 
-    def update_bias_to_bisect(self: Self, bias: ValueTracker, points: th.Tensor, theta: ValueTracker, origin: th.Tensor) -> None:
-        # Update bias using bisect_angles based on the current angle (theta) and solid pixels
-        transformed_points = points - origin
-        new_bias = bisect_angles(transformed_points, th.tensor([theta.get_value()]))
-        bias.set_value(new_bias)
-
     def draw_covered_graph(self: Self, bias: ValueTracker, points: th.Tensor, theta: ValueTracker, bias_of_ireland_center: float, generate_graph: ValueTracker) -> VGroup:
         last_point = None
 
@@ -0,0 +1,79 @@
+from typing import Self, Any
+
+import numpy as np
+from manim import Camera
+
+from mobjects.imagemobject import ImageMobject
+from preprocessing.pyramid import build_pyramid
+
+
+class MipmapImageMobject(ImageMobject):
+    """
+    An image that is drawn from the level of its mipmap pyramid closest to its size on screen, so that zooming the
+    camera out does not resample a texture several times larger than the pixels it covers.
+
+    Opacity is tracked separately from the pixels, since set_opacity and fades only change the full resolution
+    level, and applied to the smaller levels when they are drawn.
+
+    Args:
+        filename_or_array: The image, as for ImageMobject.
+        camera (Camera): The camera of the scene, whose frame and pixel sizes decide the level.
+        levels (list[np.ndarray] | None): Precomputed levels, such as RegionImage.levels. They are built
+            from the image by default.
+        **kwargs: Passed to ImageMobject.
+
+    Example:
+        >>> ireland_scene_image = MipmapImageMobject(ireland_image, self.camera).set_height(6)
+    """
+
+    def __init__(
+        self: Self,
+        filename_or_array: Any,
+        camera: Camera,
+        levels: list[np.ndarray] | None = None,
+        **kwargs: Any,
+    ) -> None:
+        self.opacity = 1.0
+        super().__init__(filename_or_array, **kwargs)
+
+        self.camera = camera
+        self.levels = build_pyramid(np.asarray(self.pixel_array, dtype=np.uint8)) if levels is None else levels
+
+    def __deepcopy__(self: Self, memo: dict) -> Self:
+        # copies made for animations share the camera and the levels, which are never modified
+        memo[id(self.camera)] = self.camera
+        memo[id(self.levels)] = self.levels
+
+        return super().__deepcopy__(memo)
+
+    def set_opacity(self: Self, alpha: float) -> Self:
+        # like ImageMobject.set_opacity, this scales the current opacity
+        self.opacity *= alpha
+        return super().set_opacity(alpha)
+
+    def interpolate_color(self: Self, mobject1: ImageMobject, mobject2: ImageMobject, alpha: float) -> None:
+        super().interpolate_color(mobject1, mobject2, alpha)
+        self.opacity = (1 - alpha) * getattr(mobject1, "opacity", 1.0) + alpha * getattr(mobject2, "opacity", 1.0)
+
+    def level_index(self: Self) -> int:
+        """
+        Index of the smallest level that is still at least as wide as the image on screen.
+        """
+        screen_width = self.width / self.camera.frame_width * self.camera.pixel_width
+
+        index = 0
+        while index + 1 < len(self.levels) and self.levels[index + 1].shape[1] >= screen_width:
+            index += 1
+
+        return index
+
+    def get_pixel_array(self: Self) -> np.ndarray:
+        index = self.level_index()
+        if index == 0:
+            return self.pixel_array
+
+        level = self.levels[index].copy()
+        level[:, :, 3] = (level[:, :, 3] * self.opacity).astype(np.uint8)
+
+        return level
+
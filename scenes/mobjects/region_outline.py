@@ -0,0 +1,59 @@
+from typing import Self, Any
+
+import numpy as np
+from manim import Mobject, VMobject
+
+from preprocessing.contours import MIN_CONTOUR_AREA, load_or_build_contours
+from transforms import PixelTransform
+
+
+class RegionOutline(VMobject):
+    """
+    The outline of a region as a vector shape, traced from its alpha mask and placed over the canvas the mask covers.
+    Every contour becomes a closed subpath of straight segments, and since holes run the other way around than the
+    outer boundaries, filling the shape leaves them empty.
+
+    Args:
+        mask_path (str): Path of the alpha mask image, such as media/ireland_mask.png.
+        canvas (Mobject): Where the full canvas of the mask is placed in the scene, such as the rectangle of
+            FocusIreland.get_canvas.
+        contours_path (str | None): Path of the contours, see load_or_build_contours.
+        alpha_threshold (int): Pixels with alpha above this value are inside the region.
+        tolerance (float): Maximum distance in pixels between the outline and the mask's boundary.
+        min_area (float): Minimum area in pixels of the contours to keep.
+        **kwargs: Passed to VMobject, such as fill_color, fill_opacity and stroke_width.
+
+    Example:
+        >>> canvas = FocusIreland.get_canvas(ireland_image, 6)
+        >>> outline = RegionOutline("media/ireland_mask.png", canvas, fill_color=GREEN, fill_opacity=0.5)
+    """
+
+    def __init__(
+        self: Self,
+        mask_path: str,
+        canvas: Mobject,
+        contours_path: str | None = None,
+        alpha_threshold: int = 200,
+        tolerance: float = 1.0,
+        min_area: float = MIN_CONTOUR_AREA,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(**kwargs)
+
+        contours, metadata = load_or_build_contours(
+            mask_path,
+            contours_path,
+            alpha_threshold=alpha_threshold,
+            tolerance=tolerance,
+            min_area=min_area,
+        )
+
+        # same placement as the point clouds of load_world_points
+        transform = PixelTransform.from_mobject(canvas, (metadata["width"], metadata["height"]))
+
+        for contour in contours:
+            world_xy = transform.to_world(contour[:, ::-1].copy()).numpy()  # shape: (V, 2) from (row, col)
+            points = np.concatenate([world_xy, np.zeros((world_xy.shape[0], 1))], axis=1)  # shape: (V, 3)
+
+            self.start_new_path(points[0])
+            self.add_points_as_corners([*points[1:], points[0]])
@@ -0,0 +1,274 @@
+from typing import Self
+
+import numpy as np
+import torch as th
+from PIL import Image
+
+WORD_BITS = 64
+
+# PIL packs "1" images most significant bit first, BitMask packs least significant bit first
+REVERSED_BITS = np.array([int(f"{byte:08b}"[::-1], 2) for byte in range(256)], dtype=np.uint8)
+
+
+def logical_right_shift(words: th.Tensor, shift: int) -> th.Tensor:
+    """
+    Shift int64 words right without sign extension.
+    """
+    if shift == 0:
+        return words
+
+    return (words >> shift) & ((1 << (WORD_BITS - shift)) - 1)
+
+
+class BitMask:
+    """
+    Binary mask of shape (H, W) packed 64 pixels per int64 word, one row of words per image row.
+    Pixel x of a row is bit x % 64 of word x // 64, and the bits past the width are always zero.
+
+    Boolean operations, neighbor counting, erosion and dilation all work on whole words, so a mask takes 1/8 of
+    the memory of a th.BoolTensor and 1/32 of the int32 tensor that filter_for_n_neighbors convolves.
+
+    Args:
+        words (th.Tensor): Packed words of shape (H, ceil(W / 64)).
+        width (int): Width of the mask in pixels.
+    """
+
+    def __init__(self: Self, words: th.Tensor, width: int) -> None:
+        assert words.ndim == 2 and words.dtype == th.int64, "Words must be an int64 tensor of shape (H, num_words)."
+        assert words.shape[1] == -(-width // WORD_BITS), "Number of words does not match the width."
+
+        self.words = words
+        self.width = width
+
+    @property
+    def shape(self: Self) -> tuple[int, int]:
+        return self.words.shape[0], self.width
+
+    @property
+    def valid_bits(self: Self) -> th.Tensor:
+        """
+        Per-word mask of the bits that hold pixels, of shape (num_words,).
+        """
+        valid = th.full((self.words.shape[1],), -1, dtype=th.int64)
+        remainder = self.width % WORD_BITS
+        if remainder:
+            valid[-1] = (1 << remainder) - 1
+
+        return valid
+
+    @classmethod
+    def from_numpy(cls: type[Self], mask: np.ndarray) -> Self:
+        assert mask.ndim == 2, "Mask must be a 2D array of shape (H, W)."
+
+        h, w = mask.shape
+        packed = np.packbits(mask.astype(bool, copy=False), axis=1, bitorder="little")
+        words = np.zeros((h, -(-w // WORD_BITS) * 8), dtype=np.uint8)
+        words[:, : packed.shape[1]] = packed
+
+        return cls(th.from_numpy(words.view(np.int64)), w)
+
+    @classmethod
+    def from_tensor(cls: type[Self], mask: th.BoolTensor) -> Self:
+        return cls.from_numpy(mask.numpy())
+
+    @classmethod
+    def from_pil(cls: type[Self], image: Image.Image, threshold: int = 0) -> Self:
+        """
+        Pack a mode "1" image directly from its packed bytes, or any other image as its pixels above threshold.
+        """
+        if image.mode != "1":
+            return cls.from_numpy(np.asarray(image.convert("L")) > threshold)
+
+        w, h = image.size
+        packed = REVERSED_BITS[np.frombuffer(image.tobytes(), dtype=np.uint8).reshape(h, -1)]
+        words = np.zeros((h, -(-w // WORD_BITS) * 8), dtype=np.uint8)
+        words[:, : packed.shape[1]] = packed
+
+        return cls(th.from_numpy(words.view(np.int64)), w)
+
+    def to_numpy(self: Self) -> np.ndarray:
+        packed = self.words.numpy().view(np.uint8)
+
+        return np.unpackbits(packed, axis=1, count=self.width, bitorder="little").view(bool)
+
+    def to_tensor(self: Self) -> th.BoolTensor:
+        return th.from_numpy(self.to_numpy())
+
+    def to_pil(self: Self) -> Image.Image:
+        h, w = self.shape
+        packed = REVERSED_BITS[self.words.numpy().view(np.uint8)[:, : -(-w // 8)]]
+
+        return Image.frombytes("1", (w, h), packed.tobytes())
+
+    def with_words(self: Self, words: th.Tensor) -> Self:
+        return BitMask(words, self.width)
+
+    def __or__(self: Self, other: Self) -> Self:
+        return self.with_words(self.words | other.words)
+
+    def __and__(self: Self, other: Self) -> Self:
+        return self.with_words(self.words & other.words)
+
+    def __xor__(self: Self, other: Self) -> Self:
+        return self.with_words(self.words ^ other.words)
+
+    def __invert__(self: Self) -> Self:
+        return self.with_words(~self.words & self.valid_bits)
+
+    def count(self: Self) -> int:
+        """
+        Number of set pixels.
+        """
+        return int(np.unpackbits(self.words.numpy().view(np.uint8)).sum())
+
+    def shift_columns(self: Self, shift: int) -> Self:
+        """
+        Move every pixel shift columns to the right (or left if negative), filling with unset pixels.
+        """
+        word_shift, bit_shift = divmod(abs(shift), WORD_BITS)
+        words = self.words
+        num_words = words.shape[1]
+
+        if word_shift >= num_words:
+            return self.with_words(th.zeros_like(words))
+
+        shifted = th.zeros_like(words)
+        if shift >= 0:
+            shifted[:, word_shift:] = words[:, : num_words - word_shift]
+            if bit_shift:
+                carried = th.zeros_like(words)
+                carried[:, 1:] = logical_right_shift(shifted[:, :-1], WORD_BITS - bit_shift)
+                shifted = (shifted << bit_shift) | carried
+            shifted &= self.valid_bits
+        else:
+            shifted[:, : num_words - word_shift] = words[:, word_shift:]
+            if bit_shift:
+                carried = th.zeros_like(words)
+                carried[:, :-1] = shifted[:, 1:] << (WORD_BITS - bit_shift)
+                shifted = logical_right_shift(shifted, bit_shift) | carried
+
+        return self.with_words(shifted)
+
+    def shift_rows(self: Self, shift: int) -> Self:
+        """
+        Move every pixel shift rows down (or up if negative), filling with unset pixels.
+        """
+        h = self.words.shape[0]
+        shifted = th.zeros_like(self.words)
+
+        if abs(shift) < h:
+            if shift >= 0:
+                shifted[shift:] = self.words[: h - shift]
+            else:
+                shifted[: h + shift] = self.words[-shift:]
+
+        return self.with_words(shifted)
+
+    def window_reduce(self: Self, window: int, columns: bool, combine: str) -> Self:
+        """
+        OR or AND over a centered window along rows or columns, with log2(window) word operations per word.
+        """
+        operator = (lambda a, b: a | b) if combine == "or" else (lambda a, b: a & b)
+
+        # reduce each half separately, so nothing ever has to be shifted past the edge and back
+        halves = []
+        for direction in (1, -1):
+            # doubling: after each step the accumulator covers offsets [0, span) in this direction
+            reduced, span, length = self, 1, window // 2 + 1
+            while span * 2 <= length:
+                reduced = operator(reduced, reduced.shift(direction * span, columns))
+                span *= 2
+            if span < length:
+                reduced = operator(reduced, reduced.shift(direction * (length - span), columns))
+            halves.append(reduced)
+
+        return operator(*halves)
+
+    def shift(self: Self, offset: int, columns: bool) -> Self:
+        return self.shift_columns(offset) if columns else self.shift_rows(offset)
+
+    def dilate(self: Self, kernel_size: int = 3) -> Self:
+        """
+        Dilate using a square structuring element, like erode_dilate.dilate.
+        """
+        assert kernel_size % 2 == 1, "Kernel size must be odd."
+
+        return self.window_reduce(kernel_size, True, "or").window_reduce(kernel_size, False, "or")
+
+    def erode(self: Self, kernel_size: int = 3) -> Self:
+        """
+        Erode using a square structuring element, like erode_dilate.erode. Pixels outside of the mask count as
+        background.
+        """
+        assert kernel_size % 2 == 1, "Kernel size must be odd."
+
+        return self.window_reduce(kernel_size, True, "and").window_reduce(kernel_size, False, "and")
+
+    def count_neighbors(self: Self, kernel_size: int = 3) -> list[Self]:
+        """
+        Number of set pixels in the square neighborhood of every pixel, as bit planes from least to most
+        significant, added up with bit-sliced adders.
+        """
+        assert kernel_size % 2 == 1, "Kernel size must be odd."
+        radius = kernel_size // 2
+
+        row_counts = []
+        for offset in range(-radius, radius + 1):
+            row_counts = add_bit_planes(row_counts, [self.shift_columns(offset)])
+
+        counts = []
+        for offset in range(-radius, radius + 1):
+            counts = add_bit_planes(counts, [plane.shift_rows(offset) for plane in row_counts])
+
+        return counts
+
+    def filter_for_n_neighbors(self: Self, n_neighbors: int = 1, kernel_size: int = 3) -> Self:
+        """
+        Keep only pixels with at least n_neighbors set pixels in their neighborhood, like
+        erode_dilate.filter_for_n_neighbors, comparing the bit-sliced counts against n_neighbors word by word.
+        """
+        assert n_neighbors > 0 and n_neighbors <= kernel_size**2, (
+            "Invalid number of neighbors, must be in [1, kernel_size ** 2]."
+        )
+
+        counts = self.count_neighbors(kernel_size)
+        if n_neighbors >= 1 << len(counts):
+            return self.with_words(th.zeros_like(self.words))
+
+        # compare from the most significant bit down, tracking where the count is already greater or still equal
+        valid = self.valid_bits
+        greater = th.zeros_like(self.words)
+        equal = th.zeros_like(self.words) | valid
+        for bit in reversed(range(len(counts))):
+            plane = counts[bit].words
+            if (n_neighbors >> bit) & 1:
+                equal = equal & plane
+            else:
+                greater = greater | (equal & plane)
+                equal = equal & ~plane
+
+        return self.with_words((greater | equal) & valid)
+
+
+def add_bit_planes(a: list[BitMask], b: list[BitMask]) -> list[BitMask]:
+    """
+    Add two bit-sliced counters, given as bit planes from least to most significant, with a ripple-carry adder.
+    """
+    if not a:
+        return list(b)
+    if not b:
+        return list(a)
+
+    zero = a[0].with_words(th.zeros_like(a[0].words))
+    total, carry = [], zero
+    for bit in range(max(len(a), len(b))):
+        a_bit = a[bit] if bit < len(a) else zero
+        b_bit = b[bit] if bit < len(b) else zero
+        partial = a_bit ^ b_bit
+        total.append(partial ^ carry)
+        carry = (a_bit & b_bit) | (carry & partial)
+
+    if carry.words.any():
+        total.append(carry)
+
+    return total
@@ -0,0 +1,300 @@
+import ast
+import hashlib
+import json
+import os
+from collections.abc import Callable, Sequence
+from concurrent.futures import Executor, as_completed
+from typing import Any, Self
+
+from preprocessing.cache import cache_location
+
+PREPROCESSING_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def file_hash(path: str, chunk_size: int = 1 << 20) -> str:
+    """
+    SHA-1 of the contents of a file, read in chunks so that large source maps are never fully in memory.
+    """
+    digest = hashlib.sha1()
+    with open(path, "rb") as file:
+        while chunk := file.read(chunk_size):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+def preprocessing_sources() -> list[str]:
+    """
+    Paths of every module of the preprocessing package, leaving out its tests. Paths are relative to the working
+    directory, like the paths of the assets, so the manifest survives moving the checkout.
+    """
+    return sorted(
+        os.path.relpath(os.path.join(PREPROCESSING_DIR, name))
+        for name in os.listdir(PREPROCESSING_DIR)
+        if name.endswith(".py") and not name.startswith("test_")
+    )
+
+
+def imported_sources(paths: Sequence[str]) -> list[str]:
+    """
+    Paths of the modules of the preprocessing package that source files import, directly or through each other,
+    relative to the working directory like preprocessing_sources.
+    """
+    found, unread = set(), list(paths)
+    while unread:
+        with open(unread.pop()) as file:
+            tree = ast.parse(file.read())
+
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                modules = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module is not None:
+                # from preprocessing import tiles imports a module too
+                modules = [node.module, *(f"{node.module}.{alias.name}" for alias in node.names)]
+            else:
+                continue
+
+            for module in modules:
+                package, _, name = module.partition(".")
+                if package != "preprocessing" or not name or "." in name:
+                    continue
+
+                path = os.path.relpath(os.path.join(PREPROCESSING_DIR, f"{name}.py"))
+                if path not in found and os.path.exists(path):
+                    found.add(path)
+                    unread.append(path)
+
+    return sorted(found)
+
+
+class BuildStep:
+    """
+    One step of a BuildGraph, producing some output files from some input files and parameters.
+
+    Args:
+        name (str): Name of the step, unique within its graph.
+        build (Callable[[], Any]): Writes the outputs, and may return something to report, such as timings.
+        inputs (Sequence[str]): Paths of the files the step reads, which may be the outputs of other steps.
+        outputs (Sequence[str]): Paths of the files the step writes.
+        params (dict): Parameters of the step, anything with a stable repr such as colors and mask expressions.
+        code (Sequence[str]): Paths of source files whose changes should rebuild the step, along with the modules of
+            the preprocessing package they import. Steps without code depend on every module of the package.
+    """
+
+    def __init__(
+        self: Self,
+        name: str,
+        build: Callable[[], Any],
+        inputs: Sequence[str],
+        outputs: Sequence[str],
+        params: dict,
+        code: Sequence[str],
+    ) -> None:
+        self.name = name
+        self.build = build
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.params = params
+        # scripts see their own __file__ as an absolute path, and assets are relative to the working directory
+        self.code = [os.path.relpath(path) for path in code]
+
+
+class BuildGraph:
+    """
+    A small incremental build of media assets, which only rebuilds the steps whose inputs, parameters or code
+    changed since they were last built, or whose outputs were deleted or edited.
+
+    Every step is recorded in a JSON manifest under its name, with a signature hashing the contents of its inputs,
+    the repr of its parameters and the source of its code, and the hashes of the outputs it wrote. Hashes of files
+    are reused while their size and modification time are unchanged, so an up to date graph does not read the
+    source maps at all.
+
+    Args:
+        manifest_path (str | None): Where to keep the manifest, build_manifest.json under the cache root by default.
+
+    Example:
+        >>> graph = BuildGraph()
+        >>> graph.add(
+        ...     "uk",
+        ...     lambda: isolate_region(SOURCE_PATH, UK_MASK, UK_MASK.halo, "media/uk_mask.png", "media/uk.png"),
+        ...     inputs=[SOURCE_PATH],
+        ...     outputs=["media/uk_mask.png", "media/uk.png"],
+        ...     params={"mask": UK_MASK},
+        ... )
+        >>> list(graph.run())
+        ['uk']
+        >>> list(graph.run())
+        []
+    """
+
+    def __init__(self: Self, manifest_path: str | None = None) -> None:
+        manifest_path = cache_location("build_manifest.json") if manifest_path is None else manifest_path
+        self.manifest_path = manifest_path
+        self.steps = {}
+
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as file:
+                self.manifest = json.load(file)
+        else:
+            self.manifest = {"files": {}, "steps": {}}
+
+    def add(
+        self: Self,
+        name: str,
+        build: Callable[[], Any],
+        inputs: Sequence[str],
+        outputs: Sequence[str],
+        params: dict | None = None,
+        code: Sequence[str] = (),
+    ) -> None:
+        assert name not in self.steps, f"Step {name} is already in the graph."
+
+        self.steps[name] = BuildStep(name, build, inputs, outputs, params or {}, code)
+
+    def cached_file_hash(self: Self, path: str) -> str:
+        """
+        Hash of a file, reused from the manifest while the size and modification time of the file are unchanged.
+        """
+        stat = os.stat(path)
+        stamp = [stat.st_size, stat.st_mtime_ns]
+
+        cached = self.manifest["files"].get(path)
+        if cached is None or cached["stamp"] != stamp:
+            cached = {"stamp": stamp, "hash": file_hash(path)}
+            self.manifest["files"][path] = cached
+
+        return cached["hash"]
+
+    def signature(self: Self, step: BuildStep) -> str:
+        digest = hashlib.sha1()
+
+        for path in step.inputs:
+            digest.update(f"input {path} {self.cached_file_hash(path)}\n".encode())
+        for name, value in sorted(step.params.items()):
+            digest.update(f"param {name} {value!r}\n".encode())
+        code = step.code + imported_sources(step.code) if step.code else preprocessing_sources()
+        for path in sorted(set(code)):
+            digest.update(f"code {path} {self.cached_file_hash(path)}\n".encode())
+
+        return digest.hexdigest()
+
+    def is_stale(self: Self, step: BuildStep, signature: str) -> bool:
+        recorded = self.manifest["steps"].get(step.name)
+        if recorded is None or recorded["signature"] != signature:
+            return True
+
+        # outputs that were deleted or edited by hand since the build are rebuilt too
+        return any(
+            not os.path.exists(path) or self.cached_file_hash(path) != recorded["outputs"].get(path)
+            for path in step.outputs
+        )
+
+    def ordered_steps(self: Self) -> list[BuildStep]:
+        """
+        Steps in an order where every step comes after the steps that produce its inputs.
+        """
+        producers = {path: step for step in self.steps.values() for path in step.outputs}
+        ordered, visiting, done = [], set(), set()
+
+        def visit(step: BuildStep) -> None:
+            if step.name in done:
+                return
+            assert step.name not in visiting, f"Step {step.name} depends on its own outputs."
+
+            visiting.add(step.name)
+            for path in step.inputs:
+                if path in producers:
+                    visit(producers[path])
+            visiting.remove(step.name)
+
+            done.add(step.name)
+            ordered.append(step)
+
+        for step in self.steps.values():
+            visit(step)
+
+        return ordered
+
+    def waves(self: Self) -> list[list[BuildStep]]:
+        """
+        Steps grouped so that every step only depends on steps of earlier groups, so the steps of a group can be
+        built concurrently.
+        """
+        producers = {path: step for step in self.steps.values() for path in step.outputs}
+        ordered = self.ordered_steps()
+
+        levels = {}
+        for step in ordered:
+            levels[step.name] = 1 + max(
+                (levels[producers[path].name] for path in step.inputs if path in producers), default=-1
+            )
+
+        waves = [[] for _ in range(max(levels.values(), default=-1) + 1)]
+        for step in ordered:
+            waves[levels[step.name]].append(step)
+
+        return waves
+
+    def run(
+        self: Self,
+        force: bool = False,
+        executor: Executor | None = None,
+        before_build: Callable[[], None] | None = None,
+    ) -> dict[str, Any]:
+        """
+        Build every stale step, after the steps it depends on, and save the manifest.
+
+        Args:
+            force (bool): Rebuild every step, even if it is up to date.
+            executor (Executor | None): If given, the stale steps of each wave are built concurrently on it. Their
+                build functions must then be picklable for process pools.
+            before_build (Callable[[], None] | None): Called once before the first build, to prepare what the
+                steps share, only if anything is stale.
+
+        Returns:
+            dict[str, Any]: What the build function of each step that was built returned, keyed by step name.
+        """
+        results = {}
+
+        for wave in self.waves():
+            # signatures are taken after the steps producing the inputs have run, so their changes propagate
+            stale = []
+            for step in wave:
+                signature = self.signature(step)
+                if force or self.is_stale(step, signature):
+                    stale.append((step, signature))
+
+            if not stale:
+                continue
+            if before_build is not None and not results:
+                before_build()
+
+            if executor is None:
+                for step, signature in stale:
+                    results[step.name] = step.build()
+                    self.record(step, signature)
+            else:
+                futures = {executor.submit(step.build): (step, signature) for step, signature in stale}
+                for future in as_completed(futures):
+                    step, signature = futures[future]
+                    results[step.name] = future.result()
+                    self.record(step, signature)
+
+        return results
+
+    def record(self: Self, step: BuildStep, signature: str) -> None:
+        self.manifest["steps"][step.name] = {
+            "signature": signature,
+            "outputs": {path: self.cached_file_hash(path) for path in step.outputs},
+        }
+
+        # save after every step, so an interrupted run keeps what it already built
+        self.save()
+
+    def save(self: Self) -> None:
+        os.makedirs(os.path.dirname(self.manifest_path) or ".", exist_ok=True)
+
+        partial_path = f"{self.manifest_path}.partial"
+        with open(partial_path, "w") as file:
+            json.dump(self.manifest, file, indent=2, sort_keys=True)
+        os.replace(partial_path, self.manifest_path)
@@ -0,0 +1,11 @@
+import os
+
+# the directory under which every cache of the preprocessing package is kept, relative to the working directory
+CACHE_DIR = ".cache"
+
+
+def cache_location(*parts: str) -> str:
+    """
+    Path of a cache under CACHE_DIR, which is read on every call so that it can be redirected, as the tests do.
+    """
+    return os.path.join(CACHE_DIR, *parts)
@@ -0,0 +1,94 @@
+import hashlib
+import math
+import os
+import tempfile
+from collections.abc import Sequence
+from functools import lru_cache
+
+import torch as th
+
+from preprocessing.cache import cache_location
+
+NUM_COLORS = 1 << 24
+
+
+def rgb_indices(rgb: th.Tensor) -> th.Tensor:
+    """
+    Index of each color in a lookup table over all 24-bit colors, from an integer tensor of shape (..., 3).
+    """
+    rgb = rgb.to(th.int32)
+
+    return (rgb[..., 0] << 16) | (rgb[..., 1] << 8) | rgb[..., 2]
+
+
+def build_palette_lut(palette: Sequence[tuple[int, int, int]], delta: float) -> th.CharTensor:
+    """
+    Build a lookup table from every 24-bit RGB color to the index of its nearest palette color, or -1 if no palette
+    color is within delta. Only the cubes of side 2 * delta around the palette colors can be labelled, so those are
+    the only colors whose distances are computed.
+
+    Args:
+        palette (Sequence[tuple[int, int, int]]): RGB colors to label, at most 127.
+        delta (float): Maximum distance between a color and a palette color for the color to get its label.
+
+    Returns:
+        th.CharTensor: An int8 tensor of shape (2 ** 24,), indexed by rgb_indices.
+    """
+    assert 0 < len(palette) <= th.iinfo(th.int8).max, "Palette must have between 1 and 127 colors."
+
+    palette_tensor = th.tensor(palette, dtype=th.int32)  # shape: (P, 3)
+    radius = math.ceil(delta)
+    offsets = th.arange(-radius, radius + 1, dtype=th.int32)
+
+    # every color in the cube around each palette color, shape: (C, 3)
+    candidates = th.cat(
+        [
+            th.cartesian_prod(*[(offsets + channel).clamp(0, 255).unique() for channel in color.tolist()])
+            for color in palette_tensor
+        ]
+    )
+    candidates = th.unique(rgb_indices(candidates))  # shape: (C,)
+    candidate_rgb = th.stack([candidates >> 16, (candidates >> 8) & 255, candidates & 255], dim=1)
+
+    squared_distances = th.zeros(candidates.shape[0], len(palette), dtype=th.int32)  # shape: (C, P)
+    for channel in range(3):
+        channel_diff = candidate_rgb[:, channel, None] - palette_tensor[:, channel]  # shape: (C, P)
+        squared_distances += channel_diff * channel_diff
+
+    nearest_distances, labels = squared_distances.min(dim=1)  # shape: (C,)
+    close = nearest_distances < delta**2
+
+    lut = th.full((NUM_COLORS,), -1, dtype=th.int8)
+    lut[candidates[close].long()] = labels[close].to(th.int8)
+
+    return lut
+
+
+@lru_cache(maxsize=4)
+def load_or_build_palette_lut(
+    palette: tuple[tuple[int, int, int], ...],
+    delta: float,
+    cache_dir: str | None = None,
+) -> th.CharTensor:
+    """
+    Like build_palette_lut, but cache the table on disk keyed by the palette and delta, and in memory for the most
+    recently used palettes. Tables are saved in palette_luts under the cache root unless cache_dir is given. The
+    returned table is shared and must not be modified in place.
+    """
+    cache_dir = cache_location("palette_luts") if cache_dir is None else cache_dir
+    key = hashlib.sha1(f"{palette}-{float(delta)}".encode())
+    cache_path = os.path.join(cache_dir, f"{key.hexdigest()}.pt")
+
+    if os.path.exists(cache_path):
+        return th.load(cache_path)
+
+    lut = build_palette_lut(palette, delta)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    # only complete tables ever appear under the final name, and the strips of a mask may save the same one at once
+    fd, partial_path = tempfile.mkstemp(suffix=".partial", dir=cache_dir)
+    os.close(fd)
+    th.save(lut, partial_path)
+    os.replace(partial_path, cache_path)
+
+    return lut
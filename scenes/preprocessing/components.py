@@ -0,0 +1,179 @@
+import torch as th
+
+
+def neighbor_pairs(mask: th.BoolTensor, connectivity: int) -> tuple[th.Tensor, th.Tensor]:
+    """
+    Flat indices of every pair of neighboring set pixels in a (H, W) mask.
+    """
+    h, w = mask.shape
+    indices = th.arange(h * w).reshape(h, w)
+
+    match connectivity:
+        case 4:
+            offsets = ((0, 1), (1, 0))
+        case 8:
+            offsets = ((0, 1), (1, 0), (1, 1), (1, -1))
+        case _:
+            raise ValueError("Connectivity must be 4 or 8.")
+
+    sources, targets = [], []
+    for dy, dx in offsets:
+        # the pixel and its neighbor at (dy, dx), restricted to where both are inside the mask
+        x_start, x_end = max(0, -dx), w - max(0, dx)
+        pixel = (slice(0, h - dy), slice(x_start, x_end))
+        neighbor = (slice(dy, h), slice(x_start + dx, x_end + dx))
+
+        both_set = mask[pixel] & mask[neighbor]
+        sources.append(indices[pixel][both_set])
+        targets.append(indices[neighbor][both_set])
+
+    return th.cat(sources), th.cat(targets)
+
+
+def pixel_runs(mask: th.BoolTensor) -> tuple[th.Tensor, int]:
+    """
+    Provisional label of every set pixel of a (H, W) mask: the index of the horizontal run of set pixels it is in,
+    counting runs in raster order. Labels of unset pixels are meaningless.
+
+    Returns:
+        runs (th.Tensor): Run index of each pixel, of shape (H * W,).
+        num_runs (int): Number of runs R.
+    """
+    previous = th.zeros_like(mask)
+    previous[:, 1:] = mask[:, :-1]
+    run_starts = (mask & ~previous).flatten()
+
+    return th.cumsum(run_starts, dim=0) - 1, int(run_starts.sum().item())
+
+
+def label_components(
+    mask: th.BoolTensor, connectivity: int = 8
+) -> tuple[th.Tensor, int]:
+    """
+    Label the connected components of a binary mask in two passes over provisional labels, as in a raster-scan
+    union-find. The first pass labels every horizontal run of set pixels and records which runs touch, the
+    equivalences between runs are resolved with a vectorized union-find, and the second pass gives every pixel the
+    final label of its run.
+
+    The union-find hooks trees onto each other over all the touching pairs of runs at once, like Shiloach-Vishkin:
+    every round hooks each root onto the smallest touching root, hooks the trees left unchanged onto any neighbor,
+    and compresses every path to its root. Every tree with a neighbor merges in each round, so it settles within
+    log2(R) + 1 rounds for R runs, and the pairs are contracted to the roots they join as it goes.
+
+    Args:
+        mask (th.BoolTensor): Input binary mask of shape (H, W).
+        connectivity (int): 4 to connect pixels through edges only, 8 to also connect them through corners.
+
+    Returns:
+        labels (th.Tensor): Component label of each pixel of shape (H, W), 0 for background and 1 to N for
+            the components in raster order of their first pixel.
+        num_components (int): Number of components N.
+    """
+    assert mask.ndim == 2, "Mask must be a 2D tensor of shape (H, W)."
+
+    runs, num_runs = pixel_runs(mask)
+
+    # pairs of touching runs, with the pixels of one pair that overlap over several columns coming in a row
+    sources, targets = neighbor_pairs(mask, connectivity)
+    sources, targets = runs[sources], runs[targets]
+    different = sources != targets
+    sources, targets = sources[different], targets[different]
+    repeated = th.zeros(sources.shape[0], dtype=th.bool)
+    repeated[1:] = (sources[1:] == sources[:-1]) & (targets[1:] == targets[:-1])
+    sources, targets = sources[~repeated], targets[~repeated]
+
+    # both directions, so either run of a pair can hook
+    sources, targets = th.cat([sources, targets]), th.cat([targets, sources])
+
+    parents = th.arange(num_runs)
+    while sources.shape[0] > 0:
+        # every tree is a star whose root is touched by the pairs here, so hook roots onto smaller touching roots
+        previous_parents = parents.clone()
+        parents.scatter_reduce_(0, sources, targets, reduce="amin")
+
+        # trees that were neither hooked nor hooked onto only touch trees that changed, which do not hook below, so
+        # hooking them onto any of those cannot make a cycle
+        hooked = parents != previous_parents
+        changed = hooked.clone()
+        changed[parents[hooked]] = True
+        stagnant = ~changed[sources]
+        parents.scatter_reduce_(0, sources[stagnant], parents[targets[stagnant]], reduce="amin", include_self=False)
+
+        # every tree touching another one has merged, so the number of trees of each component at least halved
+        while True:
+            grandparents = parents[parents]
+            if th.equal(grandparents, parents):
+                break
+            parents = grandparents
+
+        # keep the pairs between different trees, as pairs of their roots
+        sources, targets = parents[sources], parents[targets]
+        different = sources != targets
+        sources, targets = sources[different], targets[different]
+
+    # number the components in raster order of their first run
+    roots, run_components = th.unique(parents, return_inverse=True)
+    first_runs = th.full_like(roots, num_runs).scatter_reduce_(0, run_components, th.arange(num_runs), reduce="amin")
+    run_labels = th.empty_like(roots)
+    run_labels[th.argsort(first_runs)] = th.arange(1, roots.shape[0] + 1)
+
+    flat_mask = mask.flatten()
+    flat_labels = th.zeros(mask.numel(), dtype=th.long)
+    flat_labels[flat_mask] = run_labels[run_components[runs[flat_mask]]]
+
+    return flat_labels.reshape(mask.shape), roots.shape[0]
+
+
+def component_areas(labels: th.Tensor, num_components: int) -> th.Tensor:
+    """
+    Number of pixels in each component, of shape (N + 1,) with the background at index 0.
+    """
+    return th.bincount(labels.flatten(), minlength=num_components + 1)
+
+
+def remove_small_components(
+    mask: th.BoolTensor, min_area: int, connectivity: int = 8
+) -> th.BoolTensor:
+    """
+    Drop the components of a binary mask that have fewer than min_area pixels.
+    """
+    labels, num_components = label_components(mask, connectivity)
+    keep = component_areas(labels, num_components) >= min_area
+    keep[0] = False
+
+    return keep[labels]
+
+
+def keep_largest_components(
+    mask: th.BoolTensor, n_components: int = 1, connectivity: int = 8
+) -> th.BoolTensor:
+    """
+    Keep only the n_components largest components of a binary mask.
+    """
+    labels, num_components = label_components(mask, connectivity)
+    areas = component_areas(labels, num_components)
+    areas[0] = 0
+
+    keep = th.zeros(num_components + 1, dtype=th.bool)
+    keep[th.argsort(areas, descending=True, stable=True)[:n_components]] = True
+    keep[0] = False
+
+    return keep[labels]
+
+
+def fill_holes(mask: th.BoolTensor, connectivity: int = 8) -> th.BoolTensor:
+    """
+    Fill the background regions of a binary mask that are enclosed by foreground, meaning they cannot be reached
+    from the border of the image. The background is flooded with the complementary connectivity, so that
+    foreground connected through corners also encloses holes.
+    """
+    background_connectivity = 4 if connectivity == 8 else 8
+    labels, num_components = label_components(~mask, background_connectivity)
+
+    # background components that touch the border are outside, every other one is a hole
+    border_labels = th.cat([labels[0], labels[-1], labels[:, 0], labels[:, -1]])
+    outside = th.zeros(num_components + 1, dtype=th.bool)
+    outside[border_labels] = True
+    outside[0] = False
+
+    return ~outside[labels]
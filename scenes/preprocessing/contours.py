@@ -0,0 +1,337 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+import torch as th
+from PIL import Image
+
+from preprocessing.cache import cache_location
+
+# positions of the corners and edge midpoints of a marching squares cell, as (x, y) with y going down
+CORNERS = {"tl": (0.0, 0.0), "tr": (1.0, 0.0), "br": (1.0, 1.0), "bl": (0.0, 1.0)}
+EDGES = {"top": (0.5, 0.0), "right": (1.0, 0.5), "bottom": (0.5, 1.0), "left": (0.0, 0.5)}
+CORNER_BITS = {"tl": 1, "tr": 2, "br": 4, "bl": 8}
+
+# contours enclosing fewer pixels than this are specks left over by the cleanup
+MIN_CONTOUR_AREA = 4.0
+
+
+def cell_segments() -> list[list[tuple[str, str]]]:
+    """
+    The directed segments of each of the 16 marching squares cases, from one edge midpoint to another, oriented so
+    that the foreground corners are on the left when y goes up. Outer boundaries then run counterclockwise and holes
+    clockwise.
+
+    The two saddle cases keep diagonal foreground corners connected, like 8-connectivity in label_components.
+    """
+    table = []
+    for case in range(16):
+        foreground = [corner for corner, bit in CORNER_BITS.items() if case & bit]
+        is_foreground = {corner: corner in foreground for corner in CORNER_BITS}
+
+        # an edge is crossed when its two corners differ
+        crossed = [
+            edge
+            for edge, (a, b) in {
+                "top": ("tl", "tr"),
+                "right": ("tr", "br"),
+                "bottom": ("br", "bl"),
+                "left": ("bl", "tl"),
+            }.items()
+            if is_foreground[a] != is_foreground[b]
+        ]
+
+        match case:
+            case 5:  # tl and br, cut off the background corners tr and bl
+                pairs = [("top", "right"), ("bottom", "left")]
+            case 10:  # tr and bl, cut off the background corners tl and br
+                pairs = [("left", "top"), ("right", "bottom")]
+            case _:
+                pairs = [tuple(crossed)] if crossed else []
+
+        segments = []
+        for start, end in pairs:
+            (x0, y0), (x1, y1) = EDGES[start], EDGES[end]
+            fx, fy = CORNERS[foreground[0]]
+            # with y going down, the foreground is on the left of y going up when this cross product is negative
+            cross = (x1 - x0) * (fy - y0) - (y1 - y0) * (fx - x0)
+            segments.append((start, end) if cross < 0 else (end, start))
+        table.append(segments)
+
+    return table
+
+
+CELL_SEGMENTS = cell_segments()
+
+
+def marching_squares(mask: th.BoolTensor) -> list[np.ndarray]:
+    """
+    Trace the boundaries of a binary mask as closed polygons through the midpoints between pixel centers.
+
+    Every cell of 2x2 pixels is classified at once, and its segments are written into a successor table over the
+    edge midpoints, so the only sequential step is following that table around each loop.
+
+    Args:
+        mask (th.BoolTensor): Input binary mask of shape (H, W).
+
+    Returns:
+        list[np.ndarray]: Closed contours as float32 arrays of shape (V, 2) holding (x, y) = (col, row) pixel
+            coordinates, without repeating the first vertex. Outer boundaries run counterclockwise when y goes up,
+            holes clockwise.
+    """
+    assert mask.ndim == 2, "Mask must be a 2D tensor of shape (H, W)."
+
+    # pad with background so every contour closes inside the grid
+    padded = th.nn.functional.pad(mask.to(th.uint8), (1, 1, 1, 1)).numpy()  # shape: (H + 2, W + 2)
+    rows, cols = padded.shape
+    cell_rows, cell_cols = rows - 1, cols - 1
+
+    cases = (
+        padded[:-1, :-1] * CORNER_BITS["tl"]
+        + padded[:-1, 1:] * CORNER_BITS["tr"]
+        + padded[1:, 1:] * CORNER_BITS["br"]
+        + padded[1:, :-1] * CORNER_BITS["bl"]
+    )  # shape: (H + 1, W + 1)
+
+    # midpoints of horizontal edges come first, on a (rows, cell_cols) grid, then vertical ones on (cell_rows, cols)
+    num_horizontal = rows * cell_cols
+    cell_i, cell_j = np.indices((cell_rows, cell_cols))
+    edge_ids = {
+        "top": cell_i * cell_cols + cell_j,
+        "bottom": (cell_i + 1) * cell_cols + cell_j,
+        "left": num_horizontal + cell_i * cols + cell_j,
+        "right": num_horizontal + cell_i * cols + cell_j + 1,
+    }
+
+    successors = np.full(num_horizontal + cell_rows * cols, -1, dtype=np.int64)
+    for case, segments in enumerate(CELL_SEGMENTS):
+        if not segments:
+            continue
+        in_case = cases == case
+        for start, end in segments:
+            successors[edge_ids[start][in_case]] = edge_ids[end][in_case]
+
+    # (x, y) of every midpoint in the coordinates of the unpadded mask
+    horizontal_i, horizontal_j = np.divmod(np.arange(num_horizontal), cell_cols)
+    vertical_i, vertical_j = np.divmod(np.arange(cell_rows * cols), cols)
+    positions = np.concatenate(
+        [
+            np.stack([horizontal_j - 0.5, horizontal_i - 1.0], axis=1),
+            np.stack([vertical_j - 1.0, vertical_i - 0.5], axis=1),
+        ]
+    ).astype(np.float32)
+
+    contours = []
+    visited = np.zeros(successors.shape[0], dtype=bool)
+    successors_list = successors.tolist()
+    for start in np.flatnonzero(successors >= 0).tolist():
+        if visited[start]:
+            continue
+
+        loop = [start]
+        vertex = successors_list[start]
+        while vertex != start:
+            loop.append(vertex)
+            vertex = successors_list[vertex]
+
+        visited[loop] = True
+        contours.append(positions[loop])
+
+    return contours
+
+
+def signed_area(contour: np.ndarray) -> float:
+    """
+    Area enclosed by a closed contour, positive when it runs counterclockwise with y going up.
+    """
+    x, y = contour[:, 0].astype(np.float64), contour[:, 1].astype(np.float64)
+
+    # shoelace formula, negated since pixel rows go down
+    return -0.5 * float(np.dot(x, np.roll(y, -1)) - np.dot(np.roll(x, -1), y))
+
+
+def simplify(polyline: np.ndarray, tolerance: float) -> np.ndarray:
+    """
+    Douglas-Peucker simplification of an open polyline, keeping its endpoints. Each split measures the distance of
+    all the points between two kept vertices at once.
+
+    Args:
+        polyline (np.ndarray): Points of shape (V, 2).
+        tolerance (float): Maximum distance between the polyline and its simplification.
+
+    Returns:
+        np.ndarray: The kept points, of shape (V', 2).
+    """
+    keep = np.zeros(polyline.shape[0], dtype=bool)
+    keep[0] = keep[-1] = True
+
+    stack = [(0, polyline.shape[0] - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+
+        start, end = polyline[first].astype(np.float64), polyline[last].astype(np.float64)
+        between = polyline[first + 1 : last].astype(np.float64)
+        direction = end - start
+        length = np.hypot(*direction)
+
+        if length > 0:
+            distances = np.abs(direction[0] * (between[:, 1] - start[1]) - direction[1] * (between[:, 0] - start[0]))
+            distances /= length
+        else:
+            distances = np.hypot(*(between - start).T)
+
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance:
+            split = first + 1 + farthest
+            keep[split] = True
+            stack.extend([(first, split), (split, last)])
+
+    return polyline[keep]
+
+
+def simplify_contour(contour: np.ndarray, tolerance: float) -> np.ndarray:
+    """
+    Douglas-Peucker simplification of a closed contour, split into two polylines at the vertex farthest from its
+    first vertex.
+    """
+    farthest = int(np.argmax(np.hypot(*(contour - contour[0]).T)))
+    if farthest == 0:
+        return contour[:1]
+
+    closed = np.concatenate([contour, contour[:1]])
+    first_half = simplify(closed[: farthest + 1], tolerance)
+    second_half = simplify(closed[farthest:], tolerance)
+
+    return np.concatenate([first_half, second_half[1:-1]])
+
+
+def extract_contours(
+    mask: th.BoolTensor,
+    tolerance: float = 1.0,
+    min_area: float = MIN_CONTOUR_AREA,
+) -> list[np.ndarray]:
+    """
+    Simplified outlines of a binary mask, dropping the contours that enclose less than min_area pixels.
+
+    Args:
+        mask (th.BoolTensor): Input binary mask of shape (H, W).
+        tolerance (float): Maximum distance in pixels between a contour and its simplification.
+        min_area (float): Minimum area in pixels of the contours to keep, holes included.
+
+    Returns:
+        list[np.ndarray]: Simplified closed contours, see marching_squares.
+    """
+    contours = []
+    for contour in marching_squares(mask):
+        if abs(signed_area(contour)) < min_area:
+            continue
+
+        simplified = simplify_contour(contour, tolerance)
+        if simplified.shape[0] >= 3:
+            contours.append(simplified)
+
+    return contours
+
+
+def save_contours(
+    contours: list[np.ndarray],
+    path: str,
+    image_size: tuple[int, int],
+    mask_path: str | None = None,
+    **params: float,
+) -> None:
+    """
+    Save contours as one .npz of concatenated float32 vertices and the offsets where each contour starts.
+
+    Args:
+        contours (list[np.ndarray]): Closed contours of shape (V, 2) in pixel coordinates.
+        path (str): Where to save the contours.
+        image_size (tuple[int, int]): The (height, width) of the mask the contours were traced on.
+        mask_path (str | None): The mask image the contours were traced on, whose size and modification time are
+            recorded to tell when the contours are stale.
+        **params (float): Parameters of the extraction to record, such as the tolerance.
+    """
+    lengths = [contour.shape[0] for contour in contours]
+    mask_stamp = [os.stat(mask_path).st_size, os.stat(mask_path).st_mtime_ns] if mask_path is not None else []
+
+    np.savez(
+        path,
+        vertices=np.concatenate(contours).astype(np.float32) if contours else np.zeros((0, 2), dtype=np.float32),
+        offsets=np.cumsum([0, *lengths]).astype(np.int64),
+        image_size=np.array(image_size, dtype=np.int64),
+        mask_stamp=np.array(mask_stamp, dtype=np.int64),
+        params=np.array(json.dumps(params, sort_keys=True)),
+    )
+
+
+def load_contours(path: str) -> tuple[list[np.ndarray], dict]:
+    """
+    Load contours saved by save_contours.
+
+    Returns:
+        contours (list[np.ndarray]): Closed contours of shape (V, 2) in pixel coordinates.
+        metadata (dict): The image size as "height" and "width", the "mask_stamp" and the extraction parameters.
+    """
+    with np.load(path) as data:
+        vertices, offsets = data["vertices"], data["offsets"]
+        height, width = data["image_size"].tolist()
+        metadata = {"height": height, "width": width, "mask_stamp": data["mask_stamp"].tolist()}
+        metadata.update(json.loads(data["params"].item()))
+
+    contours = [vertices[start:end] for start, end in zip(offsets[:-1], offsets[1:])]
+
+    return contours, metadata
+
+
+def load_or_build_contours(
+    mask_path: str,
+    contours_path: str | None = None,
+    alpha_threshold: int = 200,
+    tolerance: float = 1.0,
+    min_area: float = MIN_CONTOUR_AREA,
+    cache_dir: str | None = None,
+) -> tuple[list[np.ndarray], dict]:
+    """
+    Like load_contours, but trace the contours of an alpha mask image if the ones saved by the media pipeline are
+    missing, were made with other parameters, or the mask changed since. Contours traced here are saved in
+    cache_dir, keyed by the path and modification time of the mask and the parameters, and never next to the mask.
+
+    Args:
+        mask_path (str): Path of the alpha mask image, such as media/ireland_mask.png.
+        contours_path (str | None): Path of the contours of the media pipeline, next to the mask with a
+            _contours.npz suffix by default.
+        alpha_threshold (int): Pixels with alpha above this value are inside the region.
+        tolerance (float): Maximum distance in pixels between a contour and its simplification.
+        min_area (float): Minimum area in pixels of the contours to keep.
+        cache_dir (str | None): Directory of the contours traced on a miss, contours under the cache root by default.
+    """
+    if contours_path is None:
+        contours_path = f"{os.path.splitext(mask_path)[0]}_contours.npz"
+    if cache_dir is None:
+        cache_dir = cache_location("contours")
+
+    params = {"alpha_threshold": alpha_threshold, "tolerance": tolerance, "min_area": min_area}
+    mask_stamp = [os.stat(mask_path).st_size, os.stat(mask_path).st_mtime_ns]
+    key = hashlib.sha1(f"{os.path.abspath(mask_path)}-{mask_stamp[1]}-{json.dumps(params)}".encode())
+    cache_path = os.path.join(cache_dir, f"{key.hexdigest()}.npz")
+
+    for path in (contours_path, cache_path):
+        if os.path.exists(path):
+            contours, metadata = load_contours(path)
+            same_params = all(metadata.get(name) == value for name, value in params.items())
+            if metadata["mask_stamp"] == mask_stamp and same_params:
+                return contours, metadata
+
+    with Image.open(mask_path) as mask_image:
+        # masks are saved as single-channel alpha images
+        alpha = np.asarray(mask_image.getchannel("A") if "A" in mask_image.getbands() else mask_image.convert("L"))
+
+    mask = th.from_numpy(alpha > alpha_threshold)
+    contours = extract_contours(mask, tolerance=tolerance, min_area=min_area)
+    os.makedirs(cache_dir, exist_ok=True)
+    save_contours(contours, cache_path, alpha.shape, mask_path=mask_path, **params)
+
+    return load_contours(cache_path)
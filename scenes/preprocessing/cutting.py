@@ -1,5 +1,11 @@
+import math
+from typing import TYPE_CHECKING, Self
+
 import torch as th
 
+if TYPE_CHECKING:
+    from manim import ValueTracker
+
 
 def bisect_angles(points: th.Tensor, angles: th.Tensor) -> th.Tensor:
     """
@@ -65,3 +71,296 @@ def count_positive(points: th.Tensor, theta: float, bias: float) -> int:
     signed_distances = points @ normal - bias
 
     return (signed_distances > 0).sum().item()
+
+
+def quantile_cuts(
+    points: th.Tensor,
+    angles: th.Tensor,
+    qs: th.Tensor,
+    weights: th.Tensor | None = None,
+) -> th.Tensor:
+    """
+    Given a set of points, a set of angles and a set of fractions, return the bias for each hyperplane such that
+    the given fraction of the points lies on its negative side. A fraction of 0.5 gives the same biases as
+    bisect_angles. All fractions for an angle come out of the same sort, so sweeping the fraction costs the same as
+    a single cut.
+
+    Args:
+        points (th.Tensor): A set of points in 2D, of shape (N, 2).
+        angles (th.Tensor): A set of angles in radians, of shape (A,).
+        qs (th.Tensor): A set of fractions in [0, 1], of shape (Q,).
+        weights (th.Tensor | None): Optional non-negative weight of each point, of shape (N,).
+
+    Returns:
+        biases (th.Tensor): The bias of each hyperplane for each fraction, of shape (A, Q).
+
+    Example:
+        >>> points = th.tensor([[0, 0], [1, 1], [2, 0], [3, 1]])
+        >>> quantile_cuts(points, th.tensor([0.0]), th.tensor([0.25, 0.5, 1.0]))
+        tensor([[0., 1., 3.]])
+    """
+    assert points.ndim == 2 and points.shape[1] == 2, (
+        "Points must be a 2D tensor with shape (N, 2)."
+    )
+    assert angles.ndim == 1, "Angles must be a 1D tensor."
+    assert qs.ndim == 1 and ((qs >= 0) & (qs <= 1)).all(), "Fractions must be a 1D tensor with values in [0, 1]."
+
+    normals = th.stack([th.cos(angles), th.sin(angles)], dim=1)  # shape: (A, 2)
+    dtype = th.promote_types(points.dtype, normals.dtype)
+    signed_distances = points.to(dtype) @ normals.to(dtype).T  # shape: (N, A)
+
+    sorted_distances, order = th.sort(signed_distances, dim=0)  # shape: (N, A)
+
+    if weights is None:
+        cumulative_weights = th.arange(1, points.shape[0] + 1, dtype=dtype)[:, None].expand_as(order)
+    else:
+        assert weights.shape == points.shape[:1], "Weights must have shape (N,)."
+        cumulative_weights = th.cumsum(weights.to(dtype)[order], dim=0)  # shape: (N, A)
+
+    # the cut for a fraction is the first point at which the cumulative weight reaches that fraction of the total
+    targets = qs.to(dtype)[None, :] * cumulative_weights[-1][:, None]  # shape: (A, Q)
+    cut_indices = th.searchsorted(cumulative_weights.T.contiguous(), targets)  # shape: (A, Q)
+    cut_indices = cut_indices.clamp(max=points.shape[0] - 1)
+
+    return th.gather(sorted_distances.T, 1, cut_indices)  # shape: (A, Q)
+
+
+def concat_regions(*regions: th.Tensor) -> tuple[th.Tensor, th.Tensor]:
+    """
+    Concatenate the point sets of several regions into one buffer, tagging each point with the index of its region.
+
+    Args:
+        *regions (th.Tensor): Point sets in 2D, each of shape (N_i, 2).
+
+    Returns:
+        points (th.Tensor): All points, of shape (N, 2).
+        region_ids (th.Tensor): The region index of each point, of shape (N,).
+
+    Example:
+        >>> points, region_ids = concat_regions(th.tensor([[0, 0], [1, 1]]), th.tensor([[2, 0]]))
+        >>> region_ids
+        tensor([0, 0, 1])
+    """
+    assert len(regions) > 0, "At least one region is required."
+
+    points = th.cat(regions, dim=0)
+    region_ids = th.repeat_interleave(
+        th.arange(len(regions)),
+        th.tensor([region.shape[0] for region in regions]),
+    )
+
+    return points, region_ids
+
+
+def bisect_angles_segmented(
+    points: th.Tensor,
+    region_ids: th.Tensor,
+    angles: th.Tensor,
+    num_regions: int | None = None,
+) -> th.Tensor:
+    """
+    Like bisect_angles, but for several regions at once. All regions share a single projection and a single sort,
+    so the cost grows with the total number of points rather than with the number of regions.
+
+    Args:
+        points (th.Tensor): A set of points in 2D, of shape (N, 2).
+        region_ids (th.Tensor): The region index of each point, of shape (N,).
+        angles (th.Tensor): A set of angles in radians, of shape (A,).
+        num_regions (int | None): Number of regions. Defaults to the largest region index + 1.
+
+    Returns:
+        biases (th.Tensor): The bisecting bias of each region for each hyperplane, of shape (R, A).
+
+    Example:
+        >>> points, region_ids = concat_regions(th.tensor([[0, 0], [1, 1], [2, 0]]), th.tensor([[4, 4], [6, 6]]))
+        >>> bisect_angles_segmented(points, region_ids, th.tensor([0, th.pi / 2]))
+        tensor([[1.0000, 0.0000],
+                [4.0000, 4.0000]])
+    """
+    assert points.ndim == 2 and points.shape[1] == 2, (
+        "Points must be a 2D tensor with shape (N, 2)."
+    )
+    assert region_ids.shape == points.shape[:1], "Region ids must have shape (N,)."
+    assert angles.ndim == 1, "Angles must be a 1D tensor."
+
+    if num_regions is None:
+        num_regions = int(region_ids.max().item()) + 1
+
+    region_sizes = th.bincount(region_ids, minlength=num_regions)  # shape: (R,)
+    assert (region_sizes > 0).all(), "Every region must contain at least one point."
+
+    normals = th.stack([th.cos(angles), th.sin(angles)], dim=1)  # shape: (A, 2)
+    dtype = th.promote_types(points.dtype, normals.dtype)
+    signed_distances = points.to(dtype) @ normals.to(dtype).T  # shape: (N, A)
+
+    # sort by distance, then stable sort by region so every region ends up as a sorted, contiguous segment
+    distance_order = th.argsort(signed_distances, dim=0, stable=True)  # shape: (N, A)
+    region_order = th.argsort(region_ids[distance_order], dim=0, stable=True)  # shape: (N, A)
+    segmented_distances = th.gather(
+        th.gather(signed_distances, 0, distance_order), 0, region_order
+    )  # shape: (N, A)
+
+    # th.median takes the lower of the two middle values, so we do the same within each segment
+    region_starts = th.cumsum(region_sizes, dim=0) - region_sizes  # shape: (R,)
+    median_indices = region_starts + (region_sizes - 1) // 2  # shape: (R,)
+
+    return segmented_distances[median_indices]  # shape: (R, A)
+
+
+def count_positive_segmented(
+    points: th.Tensor,
+    region_ids: th.Tensor,
+    theta: float,
+    biases: th.Tensor | float,
+    num_regions: int | None = None,
+) -> th.Tensor:
+    """
+    Like count_positive, but for several regions at once with a single projection pass.
+
+    Args:
+        points (th.Tensor): A set of points in 2D, of shape (N, 2).
+        region_ids (th.Tensor): The region index of each point, of shape (N,).
+        theta (float): The angle of the hyperplane in radians.
+        biases (th.Tensor | float): The bias of the hyperplane, either shared or one per region of shape (R,).
+        num_regions (int | None): Number of regions. Defaults to the largest region index + 1.
+
+    Returns:
+        th.Tensor: The number of points of each region on the positive side of the hyperplane, of shape (R,).
+
+    Example:
+        >>> points, region_ids = concat_regions(th.tensor([[0, 0], [1, 1], [2, 0]]), th.tensor([[4, 4], [6, 6]]))
+        >>> count_positive_segmented(points, region_ids, 0, th.tensor([0.5, 5]))
+        tensor([2, 1])
+    """
+    assert points.ndim == 2 and points.shape[1] == 2, (
+        "Points must be a 2D tensor with shape (N, 2)."
+    )
+    assert region_ids.shape == points.shape[:1], "Region ids must have shape (N,)."
+
+    if num_regions is None:
+        num_regions = int(region_ids.max().item()) + 1
+
+    biases = th.as_tensor(biases).reshape(-1)
+    if biases.shape[0] == 1:
+        biases = biases.expand(num_regions)
+    assert biases.shape[0] == num_regions, "Biases must be a scalar or have shape (R,)."
+
+    normal = th.tensor([th.cos(th.tensor(theta)), th.sin(th.tensor(theta))])
+    dtype = th.promote_types(points.dtype, normal.dtype)
+    signed_distances = points.to(dtype) @ normal.to(dtype) - biases[region_ids]  # shape: (N,)
+
+    return th.bincount(region_ids[signed_distances > 0], minlength=num_regions)
+
+
+class KineticBisector:
+    """
+    Track the bisecting bias of a set of points while the angle of the hyperplane changes a little at a time.
+
+    At an anchor angle, the points whose projection is within a margin of the median are kept as a window, and the
+    points below it are counted. No projection moves by more than drift = 2 * radius * |sin(angle change / 2)|,
+    and neither does the median, so while the new median stays further than drift inside the window's edges, no
+    point outside the window can have crossed it. The median of all the points is then selected within the window
+    alone. The margin is sized from the angle change of the last frame, so that one anchor lasts for about
+    frames_per_anchor frames of the same speed, and the window is only rebuilt once that no longer holds.
+
+    Args:
+        points (th.Tensor): A set of points in 2D, of shape (N, 2).
+        theta (ValueTracker | None): Tracker of the hyperplane angle, needed when used as an updater.
+        frames_per_anchor (int): Number of frames one anchor should last at the speed of the last frame.
+
+    Example:
+        >>> points = th.rand(10000, 2)
+        >>> bisector = KineticBisector(points)
+        >>> biases = [bisector.bisect(step * 0.01) for step in range(100)]
+        >>> bool(th.allclose(th.tensor(biases), bisect_angles(points, th.arange(100) * 0.01)))
+        True
+        >>> bisector.num_anchors < 20
+        True
+    """
+
+    def __init__(
+        self: Self,
+        points: th.Tensor,
+        theta: "ValueTracker | None" = None,
+        frames_per_anchor: int = 4,
+    ) -> None:
+        assert points.ndim == 2 and points.shape[1] == 2, (
+            "Points must be a 2D tensor with shape (N, 2)."
+        )
+        assert points.shape[0] > 0, "At least one point is required."
+        assert frames_per_anchor > 0, "Frames per anchor must be positive."
+
+        self.points = points if points.is_floating_point() else points.double()
+        self.theta = theta
+        self.frames_per_anchor = frames_per_anchor
+        self.median_rank = (points.shape[0] - 1) // 2  # same as th.median
+        self.radius = self.points.norm(dim=1).max().item()
+        # slack for the rounding of the projections, which are not computed in exact arithmetic
+        self.epsilon = 1e-5 * max(self.radius, 1e-12)
+
+        self.num_anchors = 0
+        self.frame_drift = 0.0
+        self.last_theta = theta.get_value() if theta is not None else 0.0
+        self.anchor(self.last_theta)
+
+    def normal(self: Self, theta: float) -> th.Tensor:
+        theta = th.tensor(float(theta), dtype=self.points.dtype)
+        return th.stack([th.cos(theta), th.sin(theta)])
+
+    def drift(self: Self, angle_change: float) -> float:
+        """
+        Upper bound on how far any projection moves when the angle changes by angle_change.
+        """
+        return 2 * self.radius * abs(math.sin(angle_change / 2))
+
+    def anchor(self: Self, theta: float) -> None:
+        """
+        Keep the points whose projection at the given angle is within the margin of the median.
+        """
+        projections = self.points @ self.normal(theta)  # shape: (N,)
+        median = th.kthvalue(projections, self.median_rank + 1).values.item()
+
+        # the median and the points outside the window each move by up to the drift, hence twice the frames
+        margin = 2 * self.frames_per_anchor * self.frame_drift + 2 * self.epsilon
+        self.lowest, self.highest = median - margin, median + margin
+
+        below = projections < self.lowest
+        inside = ~below & (projections <= self.highest)
+        window_indices = th.nonzero(inside).squeeze(1)
+
+        self.anchor_theta = float(theta)
+        self.window_points = self.points[window_indices]  # shape: (W, 2)
+        self.num_below = below.sum().item()
+        self.num_above = projections.shape[0] - self.num_below - window_indices.shape[0]
+        self.median = median
+        self.num_anchors += 1
+
+    def bisect(self: Self, theta: float) -> float:
+        """
+        Return the bias of the hyperplane at the given angle that bisects the points.
+        """
+        theta = float(theta)
+        if theta != self.last_theta:
+            self.frame_drift = self.drift(theta - self.last_theta)
+            self.last_theta = theta
+
+        if theta == self.anchor_theta:
+            return self.median
+
+        window_projections = self.window_points @ self.normal(theta)  # shape: (W,)
+        median = th.kthvalue(window_projections, self.median_rank - self.num_below + 1).values.item()
+
+        # points outside the window are still on their side of the new median only if it stayed far from the edges
+        drift = self.drift(theta - self.anchor_theta) + self.epsilon
+        crossed_below = self.num_below > 0 and median < self.lowest + drift
+        crossed_above = self.num_above > 0 and median > self.highest - drift
+        if crossed_below or crossed_above:
+            self.anchor(theta)
+            return self.median
+
+        return median
+
+    def __call__(self: Self, bias: "ValueTracker") -> None:
+        assert self.theta is not None, "A theta tracker is required to use the bisector as an updater."
+
+        bias.set_value(self.bisect(self.theta.get_value()))
@@ -1,78 +1,361 @@
+from typing import Literal, Self
+
 import torch as th
 
+KernelShape = Literal["rect", "cross"]
+
+
+def kernel_dimensions(kernel_size: int | tuple[int, int]) -> tuple[int, int]:
+    """
+    Return the (height, width) of a structuring element given as a single size or a (height, width) pair.
+    """
+    kernel_height, kernel_width = (
+        (kernel_size, kernel_size) if isinstance(kernel_size, int) else kernel_size
+    )
+    assert kernel_height % 2 == 1 and kernel_width % 2 == 1, "Kernel size must be odd."
+
+    return kernel_height, kernel_width
+
+
+def running_max(values: th.Tensor, window: int, dim: int, fill: int = 0) -> th.Tensor:
+    """
+    Maximum over a centered window along one dimension, using the van Herk/Gil-Werman algorithm.
+    The signal is cut into blocks of the window size, and every window is covered by the suffix maximum of one
+    block and the prefix maximum of the next, so the cost per element does not depend on the window size.
+
+    Args:
+        values (th.Tensor): Input tensor.
+        window (int): Odd size of the window.
+        dim (int): Dimension to run along.
+        fill (int): Value assumed outside of the tensor.
+
+    Returns:
+        th.Tensor: Running maximum with the same shape as the input.
+    """
+    if window == 1:
+        return values
+
+    values = values.movedim(dim, -1)
+    length = values.shape[-1]
+    radius = window // 2
+
+    num_blocks = -(-(length + window - 1) // window)
+    padded = values.new_full((*values.shape[:-1], num_blocks * window), fill)
+    padded[..., radius : radius + length] = values
+
+    # lay the blocks out position-major so every step below is one contiguous maximum over all blocks
+    blocks = padded.reshape(*values.shape[:-1], num_blocks, window).movedim(-1, 0)
+    prefix_max = blocks.clone(memory_format=th.contiguous_format)
+    suffix_max = prefix_max.clone()
+    for position in range(1, window):
+        th.maximum(prefix_max[position - 1], prefix_max[position], out=prefix_max[position])
+        th.maximum(suffix_max[-position], suffix_max[-position - 1], out=suffix_max[-position - 1])
+
+    prefix_max = prefix_max.movedim(0, -1).flatten(-2)
+    suffix_max = suffix_max.movedim(0, -1).flatten(-2)
+
+    # window [i, i + window - 1] of the padded signal is centered on element i of the input
+    maximum = th.maximum(suffix_max[..., :length], prefix_max[..., window - 1 : window - 1 + length])
+
+    return maximum.movedim(-1, dim)
+
+
+def running_sum(values: th.Tensor, window: int, dim: int) -> th.Tensor:
+    """
+    Sum over a centered window along one dimension, treating everything outside of the tensor as zero.
+    It is a difference of two cumulative sums, so the cost per element does not depend on the window size.
+    """
+    if window == 1:
+        return values
+
+    values = values.movedim(dim, -1)
+    length = values.shape[-1]
+    radius = window // 2
+
+    padded = values.new_zeros((*values.shape[:-1], length + window))
+    padded[..., radius + 1 : radius + 1 + length] = values
+    cumulative = th.cumsum(padded, dim=-1)
+
+    return (cumulative[..., window:] - cumulative[..., :length]).movedim(-1, dim)
+
+
+def max_filter(
+    mask: th.BoolTensor,
+    kernel_size: int | tuple[int, int] = 3,
+    kernel_shape: KernelShape = "rect",
+    fill: bool = False,
+) -> th.BoolTensor:
+    """
+    Whether any pixel under the structuring element is set, separably along rows and columns.
+    """
+    kernel_height, kernel_width = kernel_dimensions(kernel_size)
+    values = mask.to(th.uint8)
+
+    match kernel_shape:
+        case "rect":
+            filtered = running_max(
+                running_max(values, kernel_width, dim=-1, fill=fill),
+                kernel_height,
+                dim=-2,
+                fill=fill,
+            )
+        case "cross":
+            filtered = th.maximum(
+                running_max(values, kernel_width, dim=-1, fill=fill),
+                running_max(values, kernel_height, dim=-2, fill=fill),
+            )
+        case _:
+            raise ValueError(f"Unknown kernel shape: {kernel_shape}")
+
+    return filtered.bool()
+
 
 def filter_for_n_neighbors(
     mask: th.BoolTensor,
     n_neighbors: int = 1,
-    kernel_size: int = 3,
+    kernel_size: int | tuple[int, int] = 3,
+    kernel_shape: KernelShape = "rect",
 ) -> th.BoolTensor:
     """
     Filter binary masks to keep only pixels with at least specific number of neighbors, including themselves.
+    Neighbors are counted with separable running sums, so the cost per pixel does not depend on the kernel size.
 
     Args:
         mask (th.BoolTensor): Input binary masks of shape (B, H, W) or (H, W).
         n_neighbors (int): Number of neighbors for a pixel to be kept.
-        kernel_size (int): Size of the square structuring element.
-        iterations (int): Number of times to apply the erosion.
+        kernel_size (int | tuple[int, int]): Size of the structuring element, or its (height, width).
+        kernel_shape (str): "rect" for a full rectangle, "cross" for its middle row and column.
 
     Returns:
         th.BoolTensor: Filtered binary mask.
     """
-    match mask.ndim:
-        case 2:
-            batched_mask = mask.unsqueeze(0)
-        case 3:
-            batched_mask = mask
-        case _:
-            raise ValueError(
-                "Mask must be a 2D or 3D tensor of shape (H, W) or (B, H, W)."
-            )
+    if mask.ndim not in (2, 3):
+        raise ValueError(
+            "Mask must be a 2D or 3D tensor of shape (H, W) or (B, H, W)."
+        )
 
-    assert n_neighbors > 0 and n_neighbors <= kernel_size**2, (
-        "Invalid number of neighbors, must be in [1, kernel_size ** 2]."
+    kernel_height, kernel_width = kernel_dimensions(kernel_size)
+    kernel_area = (
+        kernel_height * kernel_width
+        if kernel_shape == "rect"
+        else kernel_height + kernel_width - 1
     )
-    assert kernel_size % 2 == 1, "Kernel size must be odd."
-
-    kernel = th.ones(kernel_size, kernel_size, device=batched_mask.device)
-    neighbors = th.nn.functional.conv2d(
-        batched_mask.int(),
-        kernel.view(1, 1, kernel_size, kernel_size).int(),
-        padding=kernel_size // 2,
+    assert n_neighbors > 0 and n_neighbors <= kernel_area, (
+        "Invalid number of neighbors, must be in [1, kernel area]."
     )
-    modified_mask = neighbors >= n_neighbors
 
-    match mask.ndim:
-        case 2:
-            return modified_mask.squeeze(0)
-        case 3:
-            return modified_mask
+    values = mask.int()
+
+    match kernel_shape:
+        case "rect":
+            neighbors = running_sum(
+                running_sum(values, kernel_width, dim=-1), kernel_height, dim=-2
+            )
+        case "cross":
+            neighbors = (
+                running_sum(values, kernel_width, dim=-1)
+                + running_sum(values, kernel_height, dim=-2)
+                - values
+            )
+        case _:
+            raise ValueError(f"Unknown kernel shape: {kernel_shape}")
+
+    return neighbors >= n_neighbors
+
+
+def iterated_kernel_size(
+    kernel_size: int | tuple[int, int], iterations: int
+) -> tuple[int, int]:
+    """
+    Size of the single rectangle that has the same effect as applying a rectangle several times.
+    """
+    kernel_height, kernel_width = kernel_dimensions(kernel_size)
+
+    return (
+        iterations * (kernel_height - 1) + 1,
+        iterations * (kernel_width - 1) + 1,
+    )
 
 
 def dilate(
-    mask: th.BoolTensor, kernel_size: int = 3, iterations: int = 1
+    mask: th.BoolTensor,
+    kernel_size: int | tuple[int, int] = 3,
+    iterations: int = 1,
+    kernel_shape: KernelShape = "rect",
 ) -> th.BoolTensor:
     """
-    Dilate a binary mask using a square structuring element.
+    Dilate a binary mask using a rectangular or cross-shaped structuring element.
     It filters to pixels that have at least one neighbor, meaning they are adjacent to foreground.
     """
+    if kernel_shape == "rect":
+        # repeated rectangles compose into one larger rectangle, which costs the same as a single pass
+        return max_filter(mask, iterated_kernel_size(kernel_size, iterations))
 
     for _ in range(iterations):
-        mask = filter_for_n_neighbors(
-            mask, n_neighbors=1, kernel_size=kernel_size
-        )
+        mask = max_filter(mask, kernel_size, kernel_shape)
 
     return mask
 
 
 def erode(
-    mask: th.BoolTensor, kernel_size: int = 3, iterations: int = 1
+    mask: th.BoolTensor,
+    kernel_size: int | tuple[int, int] = 3,
+    iterations: int = 1,
+    kernel_shape: KernelShape = "rect",
 ) -> th.BoolTensor:
     """
-    Erode a binary mask using a square structuring element.
-    It filters to pixels that have an equal number of neighbors to the kernel size squared, meaning they are surrounded by foreground.
+    Erode a binary mask using a rectangular or cross-shaped structuring element.
+    It filters to pixels whose whole neighborhood is foreground, meaning they are surrounded by foreground.
+    Pixels outside of the mask count as background, as with filter_for_n_neighbors.
     """
+    if kernel_shape == "rect":
+        return ~max_filter(~mask, iterated_kernel_size(kernel_size, iterations), fill=True)
 
     for _ in range(iterations):
-        mask = filter_for_n_neighbors(mask, n_neighbors=kernel_size**2, kernel_size=kernel_size)
+        mask = ~max_filter(~mask, kernel_size, kernel_shape, fill=True)
 
     return mask
+
+
+def squared_distance_transform(mask: th.BoolTensor) -> th.Tensor:
+    """
+    Exact squared Euclidean distance from every pixel to the nearest set pixel, in linear time.
+    Distances along columns come from two cumulative scans, and each row then takes the lower envelope of the
+    parabolas rooted at its pixels (Felzenszwalb and Huttenlocher), with all rows advancing in lockstep.
+
+    Args:
+        mask (th.BoolTensor): Input binary masks of shape (B, H, W) or (H, W).
+
+    Returns:
+        th.Tensor: Squared distances of the same shape as the mask, inf where the mask has no set pixel.
+    """
+    if mask.ndim not in (2, 3):
+        raise ValueError(
+            "Mask must be a 2D or 3D tensor of shape (H, W) or (B, H, W)."
+        )
+
+    h, w = mask.shape[-2:]
+    # stands in for infinity so the envelope arithmetic stays finite, larger than any real squared distance
+    unreachable = float(4 * (h + w) ** 2)
+
+    # distance to the nearest set pixel above and below, along each column
+    row_indices = th.arange(h).view(h, 1).expand(mask.shape)
+    last_above = th.cummax(th.where(mask, row_indices, -2 * h), dim=-2).values
+    next_below = h - 1 - th.cummax(th.where(mask, h - 1 - row_indices, -2 * h).flip(-2), dim=-2).values.flip(-2)
+    column_distances = th.minimum(row_indices - last_above, next_below - row_indices).double()
+    column_distances = th.where(column_distances < h, column_distances**2, unreachable)
+
+    f = column_distances.reshape(-1, w)  # shape: (R, W)
+    num_rows = f.shape[0]
+    rows = th.arange(num_rows)
+    positions = th.arange(w, dtype=th.float64)
+
+    # lower envelope of the parabolas (x - q)^2 + f[q], vertices v and the boundaries z between them
+    vertices = th.zeros(num_rows, w, dtype=th.long)
+    boundaries = th.full((num_rows, w + 1), float("inf"), dtype=th.float64)
+    boundaries[:, 0] = -float("inf")
+    last = th.zeros(num_rows, dtype=th.long)
+
+    for q in range(1, w):
+        parabola = f[:, q] + q**2
+        while True:
+            vertex = vertices[rows, last]
+            intersection = (parabola - (f[rows, vertex] + positions[vertex] ** 2)) / (2 * (q - vertex))
+            hidden = intersection <= boundaries[rows, last]
+            if not hidden.any():
+                break
+            last -= hidden.long()
+
+        last += 1
+        vertices[rows, last] = q
+        boundaries[rows, last] = intersection
+        boundaries[rows, last + 1] = float("inf")
+
+    # boundaries past the end of each envelope are leftovers from popped parabolas
+    boundaries[th.arange(w + 1) > (last + 1)[:, None]] = float("inf")
+    segments = th.searchsorted(boundaries[:, 1:].contiguous(), positions.expand(num_rows, w).contiguous())
+    nearest = th.gather(vertices, 1, segments)  # shape: (R, W)
+
+    squared_distances = (positions - nearest) ** 2 + th.gather(f, 1, nearest)
+    squared_distances[squared_distances >= unreachable] = float("inf")
+
+    return squared_distances.reshape(mask.shape)
+
+
+def distance_transform(mask: th.BoolTensor) -> th.Tensor:
+    """
+    Exact Euclidean distance from every pixel to the nearest set pixel, inf where the mask has no set pixel.
+    """
+    return squared_distance_transform(mask).sqrt()
+
+
+class DistanceMorphology:
+    """
+    Morphology with round structuring elements of any radius, as thresholds on cached distance transforms.
+    The distance maps of the mask are computed on first use, so erode and dilate for any further radius cost a
+    single comparison. Opening and closing need the distance map of the intermediate mask, which is cached per
+    radius.
+
+    Pixels outside of the mask count as background, as with erode.
+
+    Args:
+        mask (th.BoolTensor): Input binary masks of shape (B, H, W) or (H, W).
+
+    Example:
+        >>> morphology = DistanceMorphology(mask)
+        >>> for radius in (1.5, 2, 3.5):
+        ...     cleaned = morphology.open(radius)
+    """
+
+    def __init__(self: Self, mask: th.BoolTensor) -> None:
+        self.mask = mask
+        self._squared_distance_to_foreground = None
+        self._squared_distance_to_background = None
+        self.opened = {}
+        self.closed = {}
+
+    @property
+    def squared_distance_to_foreground(self: Self) -> th.Tensor:
+        if self._squared_distance_to_foreground is None:
+            self._squared_distance_to_foreground = squared_distance_transform(self.mask)
+
+        return self._squared_distance_to_foreground
+
+    @property
+    def squared_distance_to_background(self: Self) -> th.Tensor:
+        if self._squared_distance_to_background is None:
+            # a ring of background around the canvas stands in for everything outside of it
+            padded = th.nn.functional.pad(~self.mask, (1, 1, 1, 1), value=True)
+            self._squared_distance_to_background = squared_distance_transform(padded)[..., 1:-1, 1:-1]
+
+        return self._squared_distance_to_background
+
+    def dilate(self: Self, radius: float) -> th.BoolTensor:
+        """
+        Pixels within radius of the foreground.
+        """
+        return self.squared_distance_to_foreground <= radius**2
+
+    def erode(self: Self, radius: float) -> th.BoolTensor:
+        """
+        Pixels further than radius from the background.
+        """
+        return self.squared_distance_to_background > radius**2
+
+    def open(self: Self, radius: float) -> th.BoolTensor:
+        """
+        Erode then dilate, which removes parts of the foreground thinner than the structuring element.
+        """
+        if radius not in self.opened:
+            self.opened[radius] = DistanceMorphology(self.erode(radius)).dilate(radius)
+
+        return self.opened[radius]
+
+    def close(self: Self, radius: float) -> th.BoolTensor:
+        """
+        Dilate then erode, which fills gaps in the foreground thinner than the structuring element.
+        """
+        if radius not in self.closed:
+            self.closed[radius] = DistanceMorphology(self.dilate(radius)).erode(radius)
+
+        return self.closed[radius]
@@ -0,0 +1,204 @@
+from collections import Counter
+from typing import Self
+
+import numpy as np
+import torch as th
+
+from preprocessing.erode_dilate import KernelShape, dilate, erode, iterated_kernel_size
+from preprocessing.mask import palette_labels
+
+
+class MaskExpr:
+    """
+    A mask expression that is recorded rather than computed, so the whole chain can be evaluated strip by strip.
+
+    Expressions start from colors() and combine with |, & and ~ and the erode and dilate methods. Calling an
+    expression on a strip of RGBA pixels evaluates it:
+        - every colors() leaf with the same delta and alpha threshold is classified by a single palette_labels call,
+        - pointwise steps write into the buffer of an input that nothing else reads, instead of allocating,
+        - intermediates are released as soon as their last reader has run.
+
+    The halo of an expression is the number of rows of context its morphology needs, so that
+    tiles.map_strips(pixels, expression, output, halo=expression.halo) gives the same result as evaluating it on the
+    whole image at the cost of a few strips of memory.
+
+    Args:
+        op (str): The operation of this node, one of "colors", "or", "and", "not", "erode" or "dilate".
+        inputs (tuple[MaskExpr, ...]): The expressions this node reads.
+        **params: Parameters of the operation.
+
+    Example:
+        >>> uk = colors((28, 151, 179), (157, 157, 156)).erode().dilate(7).erode(5)
+        >>> uk.halo
+        6
+        >>> mask = uk(pixels)
+    """
+
+    def __init__(self: Self, op: str, inputs: tuple["MaskExpr", ...] = (), **params) -> None:
+        self.op = op
+        self.inputs = inputs
+        self.params = params
+
+    def __repr__(self: Self) -> str:
+        """
+        The code that builds the expression, which is stable across runs, so it can identify the expression in
+        caches and build manifests.
+        """
+        match self.op:
+            case "colors":
+                colors_repr = ", ".join(repr(tuple(color)) for color in self.params["colors"])
+                return (
+                    f"colors({colors_repr}, delta={self.params['delta']!r}, "
+                    f"alpha_threshold={self.params['alpha_threshold']!r})"
+                )
+            case "or":
+                return f"({self.inputs[0]!r} | {self.inputs[1]!r})"
+            case "and":
+                return f"({self.inputs[0]!r} & {self.inputs[1]!r})"
+            case "not":
+                return f"~{self.inputs[0]!r}"
+            case _:
+                params_repr = ", ".join(f"{name}={value!r}" for name, value in self.params.items())
+                return f"{self.inputs[0]!r}.{self.op}({params_repr})"
+
+    @property
+    def radius(self: Self) -> int:
+        """
+        Number of rows of context this node itself needs around each output row.
+        """
+        match self.op:
+            case "erode" | "dilate":
+                kernel_height, _ = iterated_kernel_size(self.params["kernel_size"], self.params["iterations"])
+                return kernel_height // 2
+            case _:
+                return 0
+
+    @property
+    def halo(self: Self) -> int:
+        """
+        Number of rows of context the whole expression needs, the largest total radius along any path to a leaf.
+        """
+        return self.radius + max((expression.halo for expression in self.inputs), default=0)
+
+    def __or__(self: Self, other: "MaskExpr") -> "MaskExpr":
+        return MaskExpr("or", (self, other))
+
+    def __and__(self: Self, other: "MaskExpr") -> "MaskExpr":
+        return MaskExpr("and", (self, other))
+
+    def __invert__(self: Self) -> "MaskExpr":
+        return MaskExpr("not", (self,))
+
+    def erode(
+        self: Self,
+        kernel_size: int | tuple[int, int] = 3,
+        iterations: int = 1,
+        kernel_shape: KernelShape = "rect",
+    ) -> "MaskExpr":
+        return MaskExpr(
+            "erode", (self,), kernel_size=kernel_size, iterations=iterations, kernel_shape=kernel_shape
+        )
+
+    def dilate(
+        self: Self,
+        kernel_size: int | tuple[int, int] = 3,
+        iterations: int = 1,
+        kernel_shape: KernelShape = "rect",
+    ) -> "MaskExpr":
+        return MaskExpr(
+            "dilate", (self,), kernel_size=kernel_size, iterations=iterations, kernel_shape=kernel_shape
+        )
+
+    def nodes(self: Self) -> list["MaskExpr"]:
+        """
+        Every node of the expression once, with each node after all of its inputs.
+        """
+        ordered, seen = [], set()
+
+        def visit(expression: MaskExpr) -> None:
+            if id(expression) in seen:
+                return
+            seen.add(id(expression))
+            for input_expression in expression.inputs:
+                visit(input_expression)
+            ordered.append(expression)
+
+        visit(self)
+
+        return ordered
+
+    def __call__(self: Self, pixels: np.ndarray) -> th.BoolTensor:
+        """
+        Evaluate the expression on RGBA pixels of shape (H, W, 4).
+        """
+        nodes = self.nodes()
+        readers = Counter(id(input_expression) for node in nodes for input_expression in node.inputs)
+        values = self.classify(nodes, pixels)
+
+        for node in nodes:
+            if node.op == "colors":
+                continue
+
+            inputs = [values[id(input_expression)] for input_expression in node.inputs]
+            # the first input can be overwritten if this node is its only remaining reader
+            writable = bool(node.inputs) and readers[id(node.inputs[0])] == 1
+
+            match node.op:
+                case "or":
+                    value = inputs[0].logical_or_(inputs[1]) if writable else inputs[0] | inputs[1]
+                case "and":
+                    value = inputs[0].logical_and_(inputs[1]) if writable else inputs[0] & inputs[1]
+                case "not":
+                    value = inputs[0].logical_not_() if writable else ~inputs[0]
+                case "erode":
+                    value = erode(inputs[0], **node.params)
+                case "dilate":
+                    value = dilate(inputs[0], **node.params)
+                case _:
+                    raise ValueError(f"Unknown mask operation: {node.op}")
+
+            values[id(node)] = value
+
+            for input_expression in node.inputs:
+                readers[id(input_expression)] -= 1
+                if readers[id(input_expression)] == 0:
+                    values.pop(id(input_expression), None)
+
+        return values[id(self)]
+
+    @staticmethod
+    def classify(nodes: list["MaskExpr"], pixels: np.ndarray) -> dict[int, th.BoolTensor]:
+        """
+        Masks of all colors() leaves, keyed by node id. Pixels are labelled once for every (delta, alpha threshold)
+        pair against the colors of all leaves that use it.
+        """
+        groups = {}
+        for node in nodes:
+            if node.op == "colors":
+                groups.setdefault((node.params["delta"], node.params["alpha_threshold"]), []).append(node)
+
+        masks = {}
+        for (delta, alpha_threshold), leaves in groups.items():
+            palette = [color for leaf in leaves for color in leaf.params["colors"]]
+            labels = palette_labels(pixels, palette, alpha_threshold=alpha_threshold, delta=delta)
+
+            # each leaf owns a contiguous range of the combined palette
+            start = 0
+            for leaf in leaves:
+                end = start + len(leaf.params["colors"])
+                masks[id(leaf)] = (labels >= start) & (labels < end)
+                start = end
+
+        return masks
+
+
+def colors(*colors: tuple[int, int, int], delta: float = 10.0, alpha_threshold: int = 16) -> MaskExpr:
+    """
+    Mask of the pixels within delta of any of the given colors, like palette_labels(image, colors) >= 0.
+
+    All colors with the same delta and alpha threshold in an expression are classified together, so a pixel is
+    only in the mask of the color it is nearest to.
+    """
+    assert colors, "At least one color is needed."
+
+    return MaskExpr("colors", colors=colors, delta=float(delta), alpha_threshold=alpha_threshold)
@@ -1,9 +1,72 @@
+import os
+import warnings
+from collections.abc import Sequence
+from functools import lru_cache
+
+import numpy as np
 import torch as th
 from PIL import Image
 
+from preprocessing.color_lut import load_or_build_palette_lut, rgb_indices
+
+ImageSource = Image.Image | np.ndarray | str | os.PathLike
+
+
+def pixels_tensor(pixels: np.ndarray) -> th.ByteTensor:
+    """
+    View a possibly read-only array, such as decoded image bytes or a memory-mapped file, as a tensor without copying.
+    """
+    with warnings.catch_warnings():
+        # none of the mask functions write to their input pixels
+        warnings.simplefilter("ignore", UserWarning)
+        return th.as_tensor(pixels)
+
+
+def rgba_tensor(image: Image.Image) -> th.ByteTensor:
+    """
+    Convert a PIL image to an RGBA tensor of shape (H, W, 4) that views the decoded bytes through NumPy instead of
+    building a Python list of pixels.
+    """
+    # rgba format is rgb + alpha, which encodes transparency
+    return pixels_tensor(np.asarray(image.convert("RGBA")))  # shape: (H, W, 4)
+
+
+@lru_cache(maxsize=8)
+def decode_rgba_file(path: str, mtime_ns: int) -> th.ByteTensor:
+    with Image.open(path) as image:
+        return rgba_tensor(image)
+
+
+def decode_rgba(image: ImageSource) -> th.ByteTensor:
+    """
+    Decode an image to an RGBA tensor of shape (H, W, 4). Arrays are taken to be RGBA pixels that are already
+    decoded, such as a strip of a larger image, and are viewed as they are.
+
+    Images given by path are decoded once per version of the file, keyed by its path and modification time, and
+    every later call shares the same tensor. It must not be modified in place.
+
+    Args:
+        image (ImageSource): Input image, RGBA pixels of shape (H, W, 4), or the path of an image file.
+
+    Returns:
+        th.ByteTensor: A byte tensor of shape (H, W, 4) holding the RGBA pixels.
+    """
+    if isinstance(image, Image.Image):
+        return rgba_tensor(image)
+
+    if isinstance(image, np.ndarray):
+        assert image.ndim == 3 and image.shape[2] == 4 and image.dtype == np.uint8, (
+            "Pixels must be a uint8 array of shape (H, W, 4)."
+        )
+        return pixels_tensor(image)
+
+    path = os.path.abspath(image)
+
+    return decode_rgba_file(path, os.stat(path).st_mtime_ns)
+
 
 def color_mask(
-    image: Image.Image,
+    image: ImageSource,
     color: tuple[int, int, int],
     alpha_threshold: int = 16,
     delta: float = 10.0,
@@ -12,7 +75,7 @@ def color_mask(
     Create a mask for a specific color in an image, excluding pixels with alpha below a threshold.
 
     Args:
-        image (PIL.Image.Image): Input image.
+        image (ImageSource): Input image, RGBA pixels, or the path of an image file.
         color (tuple[int, int, int]): RGB color to mask.
         alpha_threshold (int): Minimum alpha value for a pixel to be included in the mask (0-255).
         delta (float): Maximum distance between a pixel and the target color to be included in the mask.
@@ -20,45 +83,59 @@ def color_mask(
     Returns:
         th.BoolTensor: A boolean tensor of shape (H, W) where True indicates pixels matching the color and meeting alpha criteria.
     """
-    # rgba format is rgb + alpha, which encodes transparency
-    image = image.convert("RGBA")
-    w, h = image.size
-    pixels = th.tensor(image.getdata(), dtype=th.uint8).reshape(
-        h, w, 4
-    )  # shape: (H, W, 4)
+    return palette_labels(image, (color,), alpha_threshold=alpha_threshold, delta=delta) == 0
 
-    rgb_tensor = pixels[:, :, :3]  # shape: (H, W, 3)
-    alpha_tensor = pixels[:, :, 3]  # shape: (H, W)
 
-    color_tensor = th.tensor(color, dtype=th.uint8)  # shape: (3,)
-    # distance of each pixel to the target color
-    color_diff = th.pairwise_distance(
-        rgb_tensor, color_tensor, p=2, keepdim=False
-    )  # shape: (H, W)
+def palette_labels(
+    image: ImageSource,
+    palette: Sequence[tuple[int, int, int]],
+    alpha_threshold: int = 16,
+    delta: float = 10.0,
+) -> th.CharTensor:
+    """
+    Assign every pixel of an image to its nearest palette color in a single pass, so that the masks of several
+    colors all come from one label map instead of one color_mask call per color. The labels of all 24-bit colors are
+    precomputed once per palette and delta, see color_lut.load_or_build_palette_lut.
 
-    # keep pixels that are close to the target color
-    color_mask = color_diff < delta
+    Args:
+        image (ImageSource): Input image, RGBA pixels, or the path of an image file.
+        palette (Sequence[tuple[int, int, int]]): RGB colors to label, at most 127.
+        alpha_threshold (int): Minimum alpha value for a pixel to be labelled (0-255).
+        delta (float): Maximum distance between a pixel and a palette color for the pixel to get its label.
+
+    Returns:
+        th.CharTensor: An int8 tensor of shape (H, W) holding the index of the nearest palette color of each pixel,
+            or -1 for pixels that are not within delta of any palette color or are too transparent.
+
+    Example:
+        >>> labels = palette_labels(image, ((28, 151, 179), (157, 157, 156)))
+        >>> blue_mask, grey_mask = labels == 0, labels == 1
+        >>> any_mask = labels >= 0
+    """
+    assert 0 < len(palette) <= th.iinfo(th.int8).max, "Palette must have between 1 and 127 colors."
+
+    pixels = decode_rgba(image)  # shape: (H, W, 4)
+
+    # classifying a pixel is a single lookup into the precomputed table of all colors
+    palette = tuple(tuple(int(channel) for channel in color) for color in palette)
+    lut = load_or_build_palette_lut(palette, float(delta))
+    labels = lut[rgb_indices(pixels[:, :, :3]).long()]  # shape: (H, W)
 
     # keep pixels that have enough opacity
-    alpha_mask = alpha_tensor > alpha_threshold
+    alpha_mask = pixels[:, :, 3] > alpha_threshold
 
-    return color_mask & alpha_mask
+    return th.where(alpha_mask, labels, -1)
 
 
-def alpha_channel(image: Image.Image) -> th.ByteTensor:
+def alpha_channel(image: ImageSource) -> th.ByteTensor:
     """
     Extract the alpha channel from an RGBA image.
 
     Args:
-        image (PIL.Image.Image): Input image.
+        image (ImageSource): Input image, RGBA pixels, or the path of an image file.
 
     Returns:
-        th.ByteTensor: A byte tensor of shape (H, W) representing the alpha channel.
+        th.ByteTensor: A byte tensor of shape (H, W) representing the alpha channel. For paths, it is a view of the
+            shared decoded pixels and must not be modified in place.
     """
-    image = image.convert("RGBA")
-    w, h = image.size
-    pixels = th.tensor(image.getdata(), dtype=th.uint8).reshape(
-        h, w, 4
-    )  # shape: (H, W, 4)
-
-    return pixels[:, :, 3]  # shape: (H, W)
+    return decode_rgba(image)[:, :, 3]  # shape: (H, W)
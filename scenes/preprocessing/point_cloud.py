@@ -0,0 +1,122 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+from PIL import Image
+
+from preprocessing.cache import cache_location
+
+
+def point_cloud(alpha: np.ndarray, alpha_threshold: int = 200, strip_height: int = 1024) -> np.ndarray:
+    """
+    The (row, col) coordinates of every pixel with alpha above the threshold, in raster order like th.nonzero.
+    The alpha channel is scanned in strips, so a memory-mapped canvas is never thresholded all at once.
+
+    Args:
+        alpha (np.ndarray): Alpha channel of shape (H, W).
+        alpha_threshold (int): Pixels with alpha above this value are solid.
+        strip_height (int): Number of rows scanned at a time.
+
+    Returns:
+        np.ndarray: An int16 array of shape (N, 2).
+    """
+    h, w = alpha.shape
+    assert max(h, w) <= np.iinfo(np.int16).max, "Image is too large for int16 pixel coordinates."
+
+    strips = []
+    for start in range(0, h, strip_height):
+        rows, cols = np.nonzero(alpha[start : start + strip_height] > alpha_threshold)
+        strips.append(np.stack([rows + start, cols], axis=1).astype(np.int16))
+
+    return np.concatenate(strips) if strips else np.zeros((0, 2), dtype=np.int16)
+
+
+def metadata_path(points_path: str) -> str:
+    return f"{os.path.splitext(points_path)[0]}.json"
+
+
+def save_point_cloud(
+    alpha: np.ndarray,
+    points_path: str,
+    alpha_threshold: int = 200,
+    mask_path: str | None = None,
+) -> None:
+    """
+    Save the solid pixels of an alpha channel as an int16 .npy of (row, col) coordinates, with a JSON sidecar holding
+    the image size and the alpha threshold, and the mask it was made from if any.
+    """
+    points = point_cloud(alpha, alpha_threshold)
+    np.save(points_path, points)
+
+    metadata = {
+        "height": alpha.shape[0],
+        "width": alpha.shape[1],
+        "alpha_threshold": alpha_threshold,
+        "num_points": points.shape[0],
+    }
+    if mask_path is not None:
+        stat = os.stat(mask_path)
+        metadata["mask"] = {"path": mask_path, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    with open(metadata_path(points_path), "w") as file:
+        json.dump(metadata, file, indent=2)
+
+
+def load_point_cloud(points_path: str) -> tuple[np.ndarray, dict]:
+    """
+    Memory-map a saved point cloud.
+
+    Returns:
+        points (np.ndarray): The int16 (row, col) coordinates of shape (N, 2).
+        metadata (dict): The image size, alpha threshold and source mask of the points.
+    """
+    with open(metadata_path(points_path)) as file:
+        metadata = json.load(file)
+
+    return np.load(points_path, mmap_mode="r"), metadata
+
+
+def load_or_build_point_cloud(
+    mask_path: str,
+    points_path: str | None = None,
+    alpha_threshold: int = 200,
+    cache_dir: str | None = None,
+) -> tuple[np.ndarray, dict]:
+    """
+    Like load_point_cloud, but build the point cloud from an alpha mask image if the one saved by the media pipeline
+    is missing, was made with another threshold, or the mask changed since. Point clouds built here are saved in
+    cache_dir, keyed by the path and modification time of the mask and the threshold, and never next to the mask.
+
+    Args:
+        mask_path (str): Path of the alpha mask image, such as media/ireland_mask.png.
+        points_path (str | None): Path of the point cloud of the media pipeline, next to the mask with a _points.npy
+            suffix by default.
+        alpha_threshold (int): Pixels with alpha above this value are solid.
+        cache_dir (str | None): Directory of the point clouds built on a miss, point_clouds under the cache root by
+            default.
+    """
+    if points_path is None:
+        points_path = f"{os.path.splitext(mask_path)[0]}_points.npy"
+    if cache_dir is None:
+        cache_dir = cache_location("point_clouds")
+
+    stat = os.stat(mask_path)
+    expected_mask = {"path": mask_path, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    key = hashlib.sha1(f"{os.path.abspath(mask_path)}-{stat.st_mtime_ns}-{alpha_threshold}".encode())
+    cache_path = os.path.join(cache_dir, f"{key.hexdigest()}.npy")
+
+    for path in (points_path, cache_path):
+        if os.path.exists(path) and os.path.exists(metadata_path(path)):
+            points, metadata = load_point_cloud(path)
+            if metadata["alpha_threshold"] == alpha_threshold and metadata.get("mask") == expected_mask:
+                return points, metadata
+
+    with Image.open(mask_path) as mask_image:
+        # masks are saved as single-channel alpha images
+        alpha = np.asarray(mask_image.getchannel("A") if "A" in mask_image.getbands() else mask_image.convert("L"))
+
+    os.makedirs(cache_dir, exist_ok=True)
+    save_point_cloud(alpha, cache_path, alpha_threshold, mask_path=mask_path)
+
+    return load_point_cloud(cache_path)
@@ -0,0 +1,52 @@
+import numpy as np
+import torch as th
+
+from preprocessing.mask import ImageSource, decode_rgba
+
+
+def downsample(pixels: np.ndarray) -> np.ndarray:
+    """
+    Halve an RGBA image, averaging each 2x2 block of pixels (or the blocks of an odd-sized image) with colors
+    weighted by alpha, so the colors hidden under transparent pixels do not bleed into the edges of a region.
+
+    Args:
+        pixels (np.ndarray): RGBA pixels of shape (H, W, 4).
+
+    Returns:
+        np.ndarray: RGBA pixels of shape (max(H // 2, 1), max(W // 2, 1), 4).
+    """
+    h, w, _ = pixels.shape
+    size = (max(h // 2, 1), max(w // 2, 1))
+
+    channels = th.from_numpy(np.ascontiguousarray(pixels)).permute(2, 0, 1).float()  # shape: (4, H, W)
+    alpha = channels[3:]
+    premultiplied = th.cat([channels[:3] * alpha, alpha, channels[:3]])  # shape: (7, H, W)
+
+    pooled = th.nn.functional.interpolate(premultiplied[None], size=size, mode="area")[0]  # shape: (7, h, w)
+    pooled_alpha = pooled[3:4]
+
+    # fully transparent blocks keep their plain average color
+    rgb = th.where(pooled_alpha > 0, pooled[:3] / pooled_alpha.clamp(min=1e-6), pooled[4:])
+    downsampled = th.cat([rgb, pooled_alpha]).round().clamp(0, 255).to(th.uint8)
+
+    return downsampled.permute(1, 2, 0).contiguous().numpy()  # shape: (h, w, 4)
+
+
+def build_pyramid(image: ImageSource, min_size: int = 16) -> list[np.ndarray]:
+    """
+    Mipmap levels of an image, each half the size of the one before, down to the first level whose shorter side is
+    at most min_size.
+
+    Args:
+        image (ImageSource): Input image, RGBA pixels of shape (H, W, 4), or the path of an image file.
+        min_size (int): Size of the shorter side at which to stop halving.
+
+    Returns:
+        list[np.ndarray]: RGBA levels, starting with the image itself at full resolution.
+    """
+    levels = [decode_rgba(image).numpy()]
+    while min(levels[-1].shape[:2]) > min_size:
+        levels.append(downsample(levels[-1]))
+
+    return levels
+
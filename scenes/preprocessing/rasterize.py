@@ -0,0 +1,182 @@
+import json
+
+import numpy as np
+
+
+def polygon_rings(geometry: dict) -> list[np.ndarray]:
+    """
+    Every ring of the polygons in a GeoJSON object, outer boundaries and holes alike, since the even-odd fill tells
+    them apart by nesting. Features, feature collections and geometry collections are searched recursively, and
+    other geometry types are ignored.
+
+    Returns:
+        list[np.ndarray]: Rings as float64 arrays of shape (V, 2) of (x, y) coordinates, such as (longitude, latitude).
+    """
+    match geometry.get("type"):
+        case "FeatureCollection":
+            return [ring for feature in geometry["features"] for ring in polygon_rings(feature)]
+        case "Feature":
+            return polygon_rings(geometry["geometry"]) if geometry.get("geometry") is not None else []
+        case "GeometryCollection":
+            return [ring for part in geometry["geometries"] for ring in polygon_rings(part)]
+        case "Polygon":
+            polygons = [geometry["coordinates"]]
+        case "MultiPolygon":
+            polygons = geometry["coordinates"]
+        case _:
+            return []
+
+    return [np.array(ring, dtype=np.float64)[:, :2] for polygon in polygons for ring in polygon if len(ring) >= 3]
+
+
+def load_boundaries(path: str) -> list[np.ndarray]:
+    """
+    Read the polygon rings of a GeoJSON file, see polygon_rings.
+    """
+    with open(path) as file:
+        return polygon_rings(json.load(file))
+
+
+def rings_bounds(rings: list[np.ndarray]) -> tuple[float, float, float, float]:
+    """
+    The (x_min, y_min, x_max, y_max) bounds of a list of rings.
+    """
+    points = np.concatenate(rings)
+    x_min, y_min = points.min(axis=0)
+    x_max, y_max = points.max(axis=0)
+
+    return float(x_min), float(y_min), float(x_max), float(y_max)
+
+
+def to_pixels(
+    rings: list[np.ndarray],
+    bounds: tuple[float, float, float, float],
+    height: int,
+    width: int,
+) -> list[np.ndarray]:
+    """
+    Map rings from their own coordinates, with y going up, to the continuous pixel coordinates of a canvas whose
+    edges are at the given bounds, with y going down. Pixel (row, col) covers [col, col + 1) x [row, row + 1).
+
+    Args:
+        rings (list[np.ndarray]): Rings of shape (V, 2).
+        bounds (tuple[float, float, float, float]): The (x_min, y_min, x_max, y_max) that the left, bottom, right
+            and top edges of the canvas map to, such as (west, south, east, north) for a map in the same projection.
+        height (int): Number of rows of the canvas.
+        width (int): Number of columns of the canvas.
+    """
+    x_min, y_min, x_max, y_max = bounds
+    scale = np.array([width / (x_max - x_min), -height / (y_max - y_min)])
+    origin = np.array([x_min, y_max])
+
+    return [(ring - origin) * scale for ring in rings]
+
+
+def even_odd_fill(rings: list[np.ndarray], top: int, bottom: int, width: int) -> np.ndarray:
+    """
+    Rows [top, bottom) of the even-odd fill of rings in pixel coordinates, sampled at pixel centers.
+
+    Every edge is intersected with the centers of all the rows it spans at once. Each crossing toggles the parity
+    from the first pixel whose center is right of it, and a running xor along each row turns the toggles into the
+    fill, so no row is ever scanned edge by edge and the fill takes one byte per pixel.
+
+    Args:
+        rings (list[np.ndarray]): Closed rings of shape (V, 2) in pixel coordinates, see to_pixels. The last vertex
+            may repeat the first, as in GeoJSON.
+        top (int): First row to fill.
+        bottom (int): Row after the last one to fill.
+        width (int): Number of columns of the canvas.
+
+    Returns:
+        np.ndarray: A bool array of shape (bottom - top, width).
+    """
+    rows = bottom - top
+    if not rings or rows <= 0:
+        return np.zeros((max(rows, 0), width), dtype=bool)
+
+    starts = np.concatenate(rings)
+    ends = np.concatenate([np.roll(ring, -1, axis=0) for ring in rings])
+    (x0, y0), (x1, y1) = starts.T, ends.T
+
+    # an edge crosses the rows whose centers are in [min(y0, y1), max(y0, y1)), so horizontal edges cross none
+    first_row = np.clip(np.ceil(np.minimum(y0, y1) - 0.5), top, bottom).astype(np.int64)
+    end_row = np.clip(np.ceil(np.maximum(y0, y1) - 0.5), top, bottom).astype(np.int64)
+    counts = end_row - first_row
+
+    crossing_edges = np.repeat(np.arange(counts.shape[0]), counts)
+    crossing_rows = first_row[crossing_edges] + np.arange(crossing_edges.shape[0]) - np.repeat(
+        np.cumsum(counts) - counts, counts
+    )
+
+    # x of each edge at the center of each row it crosses
+    x0, y0, x1, y1 = x0[crossing_edges], y0[crossing_edges], x1[crossing_edges], y1[crossing_edges]
+    crossing_x = x0 + (crossing_rows + 0.5 - y0) * (x1 - x0) / (y1 - y0)
+    crossing_cols = np.clip(np.ceil(crossing_x - 0.5), 0, width).astype(np.int64)
+
+    # only the parity of the crossings in each pixel matters, and one extra column takes those right of the canvas
+    keys, counts = np.unique((crossing_rows - top) * (width + 1) + crossing_cols, return_counts=True)
+    toggles = np.zeros((rows, width + 1), dtype=bool)  # shape: (rows, W + 1)
+    toggles.reshape(-1)[keys[counts % 2 == 1]] = True
+
+    return np.logical_xor.accumulate(toggles, axis=1)[:, :width]
+
+
+def coverage(rings: list[np.ndarray], top: int, bottom: int, width: int, supersample: int = 1) -> np.ndarray:
+    """
+    Rows [top, bottom) of the alpha of rings in pixel coordinates, as the fraction of supersample x supersample
+    samples in each pixel that the even-odd fill covers. The samples of all the rows are filled at once, which takes
+    supersample**2 bytes per pixel.
+
+    Returns:
+        np.ndarray: A uint8 array of shape (bottom - top, width), 255 where a pixel is fully covered.
+    """
+    if supersample == 1:
+        return even_odd_fill(rings, top, bottom, width).astype(np.uint8) * 255
+
+    scaled_rings = [ring * supersample for ring in rings]
+    samples = even_odd_fill(scaled_rings, top * supersample, bottom * supersample, width * supersample)
+    covered = samples.reshape(bottom - top, supersample, width, supersample).sum(axis=(1, 3))
+
+    return np.round(covered * (255 / supersample**2)).astype(np.uint8)
+
+
+def rasterize_boundaries(
+    path: str,
+    height: int,
+    width: int,
+    bounds: tuple[float, float, float, float] | None = None,
+    supersample: int = 4,
+    strip_height: int = 1024,
+) -> np.ndarray:
+    """
+    Rasterize the polygons of a GeoJSON file straight to an alpha mask at any resolution, strip by strip.
+
+    Args:
+        path (str): Path of the GeoJSON file.
+        height (int): Number of rows of the mask.
+        width (int): Number of columns of the mask.
+        bounds (tuple[float, float, float, float] | None): The (x_min, y_min, x_max, y_max) of the file's
+            coordinates that the edges of the mask map to, see to_pixels. Defaults to the bounds of the polygons.
+        supersample (int): Number of samples per pixel along each axis, 1 for a hard edged mask.
+        strip_height (int): Number of rows of samples filled at a time, so strip_height // supersample rows of the
+            mask and about strip_height * W * supersample bytes of samples.
+
+    Returns:
+        np.ndarray: A uint8 alpha mask of shape (H, W).
+
+    Example:
+        >>> alpha = rasterize_boundaries("media/ireland.geojson", 1447, 1200, bounds=(-11.0, 49.8, 2.1, 61.0))
+    """
+    rings = load_boundaries(path)
+    bounds = rings_bounds(rings) if bounds is None and rings else bounds
+    pixel_rings = to_pixels(rings, bounds, height, width) if rings else []
+
+    # each row of the mask takes supersample rows of samples
+    rows_per_strip = max(strip_height // supersample, 1)
+
+    alpha = np.empty((height, width), dtype=np.uint8)
+    for start in range(0, height, rows_per_strip):
+        end = min(start + rows_per_strip, height)
+        alpha[start:end] = coverage(pixel_rings, start, end, width, supersample=supersample)
+
+    return alpha
@@ -0,0 +1,218 @@
+import hashlib
+import math
+import os
+import tempfile
+from typing import Self
+
+import torch as th
+
+from preprocessing.cache import cache_location
+
+
+class Sinogram:
+    """
+    Cumulative projection histograms of a weighted 2D mask for a dense set of angles in [0, pi).
+
+    Every cut the scenes ask about (the bisecting bias, the weight on the positive side) only depends on the
+    projection histogram of the mask at that angle, so after the precompute every query is an interpolated lookup
+    into these cumulative sums. Angles in [pi, 2 * pi) are answered by mirroring, since projecting at theta + pi
+    just negates the projections.
+
+    Pixel (row, col) of an (H, W) mask sits at x = col - W / 2, y = H / 2 - row, the same convention the scenes use
+    to turn solid pixels into world-space points. Queries are answered in the frame given by placed(), which maps
+    those pixel coordinates to scale * (x, y) + offset.
+
+    Args:
+        cdf (th.Tensor): Cumulative histograms of shape (A, B + 1), cdf[a, j] is the weight projecting below bin j.
+        bins_start (float): Projection value at the start of the first bin.
+        bin_width (float): Width of each bin in pixels.
+        scale (float): Size of a pixel in the query frame.
+        offset (tuple[float, float]): Position of the mask center in the query frame.
+    """
+
+    def __init__(
+        self: Self,
+        cdf: th.Tensor,
+        bins_start: float,
+        bin_width: float,
+        scale: float = 1.0,
+        offset: tuple[float, float] = (0.0, 0.0),
+    ) -> None:
+        assert cdf.ndim == 2 and cdf.shape[1] >= 2, "CDF must be a 2D tensor of shape (A, B + 1)."
+        assert scale > 0, "Scale must be positive."
+
+        self.cdf = cdf
+        self.bins_start = bins_start
+        self.bin_width = bin_width
+        self.scale = scale
+        self.offset = offset
+
+    @property
+    def num_angles(self: Self) -> int:
+        return self.cdf.shape[0]
+
+    @property
+    def total(self: Self) -> float:
+        return self.cdf[0, -1].item()
+
+    def placed(self: Self, scale: float, offset: tuple[float, float]) -> "Sinogram":
+        """
+        Return a view of this sinogram that answers queries in a frame where pixels have the given size and the
+        mask center is at the given offset, for example world space relative to the hyperplane origin.
+        """
+        return Sinogram(self.cdf, self.bins_start, self.bin_width, scale=scale, offset=offset)
+
+    def angle_indices(self: Self, theta: float) -> tuple[int, int, float]:
+        """
+        Return the two neighboring precomputed angles of theta, as indices into [0, 2 * A), and the blend between them.
+        Indices of A and above refer to the mirrored angles in [pi, 2 * pi).
+        """
+        position = (float(theta) % (2 * math.pi)) / (math.pi / self.num_angles)
+        lower = int(position) % (2 * self.num_angles)
+        upper = (lower + 1) % (2 * self.num_angles)
+
+        return lower, upper, position - math.floor(position)
+
+    def weight_below(self: Self, index: int, value: float) -> float:
+        """
+        Weight of the mask projecting below value at a precomputed angle, in pixel units.
+        """
+        if index >= self.num_angles:
+            # projections are negated, so below value means above -value at the mirrored angle
+            return self.total - self.weight_below(index - self.num_angles, -value)
+
+        cdf = self.cdf[index]
+        position = min(max((value - self.bins_start) / self.bin_width, 0.0), cdf.shape[0] - 1.0)
+        bin_index = min(int(position), cdf.shape[0] - 2)
+        fraction = position - bin_index
+
+        return (cdf[bin_index] + fraction * (cdf[bin_index + 1] - cdf[bin_index])).item()
+
+    def quantile_at(self: Self, index: int, q: float) -> float:
+        """
+        Projection value below which a fraction q of the mask weight lies at a precomputed angle, in pixel units.
+        """
+        if index >= self.num_angles:
+            return -self.quantile_at(index - self.num_angles, 1 - q)
+
+        cdf = self.cdf[index]
+        target = th.tensor(q * self.total, dtype=cdf.dtype)
+        bin_index = min(max(th.searchsorted(cdf, target).item(), 1), cdf.shape[0] - 1)
+        bin_weight = (cdf[bin_index] - cdf[bin_index - 1]).item()
+        fraction = (target - cdf[bin_index - 1]).item() / bin_weight if bin_weight > 0 else 0.0
+
+        return self.bins_start + (bin_index - 1 + fraction) * self.bin_width
+
+    def offset_projection(self: Self, theta: float) -> float:
+        return self.offset[0] * math.cos(theta) + self.offset[1] * math.sin(theta)
+
+    def quantile(self: Self, theta: float, q: float) -> float:
+        """
+        Return the bias of the hyperplane at angle theta that has a fraction q of the weight on its negative side.
+        """
+        assert 0 <= q <= 1, "Quantile must be in [0, 1]."
+
+        lower, upper, blend = self.angle_indices(theta)
+        pixel_bias = (1 - blend) * self.quantile_at(lower, q) + blend * self.quantile_at(upper, q)
+
+        return self.scale * pixel_bias + self.offset_projection(theta)
+
+    def bisect(self: Self, theta: float) -> float:
+        """
+        Return the bias of the hyperplane at angle theta that bisects the weight of the mask.
+        """
+        return self.quantile(theta, 0.5)
+
+    def count_positive(self: Self, theta: float, bias: float) -> float:
+        """
+        Return the weight of the mask on the positive side of the hyperplane at angle theta with the given bias.
+        """
+        pixel_bias = (bias - self.offset_projection(theta)) / self.scale
+        lower, upper, blend = self.angle_indices(theta)
+        weight_below = (1 - blend) * self.weight_below(lower, pixel_bias) + blend * self.weight_below(upper, pixel_bias)
+
+        return self.total - weight_below
+
+
+def build_sinogram(
+    weights: th.Tensor,
+    num_angles: int = 720,
+    bin_width: float = 1.0,
+    angles_per_chunk: int = 16,
+) -> Sinogram:
+    """
+    Build the sinogram of a weighted mask, such as an alpha channel, by histogramming its projections.
+
+    Args:
+        weights (th.Tensor): Weight of each pixel of shape (H, W), zero outside the region.
+        num_angles (int): Number of angles in [0, pi) to precompute.
+        bin_width (float): Width of the histogram bins in pixels.
+        angles_per_chunk (int): Number of angles projected at once, to bound memory.
+
+    Returns:
+        Sinogram: The precomputed projection histograms.
+    """
+    assert weights.ndim == 2, "Weights must be a 2D tensor of shape (H, W)."
+    assert num_angles > 0 and bin_width > 0, "Number of angles and bin width must be positive."
+
+    h, w = weights.shape
+    rows, cols = th.nonzero(weights > 0, as_tuple=True)
+    point_weights = weights[rows, cols].double()  # shape: (N,)
+    x = cols.double() - w / 2
+    y = h / 2 - rows.double()
+
+    radius = math.sqrt((w / 2) ** 2 + (h / 2) ** 2)
+    num_bins = math.ceil(2 * radius / bin_width) + 1
+    bins_start = -radius
+
+    angles = th.arange(num_angles, dtype=th.float64) * math.pi / num_angles
+    histograms = th.zeros(num_angles * num_bins, dtype=th.float64)
+
+    for chunk_start in range(0, num_angles, angles_per_chunk):
+        chunk_angles = angles[chunk_start : chunk_start + angles_per_chunk]  # shape: (a,)
+        projections = x[:, None] * th.cos(chunk_angles) + y[:, None] * th.sin(chunk_angles)  # shape: (N, a)
+
+        bins = ((projections - bins_start) / bin_width).long().clamp(0, num_bins - 1)
+        flat_bins = bins + (chunk_start + th.arange(chunk_angles.shape[0])) * num_bins
+        histograms.index_add_(
+            0, flat_bins.flatten(), point_weights[:, None].expand_as(projections).flatten()
+        )
+
+    histograms = histograms.reshape(num_angles, num_bins)
+    cdf = th.cat([th.zeros(num_angles, 1, dtype=th.float64), th.cumsum(histograms, dim=1)], dim=1)
+
+    return Sinogram(cdf, bins_start, bin_width)
+
+
+def load_or_build_sinogram(
+    weights: th.Tensor,
+    cache_dir: str | None = None,
+    num_angles: int = 720,
+    bin_width: float = 1.0,
+) -> Sinogram:
+    """
+    Like build_sinogram, but cache the result on disk keyed by the content of the weights and the parameters, in
+    sinograms under the cache root unless cache_dir is given.
+    """
+    cache_dir = cache_location("sinograms") if cache_dir is None else cache_dir
+    key = hashlib.sha1(weights.contiguous().numpy().tobytes())
+    key.update(f"{tuple(weights.shape)}-{weights.dtype}-{num_angles}-{bin_width}".encode())
+    cache_path = os.path.join(cache_dir, f"{key.hexdigest()}.pt")
+
+    if os.path.exists(cache_path):
+        cached = th.load(cache_path)
+        return Sinogram(cached["cdf"], cached["bins_start"], cached["bin_width"])
+
+    sinogram = build_sinogram(weights, num_angles=num_angles, bin_width=bin_width)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    # only complete sinograms ever appear under the final name, see color_lut.load_or_build_palette_lut
+    fd, partial_path = tempfile.mkstemp(suffix=".partial", dir=cache_dir)
+    os.close(fd)
+    th.save(
+        {"cdf": sinogram.cdf, "bins_start": sinogram.bins_start, "bin_width": sinogram.bin_width},
+        partial_path,
+    )
+    os.replace(partial_path, cache_path)
+
+    return sinogram
@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+import torch as th
+from PIL import Image
+
+from preprocessing import erode_dilate
+from preprocessing.bitmask import BitMask
+
+WIDTHS = [1, 7, 63, 64, 65, 130]
+
+
+def random_mask(h: int, w: int, density: float = 0.5, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).random((h, w)) < density
+
+
+def shifted(mask: np.ndarray, rows: int, columns: int) -> np.ndarray:
+    """
+    The mask moved by (rows, columns), filling with unset pixels.
+    """
+    h, w = mask.shape
+    result = np.zeros_like(mask)
+    if abs(rows) < h and abs(columns) < w:
+        result[max(rows, 0) : h + min(rows, 0), max(columns, 0) : w + min(columns, 0)] = mask[
+            max(-rows, 0) : h + min(-rows, 0), max(-columns, 0) : w + min(-columns, 0)
+        ]
+    return result
+
+
+@pytest.mark.parametrize("width", WIDTHS)
+def test_round_trips(width: int) -> None:
+    mask = random_mask(5, width)
+    bitmask = BitMask.from_numpy(mask)
+
+    assert bitmask.shape == (5, width)
+    assert np.array_equal(bitmask.to_numpy(), mask)
+    assert th.equal(BitMask.from_tensor(th.from_numpy(mask)).to_tensor(), th.from_numpy(mask))
+    assert np.array_equal(np.asarray(bitmask.to_pil()), mask)
+    assert np.array_equal(BitMask.from_pil(Image.fromarray(mask)).to_numpy(), mask)
+
+
+def test_from_pil_thresholds_other_modes() -> None:
+    pixels = np.random.default_rng(1).integers(0, 256, (6, 70), dtype=np.uint8)
+
+    assert np.array_equal(BitMask.from_pil(Image.fromarray(pixels), threshold=100).to_numpy(), pixels > 100)
+
+
+@pytest.mark.parametrize("width", WIDTHS)
+def test_boolean_operations_and_count(width: int) -> None:
+    a, b = random_mask(4, width, seed=2), random_mask(4, width, seed=3)
+    bit_a, bit_b = BitMask.from_numpy(a), BitMask.from_numpy(b)
+
+    assert np.array_equal((bit_a | bit_b).to_numpy(), a | b)
+    assert np.array_equal((bit_a & bit_b).to_numpy(), a & b)
+    assert np.array_equal((bit_a ^ bit_b).to_numpy(), a ^ b)
+    # bits past the width stay unset, so inverting twice and counting both stay exact
+    assert np.array_equal((~bit_a).to_numpy(), ~a)
+    assert (~bit_a).count() == (~a).sum()
+    assert th.equal((~~bit_a).words, bit_a.words)
+
+
+@pytest.mark.parametrize("width", WIDTHS)
+@pytest.mark.parametrize("shift", [0, 1, -1, 5, -31, 63, -64, 64, 65, -100, 200])
+def test_shifts_match_moving_the_pixels(width: int, shift: int) -> None:
+    mask = random_mask(9, width, seed=4)
+    bitmask = BitMask.from_numpy(mask)
+
+    assert np.array_equal(bitmask.shift_columns(shift).to_numpy(), shifted(mask, 0, shift))
+    assert np.array_equal(bitmask.shift_rows(shift).to_numpy(), shifted(mask, shift, 0))
+
+
+@pytest.mark.parametrize("width", [3, 64, 97])
+@pytest.mark.parametrize("kernel_size", [1, 3, 5, 9])
+def test_morphology_matches_erode_dilate(width: int, kernel_size: int) -> None:
+    mask = random_mask(30, width, density=0.7, seed=5)
+    bitmask = BitMask.from_numpy(mask)
+    tensor = th.from_numpy(mask)
+
+    assert th.equal(bitmask.dilate(kernel_size).to_tensor(), erode_dilate.dilate(tensor, kernel_size))
+    assert th.equal(bitmask.erode(kernel_size).to_tensor(), erode_dilate.erode(tensor, kernel_size))
+
+
+@pytest.mark.parametrize("kernel_size", [3, 5])
+def test_neighbor_filter_matches_erode_dilate(kernel_size: int) -> None:
+    mask = random_mask(25, 70, seed=6)
+    bitmask = BitMask.from_numpy(mask)
+    tensor = th.from_numpy(mask)
+
+    for n_neighbors in range(1, kernel_size**2 + 1):
+        assert th.equal(
+            bitmask.filter_for_n_neighbors(n_neighbors, kernel_size).to_tensor(),
+            erode_dilate.filter_for_n_neighbors(tensor, n_neighbors, kernel_size),
+        )
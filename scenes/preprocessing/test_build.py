@@ -0,0 +1,216 @@
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from preprocessing.build import BuildGraph, file_hash, preprocessing_sources
+
+pytestmark = pytest.mark.usefixtures("in_tmp_path")
+
+
+def write(path: str, text: str) -> None:
+    with open(path, "w") as file:
+        file.write(text)
+
+
+def read(path: str) -> str:
+    with open(path) as file:
+        return file.read()
+
+
+def concatenation_graph(built: list[str], suffix: str = "") -> BuildGraph:
+    """
+    source.txt -> upper.txt -> both.txt <- source.txt, with the dependent step added first.
+    """
+    graph = BuildGraph()
+
+    def build_both() -> None:
+        built.append("both")
+        write("both.txt", read("source.txt") + read("upper.txt"))
+
+    def build_upper() -> None:
+        built.append("upper")
+        write("upper.txt", read("source.txt").upper() + suffix)
+
+    graph.add("both", build_both, inputs=["source.txt", "upper.txt"], outputs=["both.txt"])
+    graph.add("upper", build_upper, inputs=["source.txt"], outputs=["upper.txt"], params={"suffix": suffix})
+    return graph
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 1 << 20])
+def test_file_hash_matches_hashlib(chunk_size: int) -> None:
+    contents = bytes(range(256)) * 5
+    with open("file.bin", "wb") as file:
+        file.write(contents)
+
+    assert file_hash("file.bin", chunk_size=chunk_size) == hashlib.sha1(contents).hexdigest()
+
+
+def test_steps_run_after_their_inputs_and_only_once() -> None:
+    write("source.txt", "map")
+    built = []
+
+    assert set(concatenation_graph(built).run()) == {"upper", "both"}
+    assert built == ["upper", "both"]
+    assert read("both.txt") == "mapMAP"
+
+    # a fresh graph reads the manifest and finds everything up to date
+    assert concatenation_graph(built).run() == {}
+    assert built == ["upper", "both"]
+
+
+def test_changed_inputs_rebuild_the_steps_that_depend_on_them() -> None:
+    write("source.txt", "map")
+    built = []
+    concatenation_graph(built).run()
+
+    write("source.txt", "maps")
+    built.clear()
+    concatenation_graph(built).run()
+
+    assert built == ["upper", "both"]
+    assert read("both.txt") == "mapsMAPS"
+
+
+def test_changed_params_rebuild_the_step_and_its_dependents() -> None:
+    write("source.txt", "map")
+    concatenation_graph([]).run()
+
+    built = []
+    concatenation_graph(built, suffix="!").run()
+
+    assert built == ["upper", "both"]
+    assert read("both.txt") == "mapMAP!"
+
+
+@pytest.mark.parametrize("edit", ["delete", "overwrite"])
+def test_deleted_or_edited_outputs_are_rebuilt(edit: str) -> None:
+    write("source.txt", "map")
+    concatenation_graph([]).run()
+
+    if edit == "delete":
+        os.remove("both.txt")
+    else:
+        write("both.txt", "edited by hand")
+
+    built = []
+    concatenation_graph(built).run()
+
+    assert built == ["both"]
+    assert read("both.txt") == "mapMAP"
+
+
+def test_changed_code_rebuilds_the_step() -> None:
+    write("source.txt", "map")
+    write("script.py", "print('v1')")
+
+    def graph_with_code(built: list[str]) -> BuildGraph:
+        graph = BuildGraph()
+        graph.add(
+            "copy",
+            lambda: built.append("copy") or write("copy.txt", read("source.txt")),
+            inputs=["source.txt"],
+            outputs=["copy.txt"],
+            code=[os.path.abspath("script.py")],
+        )
+        return graph
+
+    graph_with_code([]).run()
+    built = []
+    graph_with_code(built).run()
+    assert built == []
+
+    write("script.py", "print('v2!')")
+    graph_with_code(built).run()
+    assert built == ["copy"]
+
+
+def test_tests_are_not_part_of_the_package_code() -> None:
+    sources = [os.path.basename(path) for path in preprocessing_sources()]
+
+    assert "build.py" in sources and "tiles.py" in sources
+    assert not any(name.startswith("test_") for name in sources)
+
+
+@pytest.mark.parametrize("with_code", [True, False])
+def test_only_the_imported_modules_rebuild_the_step(monkeypatch: pytest.MonkeyPatch, with_code: bool) -> None:
+    # a small stand-in for the preprocessing package, whose tiles module imports mask
+    os.makedirs("preprocessing")
+    write("preprocessing/tiles.py", "from preprocessing.mask import alpha_channel\n")
+    write("preprocessing/mask.py", "import numpy as np\n")
+    write("preprocessing/unused.py", "")
+    write("preprocessing/test_tiles.py", "from preprocessing.tiles import isolate_region\n")
+    monkeypatch.setattr("preprocessing.build.PREPROCESSING_DIR", os.path.abspath("preprocessing"))
+    write("script.py", "from preprocessing import tiles\n")
+    write("source.txt", "map")
+
+    def run() -> list[str]:
+        built = []
+        graph = BuildGraph()
+        graph.add(
+            "copy",
+            lambda: built.append("copy") or write("copy.txt", read("source.txt")),
+            inputs=["source.txt"],
+            outputs=["copy.txt"],
+            code=[os.path.abspath("script.py")] if with_code else [],
+        )
+        graph.run()
+        return built
+
+    assert run() == ["copy"]
+
+    write("preprocessing/test_tiles.py", "from preprocessing.tiles import isolate_region  # edited\n")
+    assert run() == []
+
+    write("preprocessing/unused.py", "UNUSED = 1\n")
+    assert run() == ([] if with_code else ["copy"])
+
+    write("preprocessing/mask.py", "import numpy as np  # edited\n")
+    assert run() == ["copy"]
+
+
+def test_force_and_before_build() -> None:
+    write("source.txt", "map")
+    concatenation_graph([]).run()
+    prepared = []
+
+    concatenation_graph([]).run(before_build=lambda: prepared.append(True))
+    assert prepared == []
+
+    built = []
+    concatenation_graph(built).run(force=True, before_build=lambda: prepared.append(True))
+    assert built == ["upper", "both"]
+    assert prepared == [True]
+
+
+def test_waves_group_independent_steps() -> None:
+    graph = BuildGraph()
+    graph.add("c", lambda: None, inputs=["a.txt", "b.txt"], outputs=["c.txt"])
+    graph.add("a", lambda: None, inputs=["source.txt"], outputs=["a.txt"])
+    graph.add("b", lambda: None, inputs=["source.txt"], outputs=["b.txt"])
+    graph.add("d", lambda: None, inputs=["source.txt"], outputs=["d.txt"])
+
+    assert [[step.name for step in wave] for wave in graph.waves()] == [["a", "b", "d"], ["c"]]
+
+
+def test_cycles_are_rejected() -> None:
+    graph = BuildGraph()
+    graph.add("a", lambda: None, inputs=["b.txt"], outputs=["a.txt"])
+    graph.add("b", lambda: None, inputs=["a.txt"], outputs=["b.txt"])
+
+    with pytest.raises(AssertionError, match="depends on its own outputs"):
+        graph.ordered_steps()
+
+
+def test_executor_builds_the_same_outputs() -> None:
+    write("source.txt", "map")
+    built = []
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        results = concatenation_graph(built).run(executor=executor)
+
+    assert set(results) == {"upper", "both"}
+    assert built == ["upper", "both"]
+    assert read("both.txt") == "mapMAP"
+    assert concatenation_graph(built).run() == {}
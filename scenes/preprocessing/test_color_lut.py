@@ -0,0 +1,51 @@
+import os
+from pathlib import Path
+
+import pytest
+import torch as th
+
+from preprocessing.color_lut import build_palette_lut, load_or_build_palette_lut, rgb_indices
+
+PALETTE = ((28, 151, 179), (157, 157, 156), (0, 0, 0), (255, 250, 3))
+
+
+def brute_labels(colors: th.Tensor, palette: tuple, delta: float) -> th.Tensor:
+    squared_distances = ((colors[:, None, :].long() - th.tensor(palette)) ** 2).sum(dim=2)  # shape: (C, P)
+    nearest_distances, labels = squared_distances.min(dim=1)
+    return th.where(nearest_distances < delta**2, labels, -1)
+
+
+def test_rgb_indices_are_24_bit_colors() -> None:
+    colors = th.tensor([[0, 0, 0], [255, 255, 255], [1, 2, 3]], dtype=th.uint8)
+
+    assert rgb_indices(colors).tolist() == [0, (1 << 24) - 1, (1 << 16) + (2 << 8) + 3]
+
+
+@pytest.mark.parametrize("delta", [0.5, 3.0, 10.0, 12.7])
+def test_table_matches_nearest_palette_color(delta: float) -> None:
+    lut = build_palette_lut(PALETTE, delta)
+
+    # every color in reach of the palette, clipped at the edges of the color cube, and random colors elsewhere
+    reach = int(delta) + 2
+    offsets = th.cartesian_prod(*[th.arange(-reach, reach + 1)] * 3)
+    near = th.cat([(offsets + th.tensor(color)).clamp(0, 255) for color in PALETTE])
+    anywhere = th.randint(0, 256, (20000, 3), generator=th.Generator().manual_seed(0))
+    colors = th.cat([near, anywhere])
+
+    assert th.equal(lut[rgb_indices(colors).long()].long(), brute_labels(colors, PALETTE, delta))
+    assert (lut >= 0).sum().item() == (brute_labels(near.unique(dim=0), PALETTE, delta) >= 0).sum().item()
+
+
+def test_tables_are_cached_by_palette_and_delta(tmp_path: Path) -> None:
+    cache_dir = os.path.join(tmp_path, "luts")
+
+    built = load_or_build_palette_lut(PALETTE[:2], 5.0, cache_dir=cache_dir)
+    assert load_or_build_palette_lut(PALETTE[:2], 5.0, cache_dir=cache_dir) is built
+    assert len(os.listdir(cache_dir)) == 1
+
+    load_or_build_palette_lut.cache_clear()
+    assert th.equal(load_or_build_palette_lut(PALETTE[:2], 5.0, cache_dir=cache_dir), built)
+
+    load_or_build_palette_lut(PALETTE[:2], 6.0, cache_dir=cache_dir)
+    assert len(os.listdir(cache_dir)) == 2
+    assert all(name.endswith(".pt") for name in os.listdir(cache_dir))
@@ -0,0 +1,103 @@
+from collections import deque
+
+import pytest
+import torch as th
+
+from preprocessing.components import fill_holes, keep_largest_components, label_components, remove_small_components
+
+
+def flood_fill_labels(mask: th.BoolTensor, connectivity: int) -> tuple[th.Tensor, int]:
+    """
+    Components by breadth-first search from every unlabelled pixel in raster order.
+    """
+    h, w = mask.shape
+    offsets = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+    if connectivity == 8:
+        offsets += [(-1, -1), (-1, 1), (1, -1), (1, 1)]
+
+    labels = th.zeros(h, w, dtype=th.long)
+    num_components = 0
+    for row, col in th.nonzero(mask).tolist():
+        if labels[row, col]:
+            continue
+        num_components += 1
+        labels[row, col] = num_components
+        queue = deque([(row, col)])
+        while queue:
+            y, x = queue.popleft()
+            for dy, dx in offsets:
+                ny, nx = y + dy, x + dx
+                if 0 <= ny < h and 0 <= nx < w and mask[ny, nx] and not labels[ny, nx]:
+                    labels[ny, nx] = num_components
+                    queue.append((ny, nx))
+
+    return labels, num_components
+
+
+def serpentine(size: int) -> th.BoolTensor:
+    # one long path that doubles back on every other row
+    mask = th.zeros(size, size, dtype=th.bool)
+    mask[::2] = True
+    for row in range(1, size, 2):
+        mask[row, -1 if row % 4 == 1 else 0] = True
+    return mask
+
+
+@pytest.mark.parametrize("connectivity", [4, 8])
+@pytest.mark.parametrize("density", [0.1, 0.45, 0.6, 0.9])
+def test_labels_match_flood_fill(connectivity: int, density: float) -> None:
+    for seed in range(5):
+        mask = th.rand(23, 31, generator=th.Generator().manual_seed(seed)) < density
+
+        labels, num_components = label_components(mask, connectivity)
+
+        expected_labels, expected_num_components = flood_fill_labels(mask, connectivity)
+        assert num_components == expected_num_components
+        assert th.equal(labels, expected_labels)
+
+
+@pytest.mark.parametrize("connectivity", [4, 8])
+def test_long_winding_components(connectivity: int) -> None:
+    rings = th.zeros(33, 33, dtype=th.bool)  # nested square outlines
+    for ring in range(0, 16, 2):
+        rings[ring, ring : 33 - ring] = rings[32 - ring, ring : 33 - ring] = True
+        rings[ring : 33 - ring, ring] = rings[ring : 33 - ring, 32 - ring] = True
+
+    for mask in (serpentine(64), serpentine(64).T, rings):
+        labels, num_components = label_components(mask, connectivity)
+
+        expected_labels, expected_num_components = flood_fill_labels(mask, connectivity)
+        assert num_components == expected_num_components
+        assert th.equal(labels, expected_labels)
+
+    assert label_components(serpentine(64), connectivity)[1] == 1
+
+
+def test_diagonal_pixels_connect_only_with_8_connectivity() -> None:
+    mask = th.eye(5, dtype=th.bool)
+
+    assert label_components(mask, 8)[1] == 1
+    assert label_components(mask, 4)[1] == 5
+
+
+def test_empty_and_full_masks() -> None:
+    labels, num_components = label_components(th.zeros(4, 6, dtype=th.bool))
+    assert num_components == 0 and not labels.any()
+
+    labels, num_components = label_components(th.ones(4, 6, dtype=th.bool))
+    assert num_components == 1 and (labels == 1).all()
+
+
+def test_cleanup_helpers() -> None:
+    mask = th.zeros(12, 12, dtype=th.bool)
+    mask[1:6, 1:6] = True  # 25 pixels with a hole
+    mask[3, 3] = False
+    mask[8:10, 8:11] = True  # 6 pixels
+    mask[0, 11] = True  # 1 pixel
+
+    assert remove_small_components(mask, 6).sum().item() == 24 + 6
+    assert th.equal(keep_largest_components(mask, 1), mask & (th.arange(12)[:, None] < 7) & (th.arange(12) < 7))
+    assert keep_largest_components(mask, 2).sum().item() == 24 + 6
+
+    filled = fill_holes(mask)
+    assert filled[3, 3] and (filled & ~mask).sum().item() == 1
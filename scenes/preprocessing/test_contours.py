@@ -0,0 +1,169 @@
+import os
+
+import numpy as np
+import pytest
+import torch as th
+from PIL import Image
+
+from preprocessing.components import label_components
+from preprocessing.cache import cache_location
+from preprocessing.contours import (
+    extract_contours,
+    load_contours,
+    load_or_build_contours,
+    marching_squares,
+    save_contours,
+    signed_area,
+    simplify,
+    simplify_contour,
+)
+from preprocessing.rasterize import even_odd_fill
+
+pytestmark = pytest.mark.usefixtures("in_tmp_path")
+
+
+def random_mask(h: int = 29, w: int = 41, density: float = 0.5, seed: int = 0) -> th.BoolTensor:
+    return th.rand(h, w, generator=th.Generator().manual_seed(seed)) < density
+
+
+def fill_contours(contours: list[np.ndarray], h: int, w: int) -> np.ndarray:
+    """
+    Even-odd fill of contours at pixel centers, which are at integer (x, y) in contour coordinates.
+    """
+    return even_odd_fill([contour.astype(np.float64) + 0.5 for contour in contours], 0, h, w)
+
+
+def distances_to_segments(points: np.ndarray, vertices: np.ndarray) -> np.ndarray:
+    """
+    Distance from each point to the nearest segment of a polyline, of shape (N,).
+    """
+    start, end = vertices[:-1, None].astype(np.float64), vertices[1:, None].astype(np.float64)  # shape: (S, 1, 2)
+    direction = end - start
+    length_squared = np.maximum((direction**2).sum(axis=2), 1e-12)
+    t = np.clip(((points[None] - start) * direction).sum(axis=2) / length_squared, 0, 1)  # shape: (S, N)
+    nearest = start + t[:, :, None] * direction
+
+    return np.hypot(*(points[None] - nearest).transpose(2, 0, 1)).min(axis=0)
+
+
+@pytest.mark.parametrize("density", [0.2, 0.5, 0.8])
+def test_contours_fill_back_to_the_mask(density: float) -> None:
+    for seed in range(4):
+        mask = random_mask(density=density, seed=seed)
+
+        contours = marching_squares(mask)
+
+        assert all(contour.dtype == np.float32 and contour.shape[1] == 2 for contour in contours)
+        assert np.array_equal(fill_contours(contours, *mask.shape), mask.numpy())
+
+
+@pytest.mark.parametrize("density", [0.2, 0.5, 0.8])
+def test_one_outer_contour_per_component_and_one_per_hole(density: float) -> None:
+    mask = random_mask(density=density, seed=5)
+
+    areas = [signed_area(contour) for contour in marching_squares(mask)]
+
+    # foreground is 8-connected, so background is 4-connected, and holes are the background inside the padding
+    _, num_components = label_components(mask, 8)
+    _, num_background = label_components(th.nn.functional.pad(~mask, (1, 1, 1, 1), value=True), 4)
+    assert sum(area > 0 for area in areas) == num_components
+    assert sum(area < 0 for area in areas) == num_background - 1
+
+
+def test_signed_area_matches_the_shoelace_formula() -> None:
+    # counterclockwise with y going up is clockwise in pixel coordinates
+    square = np.array([[0, 0], [0, 2], [3, 2], [3, 0]], dtype=np.float32)
+
+    assert signed_area(square) == 6.0
+    assert signed_area(square[::-1]) == -6.0
+    assert signed_area(marching_squares(th.ones(1, 1, dtype=th.bool))[0]) == 0.5
+
+
+@pytest.mark.parametrize("tolerance", [0.0, 0.5, 2.0])
+def test_simplify_stays_within_tolerance(tolerance: float) -> None:
+    rng = np.random.default_rng(0)
+    polyline = np.cumsum(rng.normal(size=(200, 2)), axis=0)
+
+    simplified = simplify(polyline, tolerance)
+
+    assert np.array_equal(simplified[0], polyline[0]) and np.array_equal(simplified[-1], polyline[-1])
+    assert np.all(distances_to_segments(polyline, simplified) <= tolerance + 1e-9)
+    assert all((polyline == point).all(axis=1).any() for point in simplified)
+
+
+def test_simplify_collapses_straight_lines() -> None:
+    line = np.stack([np.arange(10.0), 2 * np.arange(10.0)], axis=1)
+
+    assert np.array_equal(simplify(line, 0.01), line[[0, -1]])
+
+
+@pytest.mark.parametrize("tolerance", [0.5, 1.0, 3.0])
+def test_simplified_contours_stay_within_tolerance(tolerance: float) -> None:
+    rows, cols = np.mgrid[:40, :50]
+    mask = th.from_numpy(((rows - 20) / 15) ** 2 + ((cols - 24) / 20) ** 2 < 1)
+
+    (contour,) = marching_squares(mask)
+    simplified = simplify_contour(contour, tolerance)
+
+    assert simplified.shape[0] < contour.shape[0]
+    assert np.all(distances_to_segments(contour, np.concatenate([simplified, simplified[:1]])) <= tolerance + 1e-6)
+    assert signed_area(simplified) > 0
+
+
+def test_extract_contours_drops_specks() -> None:
+    mask = th.zeros(20, 20, dtype=th.bool)
+    mask[2:12, 2:12] = True
+    mask[5:7, 5:7] = False  # a hole of area 3.5 once traced
+    mask[16, 16] = True  # a speck of area 0.5
+
+    areas = sorted(signed_area(contour) for contour in extract_contours(mask, tolerance=0.0, min_area=1.0))
+
+    assert areas == [-3.5, 99.5]
+    assert len(extract_contours(mask, min_area=4.0)) == 1
+
+
+def test_saved_contours_round_trip() -> None:
+    contours = marching_squares(random_mask(seed=6))
+
+    save_contours(contours, "contours.npz", (29, 41), tolerance=0.5)
+    loaded, metadata = load_contours("contours.npz")
+
+    assert len(loaded) == len(contours)
+    assert all(np.array_equal(a, b) for a, b in zip(loaded, contours))
+    assert metadata == {"height": 29, "width": 41, "mask_stamp": [], "tolerance": 0.5}
+
+
+def test_contours_traced_on_a_miss_go_to_the_cache() -> None:
+    mask = random_mask(seed=7, density=0.7)
+    Image.fromarray(mask.numpy().astype(np.uint8) * 255).save("region_mask.png")
+
+    contours, metadata = load_or_build_contours("region_mask.png", tolerance=0.0, min_area=0.0, cache_dir="traced")
+
+    assert np.array_equal(fill_contours(contours, *mask.shape), mask.numpy())
+    assert (metadata["height"], metadata["width"]) == tuple(mask.shape)
+    assert sorted(os.listdir(".")) == ["region_mask.png", "traced"]
+
+    # the cache is reused, and other parameters get their own entry
+    load_or_build_contours("region_mask.png", tolerance=0.0, min_area=0.0, cache_dir="traced")
+    assert len(os.listdir("traced")) == 1
+    load_or_build_contours("region_mask.png", cache_dir="traced")
+    assert len(os.listdir("traced")) == 2
+
+
+def test_the_media_pipeline_contours_are_used_when_up_to_date() -> None:
+    Image.fromarray(random_mask(seed=8).numpy().astype(np.uint8) * 255).save("region_mask.png")
+    square = np.array([[0, 0], [0, 2], [3, 2], [3, 0]], dtype=np.float32)
+    save_contours(
+        [square],
+        "region_mask_contours.npz",
+        (29, 41),
+        mask_path="region_mask.png",
+        alpha_threshold=200,
+        tolerance=1.0,
+        min_area=4.0,
+    )
+
+    contours, _ = load_or_build_contours("region_mask.png")
+
+    assert len(contours) == 1 and np.array_equal(contours[0], square)
+    assert not os.path.exists(cache_location("contours"))
@@ -0,0 +1,64 @@
+import pytest
+import torch as th
+
+from preprocessing.cutting import (
+    bisect_angles,
+    bisect_angles_segmented,
+    concat_regions,
+    count_positive,
+    count_positive_segmented,
+)
+
+
+def random_regions(sizes: list[int], seed: int = 0) -> list[th.Tensor]:
+    generator = th.Generator().manual_seed(seed)
+    return [th.randn(size, 2, generator=generator) * (index + 1) + index * 3 for index, size in enumerate(sizes)]
+
+
+def test_concat_regions_tags_points_by_region() -> None:
+    regions = random_regions([3, 1, 4])
+    points, region_ids = concat_regions(*regions)
+
+    assert th.equal(points, th.cat(regions))
+    assert region_ids.tolist() == [0, 0, 0, 1, 2, 2, 2, 2]
+
+
+@pytest.mark.parametrize("sizes", [[1], [2, 7], [50, 1, 33, 4]])
+def test_bisect_angles_segmented_matches_per_region_bisect(sizes: list[int]) -> None:
+    regions = random_regions(sizes)
+    points, region_ids = concat_regions(*regions)
+    angles = th.linspace(0, 2 * th.pi, 37)
+
+    biases = bisect_angles_segmented(points, region_ids, angles)
+
+    assert biases.shape == (len(sizes), angles.shape[0])
+    for index, region in enumerate(regions):
+        assert th.equal(biases[index], bisect_angles(region, angles))
+
+
+def test_bisect_angles_segmented_rejects_empty_regions() -> None:
+    points, region_ids = concat_regions(*random_regions([5, 6]))
+
+    with pytest.raises(AssertionError):
+        bisect_angles_segmented(points, region_ids, th.tensor([0.0]), num_regions=3)
+
+
+@pytest.mark.parametrize("theta", [0.0, 0.3, th.pi / 2, 2.5, -1.0])
+def test_count_positive_segmented_matches_per_region_count(theta: float) -> None:
+    regions = random_regions([20, 3, 41])
+    points, region_ids = concat_regions(*regions)
+    biases = th.tensor([0.1, -2.0, 5.0])
+
+    counts = count_positive_segmented(points, region_ids, theta, biases)
+
+    expected = [count_positive(region, theta, bias.item()) for region, bias in zip(regions, biases)]
+    assert counts.tolist() == expected
+
+
+def test_count_positive_segmented_shares_a_scalar_bias() -> None:
+    regions = random_regions([10, 10])
+    points, region_ids = concat_regions(*regions)
+
+    counts = count_positive_segmented(points, region_ids, 1.0, 0.5)
+
+    assert counts.tolist() == [count_positive(region, 1.0, 0.5) for region in regions]
@@ -0,0 +1,62 @@
+import os
+from pathlib import Path
+
+import numpy as np
+import torch as th
+from PIL import Image
+
+from preprocessing.mask import alpha_channel, decode_rgba
+
+
+def random_rgba(h: int = 12, w: int = 9, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).integers(0, 256, (h, w, 4), dtype=np.uint8)
+
+
+def test_arrays_are_viewed_without_copying() -> None:
+    pixels = random_rgba()
+
+    decoded = decode_rgba(pixels)
+
+    assert decoded.data_ptr() == pixels.ctypes.data
+    assert th.equal(decoded, th.from_numpy(pixels))
+
+
+def test_read_only_arrays_are_viewed_too() -> None:
+    pixels = random_rgba(seed=1)
+    pixels.flags.writeable = False
+
+    assert decode_rgba(pixels).data_ptr() == pixels.ctypes.data
+
+
+def test_images_are_converted_to_rgba() -> None:
+    rgb = random_rgba(seed=2)[:, :, :3]
+
+    decoded = decode_rgba(Image.fromarray(rgb))
+
+    assert decoded.shape == (12, 9, 4)
+    assert th.equal(decoded[:, :, :3], th.from_numpy(rgb))
+    assert (decoded[:, :, 3] == 255).all()
+
+
+def test_paths_are_decoded_once_per_version(tmp_path: Path) -> None:
+    path = os.path.join(tmp_path, "image.png")
+    Image.fromarray(random_rgba(seed=3)).save(path)
+
+    first = decode_rgba(path)
+    assert decode_rgba(path) is first
+    assert th.equal(first, th.from_numpy(random_rgba(seed=3)))
+
+    # a rewritten file is decoded again, even through a relative path
+    Image.fromarray(random_rgba(seed=4)).save(path)
+    os.utime(path, ns=(os.stat(path).st_atime_ns, os.stat(path).st_mtime_ns + 1_000_000))
+    second = decode_rgba(os.path.relpath(path))
+    assert second is not first
+    assert th.equal(second, th.from_numpy(random_rgba(seed=4)))
+
+
+def test_alpha_channel_of_every_source() -> None:
+    pixels = random_rgba(seed=5)
+    expected = th.from_numpy(pixels[:, :, 3])
+
+    assert th.equal(alpha_channel(pixels), expected)
+    assert th.equal(alpha_channel(Image.fromarray(pixels)), expected)
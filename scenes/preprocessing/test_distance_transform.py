@@ -0,0 +1,69 @@
+import math
+
+import pytest
+import torch as th
+
+from preprocessing.erode_dilate import DistanceMorphology, distance_transform, squared_distance_transform
+
+
+def brute_squared_distances(mask: th.BoolTensor) -> th.Tensor:
+    h, w = mask.shape
+    pixels = th.cartesian_prod(th.arange(h), th.arange(w)).double()  # shape: (H * W, 2)
+    set_pixels = th.nonzero(mask).double()
+    if set_pixels.shape[0] == 0:
+        return th.full((h, w), math.inf, dtype=th.float64)
+    return (th.cdist(pixels, set_pixels) ** 2).min(dim=1).values.round().reshape(h, w)
+
+
+def brute_dilate(mask: th.BoolTensor, radius: float) -> th.BoolTensor:
+    return brute_squared_distances(mask) <= radius**2
+
+
+def brute_erode(mask: th.BoolTensor, radius: float) -> th.BoolTensor:
+    padded = th.nn.functional.pad(~mask, (1, 1, 1, 1), value=True)
+    return brute_squared_distances(padded)[1:-1, 1:-1] > radius**2
+
+
+@pytest.mark.parametrize("shape", [(1, 1), (1, 13), (9, 1), (23, 31), (40, 17)])
+@pytest.mark.parametrize("density", [0.02, 0.3, 0.9])
+def test_squared_distances_match_brute_force(shape: tuple[int, int], density: float) -> None:
+    mask = th.rand(shape, generator=th.Generator().manual_seed(sum(shape))) < density
+
+    assert th.equal(squared_distance_transform(mask), brute_squared_distances(mask))
+
+
+def test_empty_mask_is_infinitely_far() -> None:
+    assert th.isinf(distance_transform(th.zeros(4, 5, dtype=th.bool))).all()
+
+
+def test_batches_are_transformed_independently() -> None:
+    masks = th.rand(3, 15, 12, generator=th.Generator().manual_seed(1)) < 0.1
+    masks[1] = False
+
+    batched = squared_distance_transform(masks)
+
+    for index in range(3):
+        assert th.equal(batched[index], squared_distance_transform(masks[index]))
+
+
+@pytest.mark.parametrize("radius", [0.5, 1, 1.5, 2, 3.5])
+def test_morphology_matches_round_structuring_elements(radius: float) -> None:
+    mask = th.rand(30, 28, generator=th.Generator().manual_seed(2)) < 0.6
+    morphology = DistanceMorphology(mask)
+
+    assert th.equal(morphology.dilate(radius), brute_dilate(mask, radius))
+    assert th.equal(morphology.erode(radius), brute_erode(mask, radius))
+    assert th.equal(morphology.open(radius), brute_dilate(brute_erode(mask, radius), radius))
+    assert th.equal(morphology.close(radius), brute_erode(brute_dilate(mask, radius), radius))
+
+
+def test_opening_removes_thin_lines_and_closing_fills_thin_gaps() -> None:
+    mask = th.zeros(20, 20, dtype=th.bool)
+    mask[2:9, 2:18] = True
+    mask[12, 2:18] = True  # a one pixel line
+    mask[5, 8] = False  # a one pixel hole
+
+    morphology = DistanceMorphology(mask)
+
+    assert not morphology.open(1)[12].any()
+    assert morphology.close(1)[5, 8]
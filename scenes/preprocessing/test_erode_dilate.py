@@ -0,0 +1,88 @@
+import pytest
+import torch as th
+
+from preprocessing.erode_dilate import dilate, erode, filter_for_n_neighbors, running_max, running_sum
+
+
+def random_mask(shape: tuple[int, ...], density: float = 0.5, seed: int = 0) -> th.BoolTensor:
+    return th.rand(shape, generator=th.Generator().manual_seed(seed)) < density
+
+
+def convolved_neighbors(mask: th.BoolTensor, kernel: th.Tensor) -> th.Tensor:
+    """
+    Neighbor counts by direct convolution, as erode_dilate did before the running filters.
+    """
+    kernel_height, kernel_width = kernel.shape
+    batched = mask.reshape(-1, 1, *mask.shape[-2:]).double()
+    neighbors = th.nn.functional.conv2d(
+        batched, kernel.double()[None, None], padding=(kernel_height // 2, kernel_width // 2)
+    )
+    return neighbors.reshape(mask.shape).round().long()
+
+
+def structuring_element(kernel_size: int | tuple[int, int], kernel_shape: str) -> th.Tensor:
+    kernel_height, kernel_width = (kernel_size, kernel_size) if isinstance(kernel_size, int) else kernel_size
+    if kernel_shape == "rect":
+        return th.ones(kernel_height, kernel_width)
+
+    kernel = th.zeros(kernel_height, kernel_width)
+    kernel[kernel_height // 2] = 1
+    kernel[:, kernel_width // 2] = 1
+    return kernel
+
+
+@pytest.mark.parametrize("window", [1, 3, 5, 9, 31])
+@pytest.mark.parametrize("length", [1, 4, 17])
+def test_running_max_and_sum_match_windows(window: int, length: int) -> None:
+    values = th.randint(0, 100, (3, length), generator=th.Generator().manual_seed(window))
+    radius = window // 2
+    padded = th.nn.functional.pad(values, (radius, radius), value=-1)
+    windows = padded.unfold(1, window, 1)  # shape: (3, length, window)
+
+    assert th.equal(running_max(values, window, dim=1, fill=-1), windows.max(dim=2).values)
+    assert th.equal(running_sum(values, window, dim=1), windows.clamp(min=0).sum(dim=2))
+
+
+@pytest.mark.parametrize("kernel_size", [1, 3, 7, (3, 9), (11, 1)])
+@pytest.mark.parametrize("kernel_shape", ["rect", "cross"])
+def test_neighbor_counts_match_convolution(kernel_size: int | tuple[int, int], kernel_shape: str) -> None:
+    mask = random_mask((2, 40, 33))
+    kernel = structuring_element(kernel_size, kernel_shape)
+    neighbors = convolved_neighbors(mask, kernel)
+
+    kernel_area = int(kernel.sum().item())
+    for n_neighbors in sorted({1, min(2, kernel_area), kernel_area}):
+        filtered = filter_for_n_neighbors(mask, n_neighbors, kernel_size=kernel_size, kernel_shape=kernel_shape)
+        assert th.equal(filtered, neighbors >= n_neighbors)
+
+
+@pytest.mark.parametrize("kernel_size", [3, 5, (3, 7)])
+@pytest.mark.parametrize("iterations", [1, 2, 4])
+@pytest.mark.parametrize("kernel_shape", ["rect", "cross"])
+def test_erode_and_dilate_match_repeated_convolution(
+    kernel_size: int | tuple[int, int], iterations: int, kernel_shape: str
+) -> None:
+    mask = random_mask((50, 47), density=0.6, seed=1)
+    kernel = structuring_element(kernel_size, kernel_shape)
+
+    dilated, eroded = mask, mask
+    for _ in range(iterations):
+        dilated = convolved_neighbors(dilated, kernel) >= 1
+        eroded = convolved_neighbors(eroded, kernel) >= kernel.sum().item()
+
+    assert th.equal(dilate(mask, kernel_size, iterations, kernel_shape), dilated)
+    assert th.equal(erode(mask, kernel_size, iterations, kernel_shape), eroded)
+
+
+def test_erosion_treats_the_outside_as_background() -> None:
+    mask = th.ones(6, 6, dtype=th.bool)
+
+    eroded = erode(mask, 3)
+
+    assert not eroded[0].any() and not eroded[:, -1].any()
+    assert eroded[1:-1, 1:-1].all()
+
+
+def test_even_kernels_are_rejected() -> None:
+    with pytest.raises(AssertionError):
+        dilate(random_mask((5, 5)), 4)
@@ -0,0 +1,84 @@
+
+import numpy as np
+import pytest
+import torch as th
+
+from preprocessing.erode_dilate import dilate, erode
+from preprocessing.expression import MaskExpr, colors
+from preprocessing.mask import palette_labels
+from preprocessing.tiles import map_strips
+
+BLUE, GREY, TEAL = (28, 151, 179), (157, 157, 156), (30, 160, 170)
+
+
+def noisy_map_pixels(h: int = 60, w: int = 45, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    palette = np.array([BLUE, GREY, TEAL, (0, 0, 0)])
+    rgb = np.clip(palette[rng.integers(0, 4, (h, w))] + rng.integers(-8, 9, (h, w, 3)), 0, 255)
+    alpha = rng.choice([0, 255], (h, w, 1), p=[0.1, 0.9])
+    return np.concatenate([rgb, alpha], axis=2).astype(np.uint8)
+
+
+def test_evaluation_matches_the_direct_operations() -> None:
+    pixels = noisy_map_pixels()
+    expression = (colors(BLUE, GREY).erode().dilate(7) & ~colors(GREY)).erode(5) | colors(TEAL, delta=6.0)
+
+    labels = palette_labels(pixels, (BLUE, GREY, GREY))
+    teal = palette_labels(pixels, (TEAL,), delta=6.0) == 0
+    expected = erode(dilate(erode((labels >= 0) & (labels <= 1)), 7) & ~(labels == 2), 5) | teal
+
+    assert th.equal(expression(pixels), expected)
+
+
+def test_shared_sub_expressions_are_not_overwritten() -> None:
+    pixels = noisy_map_pixels(seed=1)
+    blue = colors(BLUE)
+    grey = colors(GREY)
+    expression = ((blue | grey) & ~blue) | (blue & grey.dilate())
+
+    labels = palette_labels(pixels, (BLUE, GREY))
+    blue_mask, grey_mask = labels == 0, labels == 1
+    expected = ((blue_mask | grey_mask) & ~blue_mask) | (blue_mask & dilate(grey_mask))
+
+    assert th.equal(expression(pixels), expected)
+
+
+def test_colors_with_the_same_delta_are_labelled_together() -> None:
+    pixels = noisy_map_pixels(seed=2)
+
+    # a pixel near both blue and teal only goes to the nearer one
+    blue, teal = colors(BLUE, delta=20.0), colors(TEAL, delta=20.0)
+    labels = palette_labels(pixels, (BLUE, TEAL), delta=20.0)
+
+    assert th.equal((blue | teal)(pixels), labels >= 0)
+    assert th.equal((blue & teal)(pixels), th.zeros_like(labels, dtype=th.bool))
+    assert th.equal(blue(pixels) | teal(pixels), (labels >= 0) | (palette_labels(pixels, (TEAL,), delta=20.0) == 0))
+
+
+def test_halo_adds_up_the_radii_along_the_longest_path() -> None:
+    assert colors(BLUE, GREY).erode().dilate(7).erode(5).halo == 6
+    assert colors(BLUE).erode((3, 9)).halo == 1
+    assert colors(BLUE).dilate(3, iterations=4).halo == 4
+    assert (colors(BLUE).erode(5) | colors(GREY).dilate(9)).halo == 4
+    assert (~colors(BLUE)).halo == 0
+
+
+@pytest.mark.parametrize("strip_height", [1, 5, 16])
+def test_strips_with_the_halo_match_the_whole_image(strip_height: int) -> None:
+    pixels = noisy_map_pixels(seed=3)
+    expression = (colors(BLUE, GREY).erode().dilate(7) | colors(TEAL).dilate(3, kernel_shape="cross")).erode(5)
+    output = np.zeros(pixels.shape[:2], dtype=bool)
+
+    map_strips(pixels, expression, output, strip_height=strip_height, halo=expression.halo, max_workers=2)
+
+    assert np.array_equal(output, expression(pixels).numpy())
+
+
+def test_repr_rebuilds_the_expression() -> None:
+    expression = ~(colors(BLUE, GREY, delta=12).erode(kernel_shape="cross") & colors(TEAL, alpha_threshold=0))
+
+    rebuilt = eval(repr(expression), {"colors": colors})
+
+    assert isinstance(rebuilt, MaskExpr)
+    assert repr(rebuilt) == repr(expression)
+    assert th.equal(rebuilt(noisy_map_pixels(seed=4)), expression(noisy_map_pixels(seed=4)))
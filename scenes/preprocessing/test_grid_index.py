@@ -0,0 +1,61 @@
+import math
+
+import pytest
+import torch as th
+
+from preprocessing.cutting import count_positive
+from preprocessing.grid_index import GridIndex
+
+
+def random_lines(num_lines: int, seed: int = 0) -> list[tuple[float, float]]:
+    generator = th.Generator().manual_seed(seed)
+    thetas = th.rand(num_lines, generator=generator) * 2 * math.pi
+    biases = th.randn(num_lines, generator=generator) * 3
+    return list(zip(thetas.tolist(), biases.tolist()))
+
+
+@pytest.mark.parametrize("cells_per_side", [None, 1, 3, 50])
+def test_counts_match_count_positive(cells_per_side: int | None) -> None:
+    points = th.randn(3000, 2, generator=th.Generator().manual_seed(1)) * th.tensor([4.0, 1.0])
+    index = GridIndex(points, cells_per_side=cells_per_side)
+
+    for theta, bias in random_lines(200):
+        assert index.count_positive(theta, bias) == count_positive(points, theta, bias)
+
+
+@pytest.mark.parametrize("theta", [0.0, math.pi / 4, math.pi / 2, math.pi, 3 * math.pi / 2, -math.pi / 4])
+def test_axis_aligned_and_diagonal_lines(theta: float) -> None:
+    points = th.rand(1000, 2, generator=th.Generator().manual_seed(2)) * 10
+    index = GridIndex(points)
+
+    for bias in (-20.0, -1.0, 0.5, 3.3, 7.0, 20.0):
+        assert index.count_positive(theta, bias) == count_positive(points, theta, bias)
+
+
+def test_integer_points_differ_only_on_the_line() -> None:
+    generator = th.Generator().manual_seed(3)
+    points = th.randint(0, 60, (2000, 2), generator=generator)
+    index = GridIndex(points)
+    float_points = points.double()
+
+    for _ in range(300):
+        rise = th.randint(-3, 4, (1,), generator=generator).item()
+        run = th.randint(1, 4, (1,), generator=generator).item()
+        theta = math.atan2(rise, run)
+        through = float_points[th.randint(points.shape[0], (1,), generator=generator)][0]
+        bias = (through @ th.tensor([math.cos(theta), math.sin(theta)], dtype=th.float64)).item()
+
+        # lines through a pixel may put the pixels exactly on them on either side
+        distances = float_points @ th.tensor([math.cos(theta), math.sin(theta)], dtype=th.float64) - bias
+        assert (distances > 1e-4).sum().item() <= index.count_positive(theta, bias) <= (distances > -1e-4).sum().item()
+
+
+def test_degenerate_point_sets() -> None:
+    assert GridIndex(th.zeros(0, 2)).count_positive(0.3, 0.0) == 0
+
+    same_point = GridIndex(th.ones(10, 2))
+    assert same_point.count_positive(0.0, 0.5) == 10
+    assert same_point.count_positive(0.0, 1.5) == 0
+
+    line = th.stack([th.arange(20.0), th.zeros(20)], dim=1)
+    assert GridIndex(line).count_positive(0.0, 9.5) == count_positive(line, 0.0, 9.5)
@@ -0,0 +1,89 @@
+import math
+from typing import Self
+
+import pytest
+import torch as th
+
+from preprocessing.cutting import KineticBisector, bisect_angles
+
+
+class Tracker:
+    """
+    Stands in for manim's ValueTracker.
+    """
+
+    def __init__(self: Self, value: float) -> None:
+        self.value = value
+
+    def get_value(self: Self) -> float:
+        return self.value
+
+    def set_value(self: Self, value: float) -> None:
+        self.value = value
+
+
+def smooth(t: float) -> float:
+    # manim's default rate function
+    return 3 * t**2 - 2 * t**3
+
+
+def blob(num_points: int, seed: int = 0) -> th.Tensor:
+    generator = th.Generator().manual_seed(seed)
+    return th.randn(num_points, 2, generator=generator) * th.tensor([2.0, 0.5])
+
+
+@pytest.mark.parametrize(
+    ("start", "end", "num_frames"),
+    [(0.0, 2 * math.pi, 600), (2 * math.pi, 4 * math.pi, 240), (math.pi / 24, -math.pi / 24, 24)],
+)
+def test_bisect_matches_bisect_angles_over_a_sweep(start: float, end: float, num_frames: int) -> None:
+    points = blob(5001)
+    thetas = [start + (end - start) * smooth(frame / num_frames) for frame in range(num_frames + 1)]
+
+    bisector = KineticBisector(points)
+    biases = th.tensor([bisector.bisect(theta) for theta in thetas])
+
+    assert th.equal(biases, bisect_angles(points, th.tensor(thetas)))
+    # one anchor lasts for several frames of a smooth sweep
+    assert bisector.num_anchors < num_frames / 2
+
+
+def test_bisect_survives_jumps_and_reversals() -> None:
+    points = blob(2000, seed=1)
+    thetas = [0.0, 0.01, 0.02, 3.0, 2.99, -1.0, -1.0, 0.5, 0.49, 0.48, 10.0]
+
+    bisector = KineticBisector(points)
+    biases = th.tensor([bisector.bisect(theta) for theta in thetas])
+
+    assert th.equal(biases, bisect_angles(points, th.tensor(thetas)))
+
+
+@pytest.mark.parametrize("num_points", [1, 2, 3, 10])
+def test_bisect_handles_few_points(num_points: int) -> None:
+    points = blob(num_points, seed=2)
+    thetas = th.linspace(0, 1, 11)
+
+    bisector = KineticBisector(points, frames_per_anchor=1)
+
+    assert th.equal(th.tensor([bisector.bisect(theta) for theta in thetas]), bisect_angles(points, thetas))
+
+
+def test_integer_points_are_bisected_like_float_points() -> None:
+    points = th.randint(-50, 50, (999, 2), generator=th.Generator().manual_seed(3))
+    thetas = th.linspace(0, math.pi, 50)
+
+    bisector = KineticBisector(points)
+    biases = th.tensor([bisector.bisect(theta) for theta in thetas], dtype=th.float64)
+
+    assert th.allclose(biases, bisect_angles(points.double(), thetas.double()))
+
+
+def test_updater_follows_the_theta_tracker() -> None:
+    points = blob(300, seed=4)
+    theta, bias = Tracker(0.25), Tracker(0.0)
+    updater = KineticBisector(points, theta)
+
+    for value in (0.25, 0.3, 0.35):
+        theta.set_value(value)
+        updater(bias)
+        assert bias.get_value() == bisect_angles(points, th.tensor([value])).item()
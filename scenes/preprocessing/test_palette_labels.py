@@ -0,0 +1,58 @@
+
+import numpy as np
+import pytest
+import torch as th
+
+from preprocessing.mask import color_mask, palette_labels
+
+PALETTE = ((28, 151, 179), (157, 157, 156), (30, 160, 170))
+
+
+def noisy_palette_pixels(h: int = 40, w: int = 50, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    colors = np.array(PALETTE)[rng.integers(0, len(PALETTE), (h, w))]
+    rgb = np.clip(colors + rng.integers(-14, 15, (h, w, 3)), 0, 255)
+    alpha = rng.integers(0, 256, (h, w, 1))
+    return np.concatenate([rgb, alpha], axis=2).astype(np.uint8)
+
+
+def nearest_labels(pixels: np.ndarray, palette: tuple, alpha_threshold: int, delta: float) -> np.ndarray:
+    """
+    Labels by measuring every pixel against every palette color, first color first on ties.
+    """
+    rgb = pixels[:, :, :3].astype(np.int64)
+    squared_distances = np.stack([((rgb - color) ** 2).sum(axis=2) for color in palette], axis=2)
+    labels = squared_distances.argmin(axis=2)
+    labelled = (squared_distances.min(axis=2) < delta**2) & (pixels[:, :, 3] > alpha_threshold)
+    return np.where(labelled, labels, -1)
+
+
+@pytest.mark.parametrize("delta", [1.0, 6.5, 10.0, 20.0])
+@pytest.mark.parametrize("alpha_threshold", [0, 16, 200])
+def test_labels_match_nearest_palette_color(delta: float, alpha_threshold: int) -> None:
+    pixels = noisy_palette_pixels()
+
+    labels = palette_labels(pixels, PALETTE, alpha_threshold=alpha_threshold, delta=delta)
+
+    assert labels.dtype == th.int8
+    assert np.array_equal(labels.numpy(), nearest_labels(pixels, PALETTE, alpha_threshold, delta))
+
+
+def test_color_mask_is_the_one_color_palette() -> None:
+    pixels = noisy_palette_pixels(seed=1)
+
+    for color in PALETTE:
+        expected = nearest_labels(pixels, (color,), 16, 10.0) == 0
+        assert np.array_equal(color_mask(pixels, color).numpy(), expected)
+
+
+def test_distances_do_not_wrap_around_below_the_color() -> None:
+    # uint8 differences would make every channel below the target color look far away
+    pixels = np.array([[[20, 145, 175, 255], [35, 155, 185, 255]]], dtype=np.uint8)
+
+    assert color_mask(pixels, PALETTE[0], delta=12.0).tolist() == [[True, True]]
+
+
+def test_palette_size_is_bounded() -> None:
+    with pytest.raises(AssertionError):
+        palette_labels(noisy_palette_pixels(), ())
@@ -0,0 +1,97 @@
+import os
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from preprocessing.cache import cache_location
+from preprocessing.point_cloud import load_or_build_point_cloud, load_point_cloud, point_cloud, save_point_cloud
+
+pytestmark = pytest.mark.usefixtures("in_tmp_path")
+
+
+def random_alpha(h: int = 37, w: int = 23, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).integers(0, 256, (h, w), dtype=np.uint8)
+
+
+def write_mask(alpha: np.ndarray, path: str = "region_mask.png", mtime_ns: int | None = None) -> str:
+    Image.fromarray(alpha).save(path)
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+    return path
+
+
+@pytest.mark.parametrize("alpha_threshold", [0, 200, 255])
+@pytest.mark.parametrize("strip_height", [1, 5, 1024])
+def test_point_cloud_matches_argwhere(alpha_threshold: int, strip_height: int) -> None:
+    alpha = random_alpha()
+
+    points = point_cloud(alpha, alpha_threshold, strip_height=strip_height)
+
+    assert points.dtype == np.int16
+    assert np.array_equal(points, np.argwhere(alpha > alpha_threshold))
+
+
+def test_point_cloud_of_an_empty_mask() -> None:
+    assert point_cloud(np.zeros((4, 6), dtype=np.uint8)).shape == (0, 2)
+    assert point_cloud(np.zeros((0, 6), dtype=np.uint8)).shape == (0, 2)
+
+
+def test_saved_point_clouds_round_trip() -> None:
+    alpha = random_alpha(seed=1)
+    mask_path = write_mask(alpha)
+
+    save_point_cloud(alpha, "points.npy", 100, mask_path=mask_path)
+    points, metadata = load_point_cloud("points.npy")
+
+    assert np.array_equal(points, np.argwhere(alpha > 100))
+    assert metadata["height"] == 37 and metadata["width"] == 23
+    assert metadata["alpha_threshold"] == 100 and metadata["num_points"] == points.shape[0]
+    assert metadata["mask"]["path"] == mask_path and metadata["mask"]["size"] == os.path.getsize(mask_path)
+
+
+def test_the_media_pipeline_point_cloud_is_used_when_up_to_date() -> None:
+    alpha = random_alpha(seed=2)
+    mask_path = write_mask(alpha)
+    save_point_cloud(alpha[::-1], "region_mask_points.npy", 200, mask_path=mask_path)
+
+    # the saved points are of the flipped mask, so loading them shows they were not rebuilt
+    points, _ = load_or_build_point_cloud(mask_path)
+
+    assert np.array_equal(points, np.argwhere(alpha[::-1] > 200))
+    assert not os.path.exists(cache_location("point_clouds"))
+
+
+def test_point_clouds_built_on_a_miss_go_to_the_cache() -> None:
+    alpha = random_alpha(seed=3)
+    mask_path = write_mask(alpha)
+
+    points, metadata = load_or_build_point_cloud(mask_path, cache_dir="clouds")
+
+    assert np.array_equal(points, np.argwhere(alpha > 200))
+    assert metadata["mask"]["path"] == mask_path
+    assert sorted(os.listdir(".")) == ["clouds", "region_mask.png"]
+    assert len(os.listdir("clouds")) == 2  # the points and their metadata
+
+    # a second load reads the cache, and another threshold gets its own entry
+    cached_points, _ = load_or_build_point_cloud(mask_path, cache_dir="clouds")
+    assert np.array_equal(cached_points, points)
+    assert len(os.listdir("clouds")) == 2
+
+    points, _ = load_or_build_point_cloud(mask_path, alpha_threshold=50, cache_dir="clouds")
+    assert np.array_equal(points, np.argwhere(alpha > 50))
+    assert len(os.listdir("clouds")) == 4
+
+
+def test_stale_point_clouds_are_rebuilt() -> None:
+    alpha = random_alpha(seed=4)
+    mask_path = write_mask(alpha, mtime_ns=1_000_000_000)
+    save_point_cloud(alpha, "region_mask_points.npy", 200, mask_path=mask_path)
+
+    # the mask is edited after its point cloud was saved
+    write_mask(alpha[::-1], mtime_ns=2_000_000_000)
+    points, _ = load_or_build_point_cloud(mask_path)
+
+    assert np.array_equal(points, np.argwhere(alpha[::-1] > 200))
+    assert np.array_equal(load_point_cloud("region_mask_points.npy")[0], np.argwhere(alpha > 200))
@@ -0,0 +1,85 @@
+import math
+
+import numpy as np
+import pytest
+
+from preprocessing.pyramid import build_pyramid, downsample
+
+
+def random_rgba(h: int, w: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    pixels = rng.integers(0, 256, (h, w, 4), dtype=np.uint8)
+    pixels[rng.random((h, w)) < 0.3, 3] = 0
+    return pixels
+
+
+def weighted_average_blocks(pixels: np.ndarray) -> np.ndarray:
+    """
+    Alpha-weighted average of each block of pixels, with the blocks of area interpolation for odd sizes.
+    """
+    h, w, _ = pixels.shape
+    out_h, out_w = max(h // 2, 1), max(w // 2, 1)
+    pixels = pixels.astype(np.float64)
+
+    averaged = np.zeros((out_h, out_w, 4))
+    for i in range(out_h):
+        for j in range(out_w):
+            rows = slice(i * h // out_h, math.ceil((i + 1) * h / out_h))
+            cols = slice(j * w // out_w, math.ceil((j + 1) * w / out_w))
+            block = pixels[rows, cols].reshape(-1, 4)
+            alpha = block[:, 3]
+
+            averaged[i, j, 3] = alpha.mean()
+            if alpha.sum() > 0:
+                averaged[i, j, :3] = (block[:, :3] * alpha[:, None]).sum(axis=0) / alpha.sum()
+            else:
+                averaged[i, j, :3] = block[:, :3].mean(axis=0)
+
+    return averaged
+
+
+@pytest.mark.parametrize("shape", [(2, 2), (8, 6), (9, 7), (1, 5), (13, 1)])
+def test_downsample_matches_weighted_averages(shape: tuple[int, int]) -> None:
+    pixels = random_rgba(*shape)
+
+    downsampled = downsample(pixels)
+
+    expected = weighted_average_blocks(pixels)
+    assert downsampled.dtype == np.uint8 and downsampled.shape == expected.shape
+    assert np.abs(downsampled.astype(np.float64) - expected).max() <= 0.5 + 1e-3
+
+
+def test_transparent_colors_do_not_bleed() -> None:
+    pixels = np.zeros((2, 4, 4), dtype=np.uint8)
+    pixels[:, :2] = (255, 0, 0, 0)  # red under full transparency
+    pixels[0, 1] = (0, 0, 255, 255)  # next to one blue pixel
+    pixels[:, 2:] = (0, 255, 0, 0)  # a fully transparent green block
+
+    downsampled = downsample(pixels)
+
+    assert downsampled[0, 0].tolist() == [0, 0, 255, 64]
+    assert downsampled[0, 1].tolist() == [0, 255, 0, 0]
+
+
+@pytest.mark.parametrize(
+    "shape, min_size, sizes",
+    [
+        ((100, 70), 16, [(100, 70), (50, 35), (25, 17), (12, 8)]),
+        ((64, 64), 16, [(64, 64), (32, 32), (16, 16)]),
+        ((10, 300), 16, [(10, 300)]),
+        ((40, 41), 1, [(40, 41), (20, 20), (10, 10), (5, 5), (2, 2), (1, 1)]),
+    ],
+)
+def test_pyramid_levels_halve_down_to_min_size(
+    shape: tuple[int, int],
+    min_size: int,
+    sizes: list[tuple[int, int]],
+) -> None:
+    pixels = random_rgba(*shape, seed=1)
+
+    levels = build_pyramid(pixels, min_size=min_size)
+
+    assert [level.shape[:2] for level in levels] == sizes
+    assert np.array_equal(levels[0], pixels)
+    assert all(np.array_equal(smaller, downsample(level)) for level, smaller in zip(levels, levels[1:]))
+
@@ -0,0 +1,63 @@
+import pytest
+import torch as th
+
+from preprocessing.cutting import bisect_angles, quantile_cuts
+
+
+def random_points(num_points: int, seed: int = 0) -> th.Tensor:
+    return th.randn(num_points, 2, generator=th.Generator().manual_seed(seed))
+
+
+@pytest.mark.parametrize("num_points", [1, 2, 9, 100])
+def test_half_gives_the_bisecting_bias(num_points: int) -> None:
+    points = random_points(num_points)
+    angles = th.linspace(0, 6, 25)
+
+    biases = quantile_cuts(points, angles, th.tensor([0.5]))
+
+    assert th.equal(biases[:, 0], bisect_angles(points, angles))
+
+
+def test_fractions_split_off_that_many_points() -> None:
+    points = random_points(200, seed=1)
+    angles = th.tensor([0.0, 1.0, 2.0])
+    qs = th.tensor([0.0, 0.125, 0.25, 0.875, 1.0])  # exact in float32
+
+    biases = quantile_cuts(points, angles, qs)
+
+    projections = points @ th.stack([th.cos(angles), th.sin(angles)], dim=1).T  # shape: (N, A)
+    for angle_index in range(angles.shape[0]):
+        for q_index, q in enumerate(qs.tolist()):
+            bias = biases[angle_index, q_index]
+            # the cut is a point of the set, the first at which the fraction on its negative side reaches q
+            assert (projections[:, angle_index] == bias).any()
+            assert (projections[:, angle_index] <= bias).sum().item() >= q * points.shape[0]
+            assert (projections[:, angle_index] < bias).sum().item() < max(q * points.shape[0], 1)
+
+
+def test_integer_weights_act_like_repeated_points() -> None:
+    points = random_points(30, seed=2)
+    weights = th.randint(1, 4, (30,), generator=th.Generator().manual_seed(3))
+    angles = th.linspace(0, 3, 7)
+    qs = th.tensor([0.2, 0.5, 0.8])
+
+    weighted = quantile_cuts(points, angles, qs, weights=weights)
+    repeated = quantile_cuts(th.repeat_interleave(points, weights, dim=0), angles, qs)
+
+    assert th.allclose(weighted, repeated)
+
+
+def test_zero_weights_are_ignored() -> None:
+    points = random_points(40, seed=4)
+    weights = (th.arange(40) % 2).float()
+    angles = th.tensor([0.5])
+
+    assert th.equal(
+        quantile_cuts(points, angles, th.tensor([0.5]), weights=weights),
+        quantile_cuts(points[1::2], angles, th.tensor([0.5])),
+    )
+
+
+def test_fractions_must_be_in_the_unit_interval() -> None:
+    with pytest.raises(AssertionError):
+        quantile_cuts(random_points(5), th.tensor([0.0]), th.tensor([1.5]))
@@ -0,0 +1,155 @@
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from preprocessing.rasterize import (
+    coverage,
+    even_odd_fill,
+    load_boundaries,
+    polygon_rings,
+    rasterize_boundaries,
+    rings_bounds,
+    to_pixels,
+)
+
+
+def random_rings(h: int, w: int, num_rings: int = 3, num_vertices: int = 12, seed: int = 0) -> list[np.ndarray]:
+    """
+    Star-shaped rings with random radii, some reaching past the edges of the canvas.
+    """
+    rng = np.random.default_rng(seed)
+    rings = []
+    for _ in range(num_rings):
+        center = rng.uniform([0, 0], [w, h])
+        angles = np.sort(rng.uniform(0, 2 * np.pi, num_vertices))
+        radii = rng.uniform(0.1, 0.6, num_vertices) * min(h, w)
+        rings.append(center + radii[:, None] * np.stack([np.cos(angles), np.sin(angles)], axis=1))
+    return rings
+
+
+def point_in_rings(rings: list[np.ndarray], x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """
+    Even-odd rule by counting the edges that cross the horizontal ray left of each point.
+    """
+    inside = np.zeros(x.shape, dtype=bool)
+    for ring in rings:
+        for (x0, y0), (x1, y1) in zip(ring, np.roll(ring, -1, axis=0)):
+            spans = (y0 <= y) != (y1 <= y)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                crossing_x = x0 + (y - y0) * (x1 - x0) / (y1 - y0)
+            inside ^= spans & (crossing_x <= x)
+    return inside
+
+
+def pixel_centers(top: int, bottom: int, width: int, supersample: int = 1) -> tuple[np.ndarray, np.ndarray]:
+    rows, cols = np.mgrid[top * supersample : bottom * supersample, : width * supersample]
+    return (cols + 0.5) / supersample, (rows + 0.5) / supersample
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_even_odd_fill_matches_point_in_polygon(seed: int) -> None:
+    rings = random_rings(31, 47, seed=seed)
+
+    fill = even_odd_fill(rings, 0, 31, 47)
+
+    assert fill.dtype == bool and fill.shape == (31, 47)
+    assert np.array_equal(fill, point_in_rings(rings, *pixel_centers(0, 31, 47)))
+
+
+def test_holes_and_repeated_first_vertices() -> None:
+    outer = np.array([[2.0, 2.0], [18.0, 2.0], [18.0, 14.0], [2.0, 14.0], [2.0, 2.0]])
+    hole = np.array([[6.0, 5.0], [6.0, 9.0], [12.0, 9.0], [12.0, 5.0], [6.0, 5.0]])
+
+    fill = even_odd_fill([outer, hole], 0, 16, 20)
+
+    expected = np.zeros((16, 20), dtype=bool)
+    expected[2:14, 2:18] = True
+    expected[5:9, 6:12] = False
+    assert np.array_equal(fill, expected)
+
+
+@pytest.mark.parametrize("top, bottom", [(0, 1), (5, 17), (30, 31), (-3, 4), (25, 40), (10, 10)])
+def test_rows_of_a_fill_are_slices_of_the_whole(top: int, bottom: int) -> None:
+    rings = random_rings(31, 47, seed=6)
+    whole = point_in_rings(rings, *pixel_centers(top, bottom, 47))
+
+    assert np.array_equal(even_odd_fill(rings, top, bottom, 47), whole)
+    assert even_odd_fill([], top, bottom, 47).shape == (max(bottom - top, 0), 47)
+
+
+@pytest.mark.parametrize("supersample", [1, 2, 4])
+def test_coverage_is_the_fraction_of_covered_samples(supersample: int) -> None:
+    rings = random_rings(20, 25, seed=7)
+
+    alpha = coverage(rings, 3, 18, 25, supersample=supersample)
+
+    samples = point_in_rings(rings, *pixel_centers(3, 18, 25, supersample))
+    covered = samples.reshape(15, supersample, 25, supersample).sum(axis=(1, 3))
+    assert alpha.dtype == np.uint8
+    assert np.array_equal(alpha, np.round(covered * 255 / supersample**2).astype(np.uint8))
+
+
+def test_to_pixels_maps_bounds_to_the_canvas_edges() -> None:
+    ring = np.array([[-11.0, 49.8], [2.1, 61.0], [-4.45, 55.4]])
+
+    (pixels,) = to_pixels([ring], (-11.0, 49.8, 2.1, 61.0), 1447, 1200)
+
+    assert np.allclose(pixels, [[0.0, 1447.0], [1200.0, 0.0], [600.0, 723.5]])
+
+
+def test_polygon_rings_of_every_geojson_type() -> None:
+    square = [[0, 0], [4, 0], [4, 4], [0, 4], [0, 0]]
+    hole = [[1, 1], [1, 2], [2, 2], [1, 1]]
+    triangle = [[5, 5, 100], [7, 5, 100], [6, 7, 100]]
+
+    geojson = {
+        "type": "FeatureCollection",
+        "features": [
+            {"type": "Feature", "geometry": {"type": "Polygon", "coordinates": [square, hole]}},
+            {"type": "Feature", "geometry": None},
+            {"type": "Feature", "geometry": {"type": "LineString", "coordinates": square}},
+            {
+                "type": "Feature",
+                "geometry": {
+                    "type": "GeometryCollection",
+                    "geometries": [
+                        {"type": "MultiPolygon", "coordinates": [[triangle], [[[0, 0], [1, 1]]]]},
+                        {"type": "Point", "coordinates": [0, 0]},
+                    ],
+                },
+            },
+        ],
+    }
+
+    rings = polygon_rings(geojson)
+
+    assert [ring.tolist() for ring in rings] == [square, hole, [point[:2] for point in triangle]]
+    assert all(ring.dtype == np.float64 for ring in rings)
+    assert rings_bounds(rings) == (0.0, 0.0, 7.0, 7.0)
+
+
+def test_rasterized_boundaries_do_not_depend_on_the_strip_height(tmp_path: Path) -> None:
+    path = os.path.join(tmp_path, "boundaries.geojson")
+    rings = random_rings(1, 1, num_rings=4, seed=8)
+    with open(path, "w") as file:
+        json.dump({"type": "MultiPolygon", "coordinates": [[ring.tolist()] for ring in rings]}, file)
+
+    expected = rasterize_boundaries(path, 45, 38, supersample=3, strip_height=10**6)
+    for strip_height in (1, 3, 7, 64):
+        assert np.array_equal(rasterize_boundaries(path, 45, 38, supersample=3, strip_height=strip_height), expected)
+
+    # by default, the edges of the canvas are the bounds of the polygons
+    pixel_rings = to_pixels(load_boundaries(path), rings_bounds(rings), 45, 38)
+    assert np.array_equal(expected, coverage(pixel_rings, 0, 45, 38, supersample=3))
+    assert expected[0].any() and expected[-1].any() and expected[:, 0].any() and expected[:, -1].any()
+
+
+def test_boundaries_without_polygons_rasterize_to_nothing(tmp_path: Path) -> None:
+    path = os.path.join(tmp_path, "empty.geojson")
+    with open(path, "w") as file:
+        json.dump({"type": "FeatureCollection", "features": []}, file)
+
+    assert np.array_equal(rasterize_boundaries(path, 5, 7), np.zeros((5, 7), dtype=np.uint8))
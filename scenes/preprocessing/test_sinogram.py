@@ -0,0 +1,86 @@
+import math
+import os
+from pathlib import Path
+
+import pytest
+import torch as th
+
+from preprocessing.sinogram import build_sinogram, load_or_build_sinogram
+
+
+def ellipse_weights(h: int = 61, w: int = 81) -> th.Tensor:
+    rows, cols = th.meshgrid(th.arange(h), th.arange(w), indexing="ij")
+    inside = ((cols - 30) / 25) ** 2 + ((rows - 25) / 15) ** 2 <= 1
+    return inside.double() * (1 + (rows % 3 == 0).double())  # uneven weights
+
+
+def pixel_points(weights: th.Tensor) -> tuple[th.Tensor, th.Tensor]:
+    h, w = weights.shape
+    rows, cols = th.nonzero(weights > 0, as_tuple=True)
+    return th.stack([cols - w / 2, h / 2 - rows], dim=1).double(), weights[rows, cols]
+
+
+def brute_weight_above(weights: th.Tensor, theta: float, bias: float) -> float:
+    points, point_weights = pixel_points(weights)
+    projections = points @ th.tensor([math.cos(theta), math.sin(theta)], dtype=th.float64)
+    return point_weights[projections > bias].sum().item()
+
+
+def test_total_is_the_weight_of_the_mask() -> None:
+    weights = ellipse_weights()
+    sinogram = build_sinogram(weights, num_angles=90)
+
+    assert sinogram.total == pytest.approx(weights.sum().item())
+    assert th.allclose(sinogram.cdf[:, -1], weights.sum())
+
+
+@pytest.mark.parametrize("theta", [0.0, 0.4, math.pi / 2, 2.0, 3.5, 5.9])
+def test_bisect_splits_the_weight_in_half(theta: float) -> None:
+    weights = ellipse_weights()
+    sinogram = build_sinogram(weights, num_angles=360)
+
+    # within a bin of the exact split, with the interpolation between angles
+    bias = sinogram.bisect(theta)
+    assert brute_weight_above(weights, theta, bias) == pytest.approx(sinogram.total / 2, rel=0.03)
+
+
+@pytest.mark.parametrize("theta", [0.1, 1.3, 4.0])
+@pytest.mark.parametrize("bias", [-10.0, 0.0, 7.5])
+def test_count_positive_matches_brute_force(theta: float, bias: float) -> None:
+    weights = ellipse_weights()
+    sinogram = build_sinogram(weights, num_angles=360)
+
+    assert sinogram.count_positive(theta, bias) == pytest.approx(
+        brute_weight_above(weights, theta, bias), rel=0.03, abs=sinogram.total * 0.01
+    )
+
+
+def test_opposite_angles_mirror_each_other() -> None:
+    sinogram = build_sinogram(ellipse_weights(), num_angles=180)
+
+    for theta in (0.0, 0.7, 2.2):
+        assert sinogram.quantile(theta + math.pi, 0.3) == pytest.approx(-sinogram.quantile(theta, 0.7))
+
+
+def test_placed_scales_and_offsets_queries() -> None:
+    sinogram = build_sinogram(ellipse_weights(), num_angles=180)
+    placed = sinogram.placed(0.5, (1.0, -2.0))
+
+    theta = 0.9
+    offset = 1.0 * math.cos(theta) - 2.0 * math.sin(theta)
+    assert placed.bisect(theta) == pytest.approx(0.5 * sinogram.bisect(theta) + offset)
+    assert placed.count_positive(theta, 0.5 * 3.0 + offset) == pytest.approx(sinogram.count_positive(theta, 3.0))
+
+
+def test_load_or_build_sinogram_caches_by_content(tmp_path: Path) -> None:
+    weights = ellipse_weights()
+    cache_dir = os.path.join(tmp_path, "sinograms")
+
+    built = load_or_build_sinogram(weights, cache_dir=cache_dir, num_angles=30)
+    loaded = load_or_build_sinogram(weights.clone(), cache_dir=cache_dir, num_angles=30)
+    assert len(os.listdir(cache_dir)) == 1
+    assert th.equal(built.cdf, loaded.cdf)
+
+    load_or_build_sinogram(weights * 2, cache_dir=cache_dir, num_angles=30)
+    assert len(os.listdir(cache_dir)) == 2
+    assert all(name.endswith(".pt") for name in os.listdir(cache_dir))
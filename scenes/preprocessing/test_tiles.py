@@ -0,0 +1,118 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pytest
+import torch as th
+from PIL import Image
+
+from preprocessing.cache import cache_location
+from preprocessing.erode_dilate import dilate, erode
+from preprocessing.mask import alpha_channel, color_mask
+from preprocessing.tiles import isolate_region, map_strips, raw_rgba, save_grayscale_png
+
+BLUE = (28, 151, 179)
+
+
+def map_pixels(h: int = 90, w: int = 70, seed: int = 0) -> np.ndarray:
+    """
+    A blue blob with speckles on a half transparent grey background.
+    """
+    rng = np.random.default_rng(seed)
+    rows, cols = np.mgrid[:h, :w]
+    blob = ((rows - h / 2) / (h / 3)) ** 2 + ((cols - w / 2) / (w / 3)) ** 2 < 1
+    blob ^= rng.random((h, w)) < 0.05
+
+    pixels = np.empty((h, w, 4), dtype=np.uint8)
+    pixels[:] = (157, 157, 156, 128)
+    pixels[blob] = (*BLUE, 255)
+    return pixels
+
+
+def select(pixels: np.ndarray) -> th.BoolTensor:
+    return dilate(erode(color_mask(pixels, BLUE), 3), 5)
+
+
+@pytest.mark.parametrize("strip_height", [1, 7, 32, 1000])
+def test_map_strips_with_a_halo_matches_the_whole_image(strip_height: int) -> None:
+    pixels = map_pixels()
+    output = np.zeros(pixels.shape[:2], dtype=bool)
+
+    map_strips(pixels, select, output, strip_height=strip_height, halo=3, max_workers=2)
+
+    assert np.array_equal(output, select(pixels).numpy())
+
+
+@pytest.mark.parametrize("shape", [(1, 1), (5, 3), (300, 257)])
+@pytest.mark.parametrize("strip_height", [1, 64, 1024])
+def test_grayscale_png_round_trips(tmp_path: Path, shape: tuple[int, int], strip_height: int) -> None:
+    pixels = np.random.default_rng(1).integers(0, 256, shape, dtype=np.uint8)
+    pixels[: shape[0] // 2] = 0  # long runs, as in a mask
+    path = os.path.join(tmp_path, "mask.png")
+
+    save_grayscale_png(pixels, path, strip_height=strip_height)
+
+    with Image.open(path) as image:
+        assert image.mode == "L"
+        assert np.array_equal(np.asarray(image), pixels)
+
+
+def test_raw_rgba_caches_the_decode(tmp_path: Path) -> None:
+    path = os.path.join(tmp_path, "map.png")
+    Image.fromarray(map_pixels()[:, :, :3]).convert("P", palette=Image.Palette.ADAPTIVE).save(path)
+    cache_dir = os.path.join(tmp_path, "raw")
+
+    pixels = raw_rgba(path, cache_dir=cache_dir, strip_height=16)
+
+    with Image.open(path) as image:
+        assert np.array_equal(pixels, np.asarray(image.convert("RGBA")))
+    assert not pixels.flags.writeable
+    assert len(os.listdir(cache_dir)) == 1
+    assert np.array_equal(raw_rgba(path, cache_dir=cache_dir), pixels)
+    assert len(os.listdir(cache_dir)) == 1
+
+
+def test_isolate_region_matches_the_whole_image(tmp_path: Path) -> None:
+    pixels = map_pixels(seed=2)
+    mask_path, image_path = os.path.join(tmp_path, "mask.png"), os.path.join(tmp_path, "region.png")
+
+    isolate_region(
+        pixels,
+        select,
+        halo=3,
+        mask_path=mask_path,
+        image_path=image_path,
+        strip_height=8,
+        cache_dir=os.path.join(tmp_path, "cache"),
+    )
+
+    expected_alpha = (alpha_channel(pixels) * select(pixels)).numpy()
+    with Image.open(mask_path) as mask_image:
+        assert np.array_equal(np.asarray(mask_image), expected_alpha)
+
+    rows, cols = np.nonzero(expected_alpha)
+    expected_region = pixels[rows.min() : rows.max() + 1, cols.min() : cols.max() + 1].copy()
+    expected_region[:, :, 3] = expected_alpha[rows.min() : rows.max() + 1, cols.min() : cols.max() + 1]
+    with Image.open(image_path) as region_image:
+        assert np.array_equal(np.asarray(region_image), expected_region)
+    assert os.listdir(os.path.join(tmp_path, "cache")) == []
+
+
+def test_masks_of_the_same_name_can_be_isolated_at_once(tmp_path: Path) -> None:
+    sources = [map_pixels(seed=seed) for seed in range(4)]
+    mask_paths = [os.path.join(tmp_path, str(index), "mask.png") for index in range(len(sources))]
+    for mask_path in mask_paths:
+        os.makedirs(os.path.dirname(mask_path))
+
+    def isolate(index: int) -> None:
+        image_path = os.path.join(os.path.dirname(mask_paths[index]), "region.png")
+        isolate_region(sources[index], select, 3, mask_paths[index], image_path, strip_height=8, max_workers=1)
+
+    with ThreadPoolExecutor(max_workers=len(sources)) as executor:
+        list(executor.map(isolate, range(len(sources))))
+
+    for pixels, mask_path in zip(sources, mask_paths):
+        with Image.open(mask_path) as mask_image:
+            assert np.array_equal(np.asarray(mask_image), (alpha_channel(pixels) * select(pixels)).numpy())
+    assert os.listdir(cache_location("raw_rgba")) == []
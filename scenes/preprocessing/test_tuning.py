@@ -0,0 +1,79 @@
+
+import numpy as np
+import pytest
+import torch as th
+
+from preprocessing.expression import colors
+from preprocessing.mask import palette_labels
+from preprocessing.tuning import MaskTuner
+
+BLUE, GREY, TEAL = (28, 151, 179), (157, 157, 156), (30, 160, 170)
+
+
+def noisy_map_pixels(h: int = 50, w: int = 40, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    palette = np.array([BLUE, GREY, TEAL, (0, 0, 0)])
+    rgb = np.clip(palette[rng.integers(0, 4, (h, w))] + rng.integers(-14, 15, (h, w, 3)), 0, 255)
+    alpha = rng.integers(0, 256, (h, w, 1))
+    return np.concatenate([rgb, alpha], axis=2).astype(np.uint8)
+
+
+@pytest.mark.parametrize("delta", [4.0, 10.0, 16.5])
+@pytest.mark.parametrize("alpha_threshold", [0, 16, 200])
+def test_labels_match_palette_labels(delta: float, alpha_threshold: int) -> None:
+    pixels = noisy_map_pixels()
+    tuner = MaskTuner(pixels)
+
+    labels = tuner.labels((BLUE, GREY, TEAL), alpha_threshold=alpha_threshold, delta=delta)
+
+    assert th.equal(labels, palette_labels(pixels, (BLUE, GREY, TEAL), alpha_threshold=alpha_threshold, delta=delta))
+
+
+def test_evaluate_matches_the_expression_while_parameters_change() -> None:
+    pixels = noisy_map_pixels(seed=1)
+    tuner = MaskTuner(pixels)
+
+    for delta in (10, 12, 10):
+        for kernel_size in (5, 3):
+            expression = colors(BLUE, GREY, delta=delta).erode().dilate(kernel_size=7).erode(kernel_size=kernel_size)
+            expression = expression | (colors(TEAL, delta=delta) & ~colors(GREY, delta=6))
+
+            assert th.equal(tuner.evaluate(expression), expression(pixels))
+            assert tuner.count(expression) == expression(pixels).sum().item()
+
+
+def test_sub_expressions_are_reused() -> None:
+    tuner = MaskTuner(noisy_map_pixels(seed=2))
+
+    tuner.evaluate(colors(BLUE, GREY).erode().dilate(kernel_size=7).erode(kernel_size=5))
+    num_results = len(tuner.results)
+    tuner.evaluate(colors(BLUE, GREY).erode().dilate(kernel_size=7).erode(kernel_size=3))
+
+    # only the last erode is new
+    assert len(tuner.results) == num_results + 1
+
+
+@pytest.mark.parametrize("max_results", [1, 3, 8])
+def test_results_are_bounded(max_results: int) -> None:
+    pixels = noisy_map_pixels(seed=3)
+    tuner = MaskTuner(pixels, max_results=max_results)
+
+    for kernel_size in (3, 5, 7, 9, 11):
+        expression = colors(BLUE).dilate(kernel_size=kernel_size).erode()
+
+        # the three nodes of the expression are kept while it is evaluated
+        assert th.equal(tuner.evaluate(expression), expression(pixels))
+        assert len(tuner.results) <= max(max_results, 3)
+
+
+def test_the_least_recently_used_results_are_evicted() -> None:
+    tuner = MaskTuner(noisy_map_pixels(seed=4), max_results=3)
+    blue, grey = colors(BLUE), colors(GREY)
+
+    tuner.evaluate(blue.erode())
+    tuner.evaluate(grey)
+    tuner.evaluate(blue)  # uses blue again, so blue.erode is the oldest
+    tuner.evaluate(grey.dilate())
+
+    keys = [key for expression in (blue, grey, grey.dilate()) for key in tuner.expression_keys(expression).values()]
+    assert set(tuner.results) == set(keys)
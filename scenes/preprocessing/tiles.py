@@ -0,0 +1,357 @@
+import hashlib
+import os
+import struct
+import tempfile
+import time
+import zlib
+from collections.abc import Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any
+
+import numpy as np
+import torch as th
+from PIL import Image
+
+from preprocessing.cache import cache_location
+from preprocessing.contours import MIN_CONTOUR_AREA, extract_contours, save_contours
+from preprocessing.mask import alpha_channel
+from preprocessing.point_cloud import save_point_cloud
+from preprocessing.rasterize import rasterize_boundaries
+
+Image.MAX_IMAGE_PIXELS = None  # source maps can be far larger than the decompression bomb limit
+
+
+@contextmanager
+def timed(timings: dict[str, float] | None, stage: str) -> Iterator[None]:
+    """
+    Add the wall time spent in the block to timings[stage], if timings are being collected.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - start
+
+
+def raw_rgba(
+    path: str | os.PathLike,
+    cache_dir: str | None = None,
+    strip_height: int = 1024,
+) -> np.memmap:
+    """
+    Memory-map the RGBA pixels of an image file, decoding it into a raw cache on first use.
+
+    The source is decoded once in its own mode, which is a quarter of the size of RGBA for palette images, and
+    converted to RGBA strip by strip straight into the cache file. Later calls only map the file, keyed by the path
+    and modification time of the source, so nothing is decoded and pages are read as they are touched.
+
+    Args:
+        path (str | os.PathLike): Path of the source image.
+        cache_dir (str | None): Directory of the raw caches, raw_rgba under the cache root by default.
+        strip_height (int): Number of rows converted to RGBA at a time while filling the cache.
+
+    Returns:
+        np.memmap: A read-only uint8 array of shape (H, W, 4).
+    """
+    cache_dir = cache_location("raw_rgba") if cache_dir is None else cache_dir
+    path = os.path.abspath(path)
+    key = hashlib.sha1(f"{path}-{os.stat(path).st_mtime_ns}".encode())
+    cache_path = os.path.join(cache_dir, f"{key.hexdigest()}.npy")
+
+    if not os.path.exists(cache_path):
+        os.makedirs(cache_dir, exist_ok=True)
+        # unique per process, so concurrent first uses never write into the same file
+        partial_path = f"{cache_path}.{os.getpid()}.partial"
+
+        with Image.open(path) as image:
+            w, h = image.size
+            pixels = np.lib.format.open_memmap(partial_path, mode="w+", dtype=np.uint8, shape=(h, w, 4))
+            for start in range(0, h, strip_height):
+                end = min(start + strip_height, h)
+                pixels[start:end] = np.asarray(image.crop((0, start, w, end)).convert("RGBA"))
+            pixels.flush()
+            del pixels
+
+        # only complete caches ever appear under the final name
+        os.replace(partial_path, cache_path)
+
+    return np.load(cache_path, mmap_mode="r")
+
+
+def save_grayscale_png(
+    pixels: np.ndarray,
+    path: str,
+    strip_height: int = 1024,
+    compress_level: int = 6,
+) -> None:
+    """
+    Save a single-channel image as an 8-bit grayscale PNG, encoding and compressing it strip by strip, so a memory
+    mapped image is never read into memory as a whole, as Image.fromarray would.
+
+    Every row is stored with the PNG "up" filter, the difference from the row above, which leaves nothing but the
+    edges of a mask to compress.
+
+    Args:
+        pixels (np.ndarray): A uint8 image of shape (H, W), such as a memory mapped alpha mask.
+        path (str): Where to save the PNG.
+        strip_height (int): Number of rows encoded at a time.
+        compress_level (int): The zlib compression level, from 0 to 9.
+    """
+    assert pixels.ndim == 2 and pixels.dtype == np.uint8, "Pixels must be a uint8 array of shape (H, W)."
+    h, w = pixels.shape
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    compressor = zlib.compressobj(compress_level)
+    previous_row = np.zeros((1, w), dtype=np.uint8)
+
+    with open(path, "wb") as file:
+        file.write(b"\x89PNG\r\n\x1a\n")
+        # width, height, bit depth 8, grayscale, default compression, filter method and no interlacing
+        file.write(chunk(b"IHDR", struct.pack(">IIBBBBB", w, h, 8, 0, 0, 0, 0)))
+
+        for start in range(0, h, strip_height):
+            rows = np.asarray(pixels[start : start + strip_height])  # shape: (h, W)
+
+            filtered = np.empty((rows.shape[0], w + 1), dtype=np.uint8)  # shape: (h, W + 1)
+            filtered[:, 0] = 2  # the "up" filter type
+            filtered[:, 1:] = rows - np.concatenate([previous_row, rows[:-1]])  # wraps around modulo 256
+            previous_row = rows[-1:]
+
+            data = compressor.compress(filtered.tobytes())
+            if data:
+                file.write(chunk(b"IDAT", data))
+
+        file.write(chunk(b"IDAT", compressor.flush()))
+        file.write(chunk(b"IEND", b""))
+
+
+def map_strips(
+    source: np.ndarray,
+    function: Callable[[np.ndarray], np.ndarray | th.Tensor],
+    output: np.ndarray,
+    strip_height: int = 1024,
+    halo: int = 0,
+    max_workers: int | None = None,
+) -> np.ndarray:
+    """
+    Apply a function to horizontal strips of a large image and write each result into the output as it finishes.
+
+    Each strip is handed to the function with halo extra rows above and below, clipped at the image edges, and only
+    its own rows of the result are kept. For neighborhood operations such as erode and dilate, a halo of at least the
+    total radius of the operations makes the output identical to applying the function to the whole image, while
+    only a few strips are ever in memory. Strips run on a thread pool, since torch releases the GIL in its kernels.
+
+    Args:
+        source (np.ndarray): Input of shape (H, W, ...), typically a memory-mapped raw cache.
+        function (Callable[[np.ndarray], np.ndarray | th.Tensor]): Maps a strip of shape (h, W, ...) to a result
+            with h rows.
+        output (np.ndarray): Output of shape (H, ...), typically a memory-mapped file.
+        strip_height (int): Number of output rows per strip.
+        halo (int): Number of extra rows of context on each side of a strip.
+        max_workers (int | None): Number of strips processed at once. Defaults to the thread pool default.
+
+    Returns:
+        np.ndarray: The output, filled in.
+    """
+    assert strip_height > 0 and halo >= 0, "Strip height must be positive and halo non-negative."
+    assert source.shape[0] == output.shape[0], "Source and output must have the same number of rows."
+
+    h = source.shape[0]
+
+    def process_strip(start: int) -> None:
+        end = min(start + strip_height, h)
+        halo_start, halo_end = max(start - halo, 0), min(end + halo, h)
+
+        result = function(source[halo_start:halo_end])
+        if isinstance(result, th.Tensor):
+            result = result.numpy()
+
+        output[start:end] = result[start - halo_start : end - halo_start]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # consume the results so that exceptions in the workers are raised here
+        list(executor.map(process_strip, range(0, h, strip_height)))
+
+    return output
+
+
+def isolate_region(
+    source: str | os.PathLike | np.ndarray,
+    select: Callable[[np.ndarray], th.BoolTensor],
+    halo: int,
+    mask_path: str,
+    image_path: str,
+    strip_height: int = 1024,
+    max_workers: int | None = None,
+    cache_dir: str | None = None,
+    timings: dict[str, float] | None = None,
+    points_path: str | None = None,
+    points_threshold: int = 200,
+    contours_path: str | None = None,
+    contour_tolerance: float = 1.0,
+) -> None:
+    """
+    Cut a region out of a large source map in strips, saving its alpha mask over the full canvas and the region
+    itself cropped to its bounding box.
+
+    Args:
+        source (str | os.PathLike | np.ndarray): Path of the source map, or its RGBA pixels of shape (H, W, 4) as
+            returned by raw_rgba, to share one decode between regions.
+        select (Callable[[np.ndarray], th.BoolTensor]): Maps a strip of RGBA pixels of shape (h, W, 4) to the mask
+            of the region in it, such as an expression.MaskExpr.
+        halo (int): Number of rows of context that select needs on each side, see MaskExpr.halo.
+        mask_path (str): Where to save the alpha mask of the region, of the size of the source.
+        image_path (str): Where to save the RGBA image of the region, cropped to its opaque pixels.
+        strip_height (int): Number of rows per strip.
+        max_workers (int | None): Number of strips processed at once.
+        cache_dir (str | None): Directory of the raw source cache and of the mask while it is being made, as for
+            raw_rgba.
+        timings (dict[str, float] | None): If given, the time spent in each stage is added to it.
+        points_path (str | None): If given, where to also save the solid pixels of the mask as a point cloud.
+        points_threshold (int): Alpha above which a pixel of the mask is solid in the point cloud.
+        contours_path (str | None): If given, where to also save the simplified outlines of the solid pixels.
+        contour_tolerance (float): Maximum distance in pixels between the outlines and the traced boundaries.
+    """
+    cache_dir = cache_location("raw_rgba") if cache_dir is None else cache_dir
+    if isinstance(source, np.ndarray):
+        pixels = source
+    else:
+        with timed(timings, "decode"):
+            pixels = raw_rgba(source, cache_dir=cache_dir)  # shape: (H, W, 4)
+    h, w, _ = pixels.shape
+
+    # the source may be given as pixels, so the cache directory may not have been made by raw_rgba
+    os.makedirs(cache_dir, exist_ok=True)
+    # a file of its own, since regions with masks of the same name may be isolated at the same time
+    fd, alpha_path = tempfile.mkstemp(suffix=".npy", dir=cache_dir)
+    os.close(fd)
+
+    try:
+        alpha = np.lib.format.open_memmap(alpha_path, mode="w+", dtype=np.uint8, shape=(h, w))  # shape: (H, W)
+
+        def region_alpha(strip: np.ndarray) -> th.ByteTensor:
+            return alpha_channel(strip) * select(strip)
+
+        with timed(timings, "mask"):
+            map_strips(pixels, region_alpha, alpha, strip_height=strip_height, halo=halo, max_workers=max_workers)
+            alpha.flush()
+
+        save_region(
+            pixels,
+            alpha,
+            mask_path,
+            image_path,
+            timings=timings,
+            points_path=points_path,
+            points_threshold=points_threshold,
+            contours_path=contours_path,
+            contour_tolerance=contour_tolerance,
+        )
+    finally:
+        os.remove(alpha_path)
+
+
+def rasterize_region(
+    source: str | os.PathLike | np.ndarray,
+    boundaries_path: str,
+    mask_path: str,
+    image_path: str,
+    bounds: tuple[float, float, float, float] | None = None,
+    supersample: int = 4,
+    strip_height: int = 1024,
+    cache_dir: str | None = None,
+    timings: dict[str, float] | None = None,
+    **outputs: Any,
+) -> None:
+    """
+    Like isolate_region, but the mask is rasterized from the polygons of a GeoJSON file at the size of the source
+    instead of color keyed out of it, so it needs no cleanup.
+
+    Args:
+        source (str | os.PathLike | np.ndarray): Path of the source map, or its RGBA pixels of shape (H, W, 4).
+        boundaries_path (str): Path of the GeoJSON file of the region's boundaries.
+        mask_path (str): Where to save the alpha mask of the region, of the size of the source.
+        image_path (str): Where to save the RGBA image of the region, cropped to its opaque pixels.
+        bounds (tuple[float, float, float, float] | None): The (x_min, y_min, x_max, y_max) of the GeoJSON
+            coordinates at the edges of the source, see rasterize.to_pixels.
+        supersample (int): Number of samples per pixel along each axis, for soft edges.
+        strip_height (int): Number of rows of samples rasterized at a time, see rasterize.rasterize_boundaries.
+        cache_dir (str | None): Directory of the raw source cache, as for raw_rgba.
+        timings (dict[str, float] | None): If given, the time spent in each stage is added to it.
+        **outputs: The optional outputs of save_region, such as points_path.
+    """
+    if isinstance(source, np.ndarray):
+        pixels = source
+    else:
+        with timed(timings, "decode"):
+            pixels = raw_rgba(source, cache_dir=cache_dir)  # shape: (H, W, 4)
+    h, w, _ = pixels.shape
+
+    with timed(timings, "mask"):
+        alpha = rasterize_boundaries(
+            boundaries_path,
+            h,
+            w,
+            bounds=bounds,
+            supersample=supersample,
+            strip_height=strip_height,
+        )  # shape: (H, W)
+
+    save_region(pixels, alpha, mask_path, image_path, timings=timings, **outputs)
+
+
+def save_region(
+    pixels: np.ndarray,
+    alpha: np.ndarray,
+    mask_path: str,
+    image_path: str,
+    timings: dict[str, float] | None = None,
+    points_path: str | None = None,
+    points_threshold: int = 200,
+    contours_path: str | None = None,
+    contour_tolerance: float = 1.0,
+) -> None:
+    """
+    Save the outputs of a region from the source pixels and the region's alpha mask over the full canvas, see
+    isolate_region for the arguments.
+    """
+    h, w = alpha.shape
+
+    with timed(timings, "save mask"):
+        save_grayscale_png(alpha, mask_path)
+
+    if points_path is not None:
+        with timed(timings, "save points"):
+            save_point_cloud(alpha, points_path, points_threshold, mask_path=mask_path)
+
+    if contours_path is not None:
+        with timed(timings, "save contours"):
+            contours = extract_contours(th.from_numpy(alpha > points_threshold), tolerance=contour_tolerance)
+            save_contours(
+                contours,
+                contours_path,
+                (h, w),
+                mask_path=mask_path,
+                alpha_threshold=points_threshold,
+                tolerance=contour_tolerance,
+                min_area=MIN_CONTOUR_AREA,
+            )
+
+    with timed(timings, "save image"):
+        # zoom into the opaque region
+        opaque_rows = np.flatnonzero(alpha.any(axis=1))
+        opaque_cols = np.flatnonzero(alpha.any(axis=0))
+        if opaque_rows.shape[0] == 0:
+            top, bottom, left, right = 0, h, 0, w
+        else:
+            top, bottom = opaque_rows[0], opaque_rows[-1] + 1
+            left, right = opaque_cols[0], opaque_cols[-1] + 1
+
+        region = np.array(pixels[top:bottom, left:right])  # shape: (h, w, 4)
+        region[:, :, 3] = alpha[top:bottom, left:right]
+
+        Image.fromarray(region).save(image_path)
@@ -0,0 +1,162 @@
+from collections import OrderedDict
+from typing import Self
+
+import torch as th
+
+from preprocessing.erode_dilate import dilate, erode
+from preprocessing.expression import MaskExpr
+from preprocessing.mask import ImageSource, decode_rgba
+
+
+class MaskTuner:
+    """
+    Keeps everything that does not depend on the thresholds in memory, so that mask parameters can be tuned
+    interactively instead of by re-running the isolate scripts.
+
+    The squared distance of every pixel to each color is computed once, so a new delta or alpha threshold only
+    re-thresholds cached fields. The result of every sub-expression is memoized by its structure and parameters,
+    so changing the kernel of the last erode of a chain only re-runs that erode. Only the max_results most
+    recently used results are kept, each a bool mask of the size of the image.
+
+    Args:
+        image (ImageSource): The image to tune masks on, RGBA pixels, or the path of an image file.
+        max_results (int): Number of sub-expression results to keep. Those of the expression being evaluated are
+            always kept until it is done, even if there are more.
+
+    Example:
+        >>> tuner = MaskTuner("media/uk_and_ireland.png")
+        >>> tuner.count(colors(*COLORS, delta=10).erode().dilate(kernel_size=7).erode(kernel_size=5))
+        >>> tuner.count(colors(*COLORS, delta=12).erode())  # only re-thresholds and erodes
+        >>> tuner.count(colors(*COLORS, delta=10).erode().dilate(kernel_size=7).erode(kernel_size=3))  # one erode
+    """
+
+    def __init__(self: Self, image: ImageSource, max_results: int = 64) -> None:
+        assert max_results > 0, "At least one result must be kept."
+
+        self.pixels = decode_rgba(image)  # shape: (H, W, 4)
+        self.alpha = self.pixels[:, :, 3]  # shape: (H, W)
+        self.max_results = max_results
+
+        self.distance_fields = {}
+        self.nearest_fields = {}
+        self.results = OrderedDict()  # least recently used first
+
+    def squared_distance_field(self: Self, color: tuple[int, int, int]) -> th.IntTensor:
+        """
+        Squared distance of every pixel to a color, of shape (H, W), computed once per color.
+        """
+        if color not in self.distance_fields:
+            rgb_tensor = self.pixels[:, :, :3].to(th.int32)  # shape: (H, W, 3)
+            color_diff = rgb_tensor - th.tensor(color, dtype=th.int32)
+            self.distance_fields[color] = (color_diff * color_diff).sum(dim=2, dtype=th.int32)
+
+        return self.distance_fields[color]
+
+    def nearest_field(self: Self, palette: tuple[tuple[int, int, int], ...]) -> tuple[th.IntTensor, th.LongTensor]:
+        """
+        Squared distance of every pixel to its nearest palette color and the index of that color, each of shape
+        (H, W), computed once per palette.
+        """
+        if palette not in self.nearest_fields:
+            squared_distances = th.stack([self.squared_distance_field(color) for color in palette], dim=2)
+            self.nearest_fields[palette] = squared_distances.min(dim=2)
+
+        return self.nearest_fields[palette]
+
+    def labels(
+        self: Self,
+        palette: tuple[tuple[int, int, int], ...],
+        alpha_threshold: int = 16,
+        delta: float = 10.0,
+    ) -> th.CharTensor:
+        """
+        Like mask.palette_labels, but only thresholding the cached fields.
+        """
+        nearest_distances, labels = self.nearest_field(palette)
+        labelled = (nearest_distances < delta**2) & (self.alpha > alpha_threshold)
+
+        return th.where(labelled, labels.to(th.int8), -1)
+
+    def expression_keys(self: Self, expression: MaskExpr) -> dict[int, tuple]:
+        """
+        A key for every node of an expression that identifies its result, keyed by node id. Leaves also include the
+        combined palette they are classified against, since that decides which pixels are nearest to them.
+        """
+        nodes = expression.nodes()
+
+        group_palettes, starts = {}, {}
+        for node in nodes:
+            if node.op == "colors":
+                group = (node.params["delta"], node.params["alpha_threshold"])
+                starts[id(node)] = len(group_palettes.get(group, ()))
+                group_palettes[group] = group_palettes.get(group, ()) + tuple(node.params["colors"])
+
+        keys = {}
+        for node in nodes:
+            if node.op == "colors":
+                group = (node.params["delta"], node.params["alpha_threshold"])
+                # the leaf's colors are the range [start, end) of the combined palette
+                start = starts[id(node)]
+                params = (*group, start, start + len(node.params["colors"]), group_palettes[group])
+            else:
+                params = tuple(sorted(node.params.items()))
+            input_keys = tuple(keys[id(input_expression)] for input_expression in node.inputs)
+            keys[id(node)] = (node.op, params, input_keys)
+
+        return keys
+
+    def evaluate(self: Self, expression: MaskExpr) -> th.BoolTensor:
+        """
+        Evaluate an expression on the whole image, reusing the result of every sub-expression that was already
+        evaluated with the same parameters. The result is shared with the cache and must not be modified in place.
+        """
+        keys = self.expression_keys(expression)
+
+        for node in expression.nodes():
+            key = keys[id(node)]
+            if key in self.results:
+                self.results.move_to_end(key)
+                continue
+
+            inputs = [self.results[keys[id(input_expression)]] for input_expression in node.inputs]
+
+            match node.op:
+                case "colors":
+                    delta, alpha_threshold, start, end, palette = key[1]
+                    labels = self.labels(palette, alpha_threshold=alpha_threshold, delta=delta)
+                    value = (labels >= start) & (labels < end)
+                case "or":
+                    value = inputs[0] | inputs[1]
+                case "and":
+                    value = inputs[0] & inputs[1]
+                case "not":
+                    value = ~inputs[0]
+                case "erode":
+                    value = erode(inputs[0], **node.params)
+                case "dilate":
+                    value = dilate(inputs[0], **node.params)
+                case _:
+                    raise ValueError(f"Unknown mask operation: {node.op}")
+
+            self.results[key] = value
+
+        result = self.results[keys[id(expression)]]
+
+        # every node of this expression was just used, so the least recently used results all come from before it
+        expression_keys = set(keys.values())
+        while len(self.results) > self.max_results and next(iter(self.results)) not in expression_keys:
+            self.results.popitem(last=False)
+
+        return result
+
+    def count(self: Self, expression: MaskExpr) -> int:
+        """
+        Number of pixels in the mask of an expression.
+        """
+        return self.evaluate(expression).sum().item()
+
+    def clear(self: Self) -> None:
+        """
+        Forget the memoized masks, keeping the distance fields.
+        """
+        self.results.clear()
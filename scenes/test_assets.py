@@ -0,0 +1,95 @@
+import os
+from pathlib import Path
+
+import numpy as np
+import pytest
+from PIL import Image
+
+manim = pytest.importorskip("manim")
+
+from assets import load_region_image
+from preprocessing.pyramid import build_pyramid
+
+
+def write_mask(path: str, h: int = 60, w: int = 80, seed: int = 0) -> str:
+    """
+    A speckled ellipse of soft alpha, saved as a single-channel mask like the media pipeline's.
+    """
+    rng = np.random.default_rng(seed)
+    rows, cols = np.mgrid[:h, :w]
+    inside = ((rows - 35) / 15) ** 2 + ((cols - 30) / 22) ** 2 < 1
+    alpha = np.where(inside, rng.integers(0, 256, (h, w)), 0).astype(np.uint8)
+    Image.fromarray(alpha).save(path)
+
+    return path
+
+
+def tinted_canvas_crop(mask_path: str, color: manim.ManimColor) -> np.ndarray:
+    """
+    The region as the scenes used to make it: the full canvas filled with the color, the mask put in its alpha
+    channel, then cropped to its opaque pixels.
+    """
+    with Image.open(mask_path) as mask_image:
+        image = Image.new("RGBA", mask_image.size)
+        image.paste(tuple(manim.color_to_int_rgba(color)), (0, 0, image.width, image.height))
+        image.putalpha(mask_image)
+
+    return np.asarray(image.crop(image.getbbox()))
+
+
+@pytest.mark.parametrize("color", [manim.BLUE, manim.RED, manim.ManimColor("#0C2238")])
+def test_region_images_match_the_tinted_canvas(tmp_path: Path, color: manim.ManimColor) -> None:
+    mask_path = write_mask(os.path.join(tmp_path, "mask.png"))
+
+    region = load_region_image(mask_path, color)
+
+    assert np.array_equal(region.pixels, tinted_canvas_crop(mask_path, color))
+    with Image.open(mask_path) as mask_image:
+        alpha = np.asarray(mask_image)
+        assert region.bbox == mask_image.getbbox()
+    assert region.canvas_size == (80, 60)
+    assert region.num_solid_pixels == (alpha > 200).sum()
+    assert load_region_image(mask_path, color, alpha_threshold=50).num_solid_pixels == (alpha > 50).sum()
+
+
+def test_masks_with_an_alpha_channel_use_it(tmp_path: Path) -> None:
+    mask_path = write_mask(os.path.join(tmp_path, "mask.png"), seed=1)
+    rgba_path = os.path.join(tmp_path, "mask_rgba.png")
+    with Image.open(mask_path) as mask_image:
+        rgba_image = Image.new("RGBA", mask_image.size, (255, 255, 255, 0))
+        rgba_image.putalpha(mask_image)
+        rgba_image.save(rgba_path)
+
+    rgba_region = load_region_image(rgba_path, manim.BLUE)
+    assert np.array_equal(rgba_region.pixels, load_region_image(mask_path, manim.BLUE).pixels)
+
+
+def test_region_images_are_shared_until_the_mask_changes(tmp_path: Path) -> None:
+    mask_path = write_mask(os.path.join(tmp_path, "mask.png"), seed=2)
+
+    region = load_region_image(mask_path, manim.BLUE)
+
+    assert load_region_image(mask_path, manim.BLUE) is region
+    assert load_region_image(mask_path, manim.RED) is not region
+    assert not region.pixels.flags.writeable
+
+    write_mask(mask_path, seed=3)
+    os.utime(mask_path, ns=(os.stat(mask_path).st_mtime_ns + 10**9,) * 2)
+    assert np.array_equal(load_region_image(mask_path, manim.BLUE).pixels, tinted_canvas_crop(mask_path, manim.BLUE))
+
+
+def test_levels_are_built_once(tmp_path: Path) -> None:
+    region = load_region_image(write_mask(os.path.join(tmp_path, "mask.png"), h=120, w=150, seed=4), manim.BLUE)
+
+    levels = region.levels
+
+    assert region.levels is levels
+    assert all(np.array_equal(a, b) for a, b in zip(levels, build_pyramid(region.pixels)))
+
+
+def test_empty_masks_are_rejected(tmp_path: Path) -> None:
+    mask_path = os.path.join(tmp_path, "empty.png")
+    Image.fromarray(np.zeros((4, 5), dtype=np.uint8)).save(mask_path)
+
+    with pytest.raises(AssertionError, match="no opaque pixels"):
+        load_region_image(mask_path, manim.BLUE)
@@ -0,0 +1,74 @@
+import os
+from pathlib import Path
+
+import numpy as np
+import pytest
+from PIL import Image
+
+manim = pytest.importorskip("manim")
+
+from assets import load_region_image
+from focus_ireland import FocusIreland
+
+
+def write_mask(path: str, h: int = 90, w: int = 70, bbox: tuple[int, int, int, int] = (12, 30, 51, 77)) -> str:
+    """
+    Random nonzero alpha filling bbox = (left, top, right, bottom) of an h x w canvas, transparent elsewhere.
+    """
+    left, top, right, bottom = bbox
+    alpha = np.zeros((h, w), dtype=np.uint8)
+    alpha[top:bottom, left:right] = np.random.default_rng(0).integers(1, 256, (bottom - top, right - left))
+    Image.fromarray(alpha).save(path)
+
+    return path
+
+
+def full_canvas_world_space_bbox(mask_path: str, height: float) -> tuple[float, float, float, float]:
+    """
+    The world-space bbox of a region as the scene used to find it, from the full canvas tinted, masked and placed.
+    """
+    with Image.open(mask_path) as mask_image:
+        image = Image.new("RGBA", mask_image.size, (0, 0, 255, 255))
+        image.putalpha(mask_image)
+
+    scene_image = manim.ImageMobject(np.asarray(image)).set_height(height)
+    x_min, y_min, x_max, y_max = np.array(image.getbbox(), dtype=np.float64)
+    y_min, y_max = image.height - y_max, image.height - y_min
+    center_x, center_y, _ = scene_image.get_center()
+
+    return (
+        scene_image.width * (x_min / image.width - 0.5) + center_x,
+        scene_image.width * (x_max / image.width - 0.5) + center_x,
+        scene_image.height * (y_min / image.height - 0.5) + center_y,
+        scene_image.height * (y_max / image.height - 0.5) + center_y,
+    )
+
+
+@pytest.mark.parametrize("bbox", [(12, 30, 51, 77), (0, 0, 70, 90), (69, 0, 70, 1)])
+def test_world_space_bbox_matches_the_full_canvas(tmp_path: Path, bbox: tuple[int, int, int, int]) -> None:
+    mask_path = write_mask(os.path.join(tmp_path, "mask.png"), bbox=bbox)
+    region = load_region_image(mask_path, manim.BLUE)
+
+    canvas = FocusIreland.get_canvas(region, 6)
+
+    assert region.bbox == bbox
+    assert np.allclose(FocusIreland.get_world_space_bbox(region, canvas), full_canvas_world_space_bbox(mask_path, 6))
+
+
+def test_placed_region_images_cover_their_bbox(tmp_path: Path) -> None:
+    region = load_region_image(write_mask(os.path.join(tmp_path, "mask.png")), manim.RED)
+    canvas = FocusIreland.get_canvas(region, 6).shift(manim.RIGHT * 2 + manim.DOWN)
+
+    scene_image = FocusIreland.place_region_image(region, manim.ImageMobject(region.pixels), canvas)
+
+    x_min, x_max, y_min, y_max = FocusIreland.get_world_space_bbox(region, canvas)
+    assert np.isclose(scene_image.get_left()[0], x_min) and np.isclose(scene_image.get_right()[0], x_max)
+    assert np.isclose(scene_image.get_bottom()[1], y_min) and np.isclose(scene_image.get_top()[1], y_max)
+
+
+def test_region_images_are_cropped(tmp_path: Path) -> None:
+    region = load_region_image(write_mask(os.path.join(tmp_path, "mask.png")), manim.BLUE)
+
+    assert region.canvas_size == (70, 90)
+    assert region.pixels.shape == (77 - 30, 51 - 12, 4)
+    assert region.pixels[:, :, 3].all()
@@ -0,0 +1,110 @@
+import os
+from pathlib import Path
+from typing import Self
+
+import numpy as np
+import pytest
+import torch as th
+from PIL import Image
+
+from transforms import PixelTransform, load_world_points, placement
+
+
+class Canvas:
+    """
+    Stands in for a placed mobject, such as the rectangle of FocusIreland.get_canvas.
+    """
+
+    def __init__(self: Self, width: float, height: float, center: tuple[float, float]) -> None:
+        self.width, self.height, self.center = width, height, center
+
+    def get_width(self: Self) -> float:
+        return self.width
+
+    def get_height(self: Self) -> float:
+        return self.height
+
+    def get_center(self: Self) -> np.ndarray:
+        return np.array([*self.center, 0.0])
+
+
+def scene_world_points(alpha: np.ndarray, canvas: Canvas) -> th.Tensor:
+    """
+    The chain the scenes used to place the solid pixels of a mask: flip y, normalize, center, scale, move, yx -> xy.
+    """
+    solid_pixels = th.nonzero(th.from_numpy(alpha) > 200)  # shape: (N, 2)
+    solid_pixels[:, 0] = alpha.shape[0] - solid_pixels[:, 0]
+
+    normalized = solid_pixels / th.tensor(alpha.shape).float() - 0.5
+    world_space_shape = th.tensor([canvas.get_height(), canvas.get_width()])
+    world_yx = normalized * world_space_shape + th.tensor(canvas.get_center()[-2:-4:-1].copy())
+
+    return th.roll(world_yx, 1, 1)
+
+
+PLACEMENTS = [(6 * 1200 / 1447, 6.0, 0.0, 0.0), (3.0, 1.5, -2.0, 0.75), (10.0, 10.0, 1e3, -1e3)]
+
+
+@pytest.mark.parametrize("placed", PLACEMENTS)
+def test_to_world_follows_the_scene_convention(placed: tuple[float, float, float, float]) -> None:
+    width, height, center_x, center_y = placed
+    canvas_width, canvas_height = 120, 90
+    pixels = th.randint(0, 121, (500, 2), generator=th.Generator().manual_seed(0))
+    rows, cols = pixels[:, 0].double(), pixels[:, 1].double()
+
+    world = PixelTransform((canvas_width, canvas_height), placed).to_world(pixels)
+
+    # x = col * w / W - w / 2 + cx and y = -row * h / H + h / 2 + cy
+    expected_x = cols * width / canvas_width - width / 2 + center_x
+    expected_y = -rows * height / canvas_height + height / 2 + center_y
+    assert world.dtype == th.float32 and world.shape == (500, 2)
+    assert th.allclose(world.double(), th.stack([expected_x, expected_y], dim=1), rtol=1e-6, atol=1e-4)
+
+
+@pytest.mark.parametrize("placed", PLACEMENTS)
+def test_to_pixels_inverts_to_world(placed: tuple[float, float, float, float]) -> None:
+    transform = PixelTransform((120, 90), placed)
+    pixels = th.rand(500, 2, generator=th.Generator().manual_seed(1)) * th.tensor([90.0, 120.0])
+
+    assert transform.to_pixels(pixels).dtype == th.float32
+    assert th.allclose(transform.to_pixels(transform.to_world(pixels)), pixels, atol=1e-2)
+    assert th.allclose(transform.inverse @ transform.matrix, th.eye(3, dtype=th.float64))
+
+
+def test_pixels_of_any_dtype() -> None:
+    transform = PixelTransform((120, 90), PLACEMENTS[1])
+    pixels = np.array([[0, 0], [45, 60], [90, 120]])
+
+    expected = transform.to_world(pixels.astype(np.float32))
+    for dtype in (np.int16, np.int64, np.float64):
+        assert th.equal(transform.to_world(pixels.astype(dtype)), expected)
+    assert th.equal(transform.to_world(th.from_numpy(pixels)), expected)
+
+
+def test_docstring_example() -> None:
+    transform = PixelTransform((1200, 1447), (6 * 1200 / 1447, 6.0, 0.0, 0.0))
+
+    world = transform.to_world(th.tensor([[0, 0], [1447, 1200]]))
+
+    assert th.allclose(world, th.tensor([[-2.4879, 3.0], [2.4879, -3.0]]), atol=1e-4)
+
+
+def test_from_mobject_uses_the_placement() -> None:
+    canvas = Canvas(3.0, 1.5, (-2.0, 0.75))
+
+    assert placement(canvas) == (3.0, 1.5, -2.0, 0.75)
+    transform = PixelTransform.from_mobject(canvas, (120, 90))
+    assert th.equal(transform.matrix, PixelTransform((120, 90), PLACEMENTS[1]).matrix)
+
+
+def test_world_points_match_the_scene_chain_and_are_shared(tmp_path: Path) -> None:
+    alpha = np.random.default_rng(2).integers(0, 256, (45, 60), dtype=np.uint8)
+    mask_path = os.path.join(tmp_path, "region_mask.png")
+    Image.fromarray(alpha).save(mask_path)
+    canvas = Canvas(4.0, 3.0, (1.0, -0.5))
+
+    points = load_world_points(mask_path, canvas)
+
+    assert th.allclose(points, scene_world_points(alpha, canvas).float(), atol=1e-5)
+    assert load_world_points(mask_path, Canvas(4.0, 3.0, (1.0, -0.5))) is points
+    assert load_world_points(mask_path, Canvas(4.0, 3.0, (1.0, 0.5))) is not points
@@ -0,0 +1,120 @@
+import os
+from functools import lru_cache
+from typing import TYPE_CHECKING, Self
+
+import numpy as np
+import torch as th
+
+from preprocessing.point_cloud import load_or_build_point_cloud
+
+if TYPE_CHECKING:
+    from manim import Mobject
+
+Placement = tuple[float, float, float, float]
+
+
+def placement(mobject: "Mobject") -> Placement:
+    """
+    The (width, height, center x, center y) of a mobject in world space, which decide where its pixels land.
+    """
+    center_x, center_y, _ = mobject.get_center()
+    return float(mobject.get_width()), float(mobject.get_height()), float(center_x), float(center_y)
+
+
+class PixelTransform:
+    """
+    The affine map from the (row, col) pixels of a canvas to world-space (x, y) for one placement of the canvas in
+    the scene, and back. Pixels are normalized to [-0.5, 0.5] of the canvas with y going up, scaled to the size of
+    the placed canvas and moved to its center, which folds into a single 3x3 matrix:
+
+        [x, y, 1] = [row, col, 1] @ matrix
+
+    so a whole point cloud is mapped by one matrix multiply, swapping (row, col) to (x, y) and flipping y on the way.
+
+    Args:
+        canvas_size (tuple[int, int]): The (width, height) of the canvas in pixels.
+        placement (Placement): The (width, height, center x, center y) of the canvas in world space.
+
+    Example:
+        >>> transform = PixelTransform((1200, 1447), (6 * 1200 / 1447, 6.0, 0.0, 0.0))
+        >>> transform.to_world(th.tensor([[0, 0], [1447, 1200]]))
+        tensor([[-2.4879,  3.0000],
+                [ 2.4879, -3.0000]])
+    """
+
+    def __init__(self: Self, canvas_size: tuple[int, int], placement: Placement) -> None:
+        canvas_width, canvas_height = canvas_size
+        width, height, center_x, center_y = placement
+
+        scale_x, scale_y = width / canvas_width, height / canvas_height
+
+        # rows move down in y and columns right in x, from the top left corner of the placed canvas
+        self.matrix = th.tensor(
+            [
+                [0.0, -scale_y, 0.0],
+                [scale_x, 0.0, 0.0],
+                [center_x - width / 2, center_y + height / 2, 1.0],
+            ],
+            dtype=th.float64,
+        )  # shape: (3, 3)
+        self.inverse = th.linalg.inv(self.matrix)  # shape: (3, 3)
+
+        self.linear, self.bias = self.matrix[:2, :2].float(), self.matrix[2, :2].float()
+        self.inverse_linear, self.inverse_bias = self.inverse[:2, :2].float(), self.inverse[2, :2].float()
+
+    @classmethod
+    def from_mobject(cls: type[Self], mobject: "Mobject", canvas_size: tuple[int, int]) -> Self:
+        """
+        The transform of a canvas placed in the scene as mobject, such as an ImageMobject of the canvas or the
+        rectangle of FocusIreland.get_canvas.
+        """
+        return cls(canvas_size, placement(mobject))
+
+    def to_world(self: Self, pixels: np.ndarray | th.Tensor) -> th.FloatTensor:
+        """
+        World-space (x, y) of pixels given as (row, col), of shape (N, 2) and any numeric dtype.
+
+        Returns:
+            th.FloatTensor: Positions of shape (N, 2).
+        """
+        pixels = th.as_tensor(pixels, dtype=th.float32)
+        return th.addmm(self.bias, pixels, self.linear)
+
+    def to_pixels(self: Self, world: np.ndarray | th.Tensor) -> th.FloatTensor:
+        """
+        Fractional (row, col) pixels of world-space (x, y) positions of shape (N, 2), the inverse of to_world.
+
+        Returns:
+            th.FloatTensor: Pixels of shape (N, 2).
+        """
+        world = th.as_tensor(world, dtype=th.float32)
+        return th.addmm(self.inverse_bias, world, self.inverse_linear)
+
+
+@lru_cache(maxsize=8)
+def world_points_file(mask_path: str, mtime_ns: int, alpha_threshold: int, placement: Placement) -> th.FloatTensor:
+    points, metadata = load_or_build_point_cloud(mask_path, alpha_threshold=alpha_threshold)
+    transform = PixelTransform((metadata["width"], metadata["height"]), placement)
+
+    return transform.to_world(np.array(points, dtype=np.float32))
+
+
+def load_world_points(mask_path: str, canvas: "Mobject", alpha_threshold: int = 200) -> th.FloatTensor:
+    """
+    World-space (x, y) positions of the solid pixels of a mask, for the canvas of the mask placed in the scene as
+    canvas. The point cloud is precomputed by media_preprocessing or built on first use.
+
+    Positions are cached for the whole process, keyed by the path and modification time of the mask and by the
+    placement of the canvas, so scenes that place the same mask the same way share one tensor. It must not be
+    modified in place.
+
+    Args:
+        mask_path (str): Path of the alpha mask image, such as media/ireland_mask.png.
+        canvas (Mobject): Where the full canvas of the mask is placed, such as the rectangle of
+            FocusIreland.get_canvas.
+        alpha_threshold (int): Pixels with alpha above this value are solid.
+
+    Returns:
+        th.FloatTensor: Positions of shape (N, 2).
+    """
+    return world_points_file(mask_path, os.stat(mask_path).st_mtime_ns, alpha_threshold, placement(canvas))